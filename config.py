@@ -17,7 +17,23 @@ DB_CONFIG = {
     'database': os.getenv('DB_NAME', 'defaultdb'),
     'ssl_mode': os.getenv('DB_SSL_MODE', 'REQUIRED'),
     'ssl_ca': os.path.join(CURRENT_DIR, 'utils', os.getenv('DB_SSL_CA', 'ca.pem')),
-    'ssl_verify': os.getenv('DB_SSL_VERIFY', 'true').lower() == 'true'
+    'ssl_verify': os.getenv('DB_SSL_VERIFY', 'true').lower() == 'true',
+    # Shared connection pool: connections (MySQL Connector allows at most 32) and seconds to wait for one
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+    'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+    # Opt-in for local development: apply pending schema migrations on first connect
+    # instead of only at deploy time via scripts/migrate.py
+    'auto_migrate': os.getenv('DB_AUTO_MIGRATE', 'false').lower() == 'true',
+    # Seconds to wait for a new connection, and seconds an idle direct connection is trusted without a ping
+    'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+    'validate_interval': float(os.getenv('DB_VALIDATE_INTERVAL', '30')),
+    # Circuit breaker: consecutive connection failures before failing fast, and seconds between reconnect probes
+    'breaker_failures': int(os.getenv('DB_BREAKER_FAILURES', '3')),
+    'breaker_reset_timeout': float(os.getenv('DB_BREAKER_RESET_TIMEOUT', '15')),
+    # Change feed: seconds the watermark trails the server clock (must exceed the longest
+    # product write transaction), and seconds deletion tombstones are kept
+    'change_feed_overlap': int(os.getenv('DB_CHANGE_FEED_OVERLAP', '300')),
+    'change_feed_retention': int(os.getenv('DB_CHANGE_FEED_RETENTION', str(7 * 24 * 3600)))
 }
 
 # API configuration
@@ -28,9 +28,9 @@ else
     exit 1
 fi
 
-# Create the database and tables if they don't exist
+# Create the database and apply pending schema migrations (db_init.sql is migration 0)
 echo "🗄️ Setting up database tables..."
-mysql -u "$(grep DB_USER .env | cut -d '=' -f2)" -p"$(grep DB_PASSWORD .env | cut -d '=' -f2)" < db_init.sql
+python scripts/migrate.py
 
 # Ensure images directory exists
 echo "📁 Creating required directories..."
@@ -39,5 +39,9 @@ sys.exit(1)
 # Check MySQL connection
 check_mysql
 
+# Apply pending schema migrations once per deploy
+echo "Applying database migrations..."
+python scripts/migrate.py
+
 # Execute the provided command
 exec "$@"
@@ -1,5 +1,6 @@
 import streamlit as st
-from utils.database import get_database_connection
+from utils.database import get_database_connection, get_circuit_breaker_state
+from utils.stats import get_dashboard_stats
 import pandas as pd
 import time
 import yaml
@@ -39,8 +40,12 @@ elif st.session_state.get("authentication_status") is True:
     # Initialize database connection
     db = get_database_connection()
 
-    # Get statistics
-    stats = db.get_stats()
+    # Pages keep rendering with empty data while the database is unreachable
+    if get_circuit_breaker_state()['state'] == 'open':
+        st.warning("The database is currently unreachable. Figures below may be empty or out of date; reconnecting in the background.")
+
+    # Get statistics (cached across reruns and sessions until the catalog changes)
+    stats = get_dashboard_stats(db)
 
     # Display statistics in a nice layout
     st.markdown("""
@@ -93,15 +98,57 @@ elif st.session_state.get("authentication_status") is True:
         </div>
         """, unsafe_allow_html=True)
 
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.markdown(f"""
+        <div class="stat-card">
+            <h1>{stats['generated_count']}</h1>
+            <p>Generated Products</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col2:
+        st.markdown(f"""
+        <div class="stat-card">
+            <h1>{stats['mockup_count']}</h1>
+            <p>Products With Mockups</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col3:
+        st.markdown(f"""
+        <div class="stat-card">
+            <h1>{stats['published_count']}</h1>
+            <p>Published</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # Products created per day
+    if stats['created_per_day']:
+        st.subheader("Products Created")
+        created_df = pd.DataFrame(stats['created_per_day'])
+        created_df = created_df.pivot_table(index='day', columns='product_type', values='count', aggfunc='sum', fill_value=0)
+        # Show days without new products as zero
+        all_days = pd.date_range(stats['series_since'], pd.Timestamp.today().normalize(), freq='D').date
+        created_df = created_df.reindex(all_days, fill_value=0)
+        st.bar_chart(created_df)
+
+    if stats['categories']:
+        with st.expander("Products by category"):
+            category_df = pd.DataFrame(
+                sorted(stats['categories'].items(), key=lambda item: item[1], reverse=True),
+                columns=['Category', 'Products']
+            )
+            st.dataframe(category_df, hide_index=True, use_container_width=True)
+
     # Recent products
     st.subheader("Recent Products")
 
-    # Get recent products
-    products_df = db.get_all_products()
+    # Get recent products (limited to latest 5)
+    recent_products = db.get_recent_products(limit=5)
 
-    if not products_df.empty:
-        # Display recent products (limited to latest 5)
-        recent_products = products_df.head(5)
+    if not recent_products.empty:
         
         # Format the display columns
         display_cols = ['id', 'product_name', 'item_sku', 'parent_child', 'price', 'created_at']
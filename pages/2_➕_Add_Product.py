@@ -1,9 +1,11 @@
 import streamlit as st
 import json
+import uuid
 import random
 import string
 from utils.database import get_database_connection
-from utils.dynamic_mockups import get_mockups
+from utils.sku_allocator import SKU_SUFFIX_PLACEHOLDER, allocate_skus, is_reserved_by, release_skus
+from utils.mockup_catalog import get_mockup_catalog
 import yaml
 from yaml.loader import SafeLoader
 import streamlit_authenticator as stauth
@@ -68,6 +70,8 @@ elif st.session_state.get("authentication_status") is True:
         st.session_state.selected_sizes = []
     if 'sku' not in st.session_state:
         st.session_state.sku = ""  # Initialize SKU as empty string
+    if 'sku_owner' not in st.session_state:
+        st.session_state.sku_owner = uuid.uuid4().hex  # Identifies this session's SKU reservations
 
     # Initialize session state for mockup selections if not already done
     if 'mockup_selections' not in st.session_state:
@@ -89,8 +93,14 @@ elif st.session_state.get("authentication_status") is True:
     }
 
     # Function to generate product SKU based on name, colors, and sizes
-    def generate_product_sku(item_name, colors=None, sizes=None):
-        """Generate a SKU based on item name, colors, and sizes"""
+    def generate_product_sku(item_name, colors=None, sizes=None, reserve=False):
+        """
+        Generate a SKU based on item name, colors, and sizes
+        
+        While the form is edited only a preview is built, with a placeholder for
+        the random suffix, so changing a widget costs no database lookup. The
+        real suffix is allocated and reserved with reserve=True on submit.
+        """
         if not item_name:
             return ""
             
@@ -118,10 +128,22 @@ elif st.session_state.get("authentication_status") is True:
         if sizes and len(sizes) > 0:
             sku += f"{len(sizes)}-"
         
-        # Add a random alphanumeric string to ensure uniqueness
-        sku += ''.join(random.choice(string.ascii_uppercase + string.digits) for _ in range(4))
+        if not reserve:
+            return sku + SKU_SUFFIX_PLACEHOLDER
+        
+        # Resubmits with the same prefix keep this session's reserved SKU; a new prefix releases it
+        owner = st.session_state.get('sku_owner')
+        reservation = st.session_state.get('sku_reservation')
+        if reservation:
+            if reservation['prefix'] == sku and is_reserved_by(reservation['sku'], owner):
+                return reservation['sku']
+            release_skus([reservation['sku']])
+        
+        # Add a random alphanumeric string, reserved so no other product gets the same SKU
+        allocated = allocate_skus(get_database_connection(), [sku], owner=owner)[0]
+        st.session_state.sku_reservation = {'prefix': sku, 'sku': allocated} if allocated else None
         
-        return sku
+        return allocated or ""
 
     # Function to update SKU based on current item name, colors, and sizes
     def update_sku():
@@ -201,37 +223,11 @@ elif st.session_state.get("authentication_status") is True:
             # Update SKU when item name changes
             update_sku()
 
-    # Fetch mockups from API
-    mockups = get_mockups()
-    print(f"Mockups fetched: {mockups}")  # Debugging line
-
-    # Create descriptive options for the mockup selection
-    mockup_options = [""]  # Start with an empty option
-    mockup_id_map = {}  # Dictionary to map display text to mockup ID
-
-    for mockup in mockups:
-        print(f"Processing mockup: {mockup}")  # Debug
-        mockup_name = mockup.get('name', 'Unnamed Mockup')
-        smart_objects_info = []
-        for so in mockup.get('smart_objects', []):
-            if 'Background' not in so.get('name', ''):  # Skip background objects
-                # Create option with both smart object name and mockup name
-                so_name = so.get('name', 'Unnamed')
-                option_text = f"{so_name} - {mockup_name}"
-                smart_objects_info.append(option_text)
-                mockup_options.append(option_text)
-                
-                # Store the mapping between option text and mockup ID
-                mockup_id = mockup.get('id', mockup.get('uuid', ''))  # Try 'id' first, then 'uuid'
-                print(f"Mapping '{option_text}' to ID: {mockup_id}")
-                mockup_id_map[option_text] = mockup_id
-        
-        # If no smart objects were found, add a default option
-        if not smart_objects_info and 'Background' not in mockup_name:
-            option_text = f"No printable objects - {mockup_name}"
-            mockup_options.append(option_text)
-            mockup_id = mockup.get('id', mockup.get('uuid', ''))
-            mockup_id_map[option_text] = mockup_id
+    # Load mockups from the shared catalog cache; reruns don't hit the API
+    mockup_catalog = get_mockup_catalog()
+    mockup_options = mockup_catalog['options']
+    mockup_index = mockup_catalog['index']  # Maps display text to (mockup ID, smart object UUID)
+    mockup_id_map = {option: ids[0] for option, ids in mockup_index.items()}
 
     # Create a function to handle mockup selection outside the form
     def handle_mockup_selection():
@@ -290,7 +286,8 @@ elif st.session_state.get("authentication_status") is True:
         if "form_item_name" in st.session_state:
             st.session_state.item_name = st.session_state.form_item_name
         
-        st.text_input("SKU", placeholder="Auto-generated SKU", key="sku", value=st.session_state.sku, disabled=True)
+        st.text_input("SKU", placeholder="Auto-generated SKU", key="sku", value=st.session_state.sku, disabled=True,
+                      help=f"{SKU_SUFFIX_PLACEHOLDER} is replaced with a unique suffix when the item is added")
 
         # Size Section
         st.subheader("Size")
@@ -400,36 +397,22 @@ elif st.session_state.get("authentication_status") is True:
         # Use the mockup selection from the outside form component
         st.session_state.item_name = st.session_state.form_item_name if "form_item_name" in st.session_state else st.session_state.item_name
         
-        # Get the current value of sku from the session state 
-        item_sku = st.session_state.sku
-        
-        # If SKU is empty, generate it now
-        if not item_sku:
-            item_sku = generate_product_sku(st.session_state.item_name, st.session_state.colors, st.session_state.sizes)
+        # The form shows a preview; allocate and reserve the real SKU now
+        item_sku = generate_product_sku(
+            st.session_state.item_name, st.session_state.colors, st.session_state.sizes, reserve=True
+        )
         
         # Get all mockup IDs and smart object UUIDs
         selected_mockup_ids = []
         smart_object_uuids = []
         
         for mockup_selection in st.session_state.mockup_selections:
-            selected_mockup_id = mockup_id_map.get(mockup_selection, "")
-            # Extract the smart object name from the format "SmartObject - MockupName"
-            if " - " in mockup_selection:
-                selected_mockup_name = mockup_selection.split(" - ")[0]
-            else:
-                selected_mockup_name = mockup_selection.split(",")[0] if "," in mockup_selection else mockup_selection
-            
-            # Look through mockups to find the selected one and extract smart object UUID
-            for mockup in mockups:
-                mockup_id = mockup.get('id', mockup.get('uuid', ''))
-                if mockup_id == selected_mockup_id:
-                    # Find the smart object with matching name
-                    for so in mockup.get('smart_objects', []):
-                        if 'Background' not in so.get('name', '') and so.get('name', '') == selected_mockup_name:
-                            smart_object_uuids.append(so.get('uuid', None))
-                            break
-                    break
+            # Look up the selected mockup and its smart object in the prebuilt index
+            selected_mockup_id, smart_object_uuid = mockup_index.get(mockup_selection, ("", None))
+            if smart_object_uuid:
+                smart_object_uuids.append(smart_object_uuid)
             
+            selected_mockup_id = selected_mockup_id or ""
             selected_mockup_ids.append(selected_mockup_id)
         
         # Store multiple mockups as JSON strings
@@ -457,7 +440,9 @@ elif st.session_state.get("authentication_status") is True:
         }
 
         # Validate required fields
-        if not product_data['product_name'] or not product_data['item_sku']:
+        if product_data['product_name'] and not product_data['item_sku']:
+            st.error("Could not reserve a unique SKU because existing SKUs could not be checked. Please try again.")
+        elif not product_data['product_name'] or not product_data['item_sku']:
             st.error("Please fill in the Item Name and SKU fields.")
         elif not product_data['mockup_id']:
             st.error("Please select a mockup.")
@@ -471,6 +456,7 @@ elif st.session_state.get("authentication_status") is True:
             try:
                 product_id = db.add_product(product_data)
                 if product_id:
+                    release_skus([item_sku], used=True)
                     st.success(f"Product added successfully with ID: {product_id}")
                     
                     # Store a flag in session state to indicate we should reset on next load
@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
 from utils.auth import check_password
-from utils.database import get_database_connection
+from utils.database import get_database_connection, get_catalog_version
 from PIL import Image
 import json  # Add import for JSON handling
 from utils.api import is_s3_url
-from utils.s3_storage import get_image_from_s3_url
+from utils.s3_storage import get_image_from_s3_url, get_thumbnail_url, prefetch_thumbnails
+from utils.export import stream_product_export, remove_export_file, EXPORT_CHUNK_SIZE
 from utils.color_utils import hex_to_color_name  # Import the new function
 import yaml
 from yaml.loader import SafeLoader 
@@ -61,20 +62,6 @@ elif st.session_state.get("authentication_status") is True:
     if 'product_type_filter' not in st.session_state:
         st.session_state.product_type_filter = "All"
 
-    # Get all products from database
-    products_df = db.get_all_products()
-    generated_products_df = db.get_all_generated_products()
-
-    # Add a type column to distinguish between regular and generated products
-    if not products_df.empty:
-        products_df['product_type'] = 'Regular'
-
-    if not generated_products_df.empty:
-        generated_products_df['product_type'] = 'Generated'
-        # Rename design_sku to item_sku for consistency in display
-        if 'design_sku' in generated_products_df.columns:
-            generated_products_df = generated_products_df.rename(columns={'design_sku': 'item_sku'})
-
     # Handle delete confirmation modal
     if st.session_state.confirm_delete:
         product_id = st.session_state.product_to_delete
@@ -216,34 +203,27 @@ elif st.session_state.get("authentication_status") is True:
         
         # Display product image if available
         if product_type == "Generated" and 'mockup_urls' in product and product['mockup_urls']:
-            image_field = 'mockup_urls'
-            image_url = product[image_field]
+            image_url = product['mockup_urls']
+            mockups = db.get_product_mockups([product_id])
             
-            try:
-                import json
-                # Parse mockup_urls JSON
-                if isinstance(image_url, str) and (image_url.startswith('[') or image_url.startswith('{')):
-                    mockup_data = json.loads(image_url)
-                    # Extract all URLs from the mockup data
-                    if isinstance(mockup_data, dict) and len(mockup_data) > 0:
-                        # Display all mockups for different colors
-                        st.write("Available mockups:")
-                        for color_code, mockup_url in mockup_data.items():
-                            color_name = color_code.replace("#", "")  # Remove # from hex code for display
-                            st.image(mockup_url, caption=f"Mockup - {color_name}", width=300)
-                    elif isinstance(mockup_data, list) and len(mockup_data) > 0:
-                        for i, url in enumerate(mockup_data):
-                            st.image(url, caption=f"Mockup {i+1}", width=300)
-                else:
-                    st.image(image_url, caption=f"Mockup for {product['product_name']}", width=300)
-            except Exception as e:
-                st.error(f"Error parsing mockup URL: {e}")
+            if not mockups.empty:
+                # Display all mockups for different colors
+                st.write("Available mockups:")
+                for mockup in mockups.itertuples(index=False):
+                    if mockup.color_hex:
+                        caption = f"Mockup - {mockup.color_hex.replace('#', '')}"  # Remove # from hex code for display
+                    else:
+                        caption = f"Mockup {mockup.position + 1}"
+                    st.image(get_thumbnail_url(mockup.s3_url, 300), caption=caption, width=300)
+            elif isinstance(image_url, str) and image_url[:1] not in ('[', '{'):
+                st.image(get_thumbnail_url(image_url, 300), caption=f"Mockup for {product['product_name']}", width=300)
+            else:
                 st.markdown("📷 *Mockup image could not be loaded*")
         else:
             # Use default image fields and logic for regular products
             image_field = 'image_url' if product_type == "Regular" else 'original_design_url'
             if product[image_field]:
-                st.image(product[image_field], caption=f"Image for {product['product_name']}", width=300)
+                st.image(get_thumbnail_url(product[image_field], 300), caption=f"Image for {product['product_name']}", width=300)
             else:
                 st.markdown("📷 *No image available*")
 
@@ -254,14 +234,11 @@ elif st.session_state.get("authentication_status") is True:
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            search_term = st.text_input("Search by name or SKU", "")
+            search_term = st.text_input("Search by name, SKU or title", "")
 
         with col2:
-            # Create combined category list from both regular and generated products
-            categories = []
-            if not products_df.empty and 'category' in products_df.columns:
-                categories = products_df['category'].dropna().unique().tolist()
-            categories = ["All"] + categories
+            # Only regular products carry a category
+            categories = ["All"] + db.get_product_categories()
             category_filter = st.selectbox("Filter by category", categories)
 
         with col3:
@@ -274,517 +251,135 @@ elif st.session_state.get("authentication_status") is True:
         col1, col2 = st.columns([1, 3])
         with col1:
             if st.button("Generate CSV File for All Product"):
-                # Combine DataFrames based on filter selection
-                if st.session_state.product_type_filter == "All":
-                    filtered_df = pd.concat([products_df, generated_products_df], ignore_index=True)
-                elif st.session_state.product_type_filter == "Regular":
-                    filtered_df = products_df.copy()
-                else:  # Generated
-                    filtered_df = generated_products_df.copy()
-
-                # Apply additional filters
-                if not filtered_df.empty:
-                    if 'price' in filtered_df.columns:
-                        filtered_df['price'] = pd.to_numeric(filtered_df['price'], errors='coerce').fillna(0.0)
-                    if 'quantity' in filtered_df.columns:
-                        filtered_df['quantity'] = pd.to_numeric(filtered_df['quantity'], errors='coerce').fillna(0).astype(int)
-                    
-                    # Define function to extract mockup URLs from JSON and create color-specific entries
-                    def process_mockups_by_color(row_data):
-                        """Extract mockup URLs from JSON and create individual entries for each color"""
-                        if 'mockup_urls' not in row_data or pd.isna(row_data['mockup_urls']) or not row_data['mockup_urls']:
-                            return [row_data]
-                        
-                        try:
-                            mockup_data = row_data['mockup_urls']
-                            if isinstance(mockup_data, str) and (mockup_data.startswith('[') or mockup_data.startswith('{')):
-                                mockup_json = json.loads(mockup_data)
-                                
-                                # Handle dictionary format: {"#color1": "url1", "#color2": "url2"}
-                                if isinstance(mockup_json, dict) and len(mockup_json) > 0:
-                                    result_rows = []
-                                    
-                                    for color_code, mockup_url in mockup_json.items():
-                                        new_row = row_data.copy()
-                                        
-                                        # Set the image_url to this specific mockup URL
-                                        new_row['image_url'] = mockup_url
-                                        
-                                        # Convert hex to friendly color name
-                                        color_name = hex_to_color_name(color_code)
-                                        
-                                        # Set color value for this mockup
-                                        new_row['colour'] = color_name
-                                        new_row['color'] = color_name
-                                        
-                                        # Store original hex code for matching purposes
-                                        new_row['original_hex'] = color_code.replace("#", "") if color_code.startswith("#") else color_code
-                                        
-                                        result_rows.append(new_row)
-                                    
-                                    return result_rows
-                                    
-                                # Handle array format: ["url1", "url2"]
-                                elif isinstance(mockup_json, list) and len(mockup_json) > 0:
-                                    # For array format, we'll just use the first URL
-                                    # since we don't have color information
-                                    row_data['image_url'] = mockup_json[0]
-                                    return [row_data]
-                        except Exception as e:
-                            print(f"Error processing mockups: {e}")
-                        
-                        # Default: return the original row
-                        return [row_data]
-
-                    # Create a new DataFrame for the CSV export with properly formatted data
-                    export_rows = []
-                    
-                    for idx, row in filtered_df.iterrows():
-                        product_row = row.copy()
-                        
-                        # For parent products, set size and color to blank
-                        if 'parent_child' in product_row and product_row['parent_child'] == 'Parent':
-                            product_row['size'] = ''
-                            product_row['colour'] = ''
-                            product_row['color'] = ''
-                            
-                            # For generated products with mockups, extract them even for parent records
-                            if product_row.get('product_type') == 'Generated' and 'mockup_urls' in product_row and product_row['mockup_urls']:
-                                color_rows = process_mockups_by_color(product_row.to_dict())
-                                export_rows.extend(color_rows)
-                            else:
-                                export_rows.append(product_row.to_dict())
-                        else:
-                            # For child products, create separate rows for each size/color combination
-                            sizes = []
-                            colors = []
-                            
-                            # Process size values
-                            if 'size' in product_row and not pd.isna(product_row['size']) and product_row['size']:
-                                try:
-                                    if isinstance(product_row['size'], str) and (product_row['size'].startswith('[') or product_row['size'].startswith('{')):
-                                        size_data = json.loads(product_row['size'])
-                                        if isinstance(size_data, list):
-                                            if all(isinstance(item, dict) and 'name' in item for item in size_data):
-                                                sizes = [item['name'] for item in size_data]
-                                            else:
-                                                sizes = [str(s).strip('"\'') for s in size_data]
-                                        else:
-                                            sizes = [str(size_data)]
-                                    else:
-                                        sizes = [str(product_row['size'])]
-                                except:
-                                    sizes = [str(product_row['size'])]
-                            
-                            # Use either 'color' or 'colour' field, whichever is available
-                            color_field = 'colour' if 'colour' in product_row and not pd.isna(product_row['colour']) else 'color'
-                            
-                            # Process color values
-                            if color_field in product_row and not pd.isna(product_row[color_field]) and product_row[color_field]:
-                                try:
-                                    if isinstance(product_row[color_field], str) and (product_row[color_field].startswith('[') or product_row[color_field].startswith('{')):
-                                        color_data = json.loads(product_row[color_field])
-                                        if isinstance(color_data, list):
-                                            colors = [str(c).strip('"\'') for c in color_data]
-                                        else:
-                                            colors = [str(color_data)]
-                                    else:
-                                        colors = [str(product_row[color_field])]
-                                except:
-                                    colors = [str(product_row[color_field])]
-                            
-                            # For generated products with mockups, handle them specially
-                            if product_row.get('product_type') == 'Generated' and 'mockup_urls' in product_row and product_row['mockup_urls']:
-                                # Process mockups by color instead of the normal flow
-                                base_rows = []
-                                
-                                # If we have sizes, create a base row for each size first
-                                if sizes:
-                                    for size in sizes:
-                                        size_row = product_row.copy()
-                                        size_row['size'] = size
-                                        base_rows.append(size_row.to_dict())
-                                else:
-                                    base_rows.append(product_row.to_dict())
-                                    
-                                # Now process each base row for mockups
-                                for base_row in base_rows:
-                                    color_rows = process_mockups_by_color(base_row)
-                                    export_rows.extend(color_rows)
-                            else:
-                                # Normal processing for non-mockup products
-                                # If we have sizes and colors, create a row for each combination
-                                if sizes and colors:
-                                    for size in sizes:
-                                        for color in colors:
-                                            new_row = product_row.copy().to_dict()
-                                            new_row['size'] = size
-                                            new_row['colour'] = color
-                                            new_row['color'] = color  # Ensure both color fields are set
-                                            export_rows.append(new_row)
-                                # If we only have sizes, create a row for each size
-                                elif sizes:
-                                    for size in sizes:
-                                        new_row = product_row.copy().to_dict()
-                                        new_row['size'] = size
-                                        export_rows.append(new_row)
-                                # If we only have colors, create a row for each color
-                                elif colors:
-                                    for color in colors:
-                                        new_row = product_row.copy().to_dict()
-                                        new_row['colour'] = color
-                                        new_row['color'] = color  # Ensure both color fields are set
-                                        export_rows.append(new_row)
-                                else:
-                                    # No size or color, just add the row as is
-                                    export_rows.append(product_row.to_dict())
-                    
-                    # Convert the rows back to a DataFrame
-                    export_df = pd.DataFrame(export_rows)
-                    
-                    # Ensure all required fields exist, add them if missing
-                    required_fields = [
-                        'product_name', 'item_sku', 'parent_child', 'parent_sku',
-                        'size', 'color', 'image_url', 'market_place_title', 'category'
-                    ]
-                    
-                    # Map internal field names to expected CSV field names
-                    field_mapping = {
-                        'product_name': 'product_name',
-                        'item_sku': 'item_sku',
-                        'design_sku': 'item_sku',  # Use design_sku as item_sku for generated products
-                        'parent_child': 'parent_child',
-                        'parent_sku': 'parent_sku',
-                        'size': 'size',
-                        'colour': 'color',  # Standardize on 'color'
-                        'color': 'color',
-                        'image_url': 'image_url',
-                        'original_design_url': 'image_url',  # Use original_design_url as image_url for generated
-                        'mockup_urls': 'image_url',  # Use mockup_urls as image_url if available
-                        'market_place_title': 'market_place_title',
-                        'category': 'category'
-                    }
-                    
-                    # Create standardized DataFrame with required fields
-                    standardized_df = pd.DataFrame()
-                    
-                    # Define function to extract first mockup URL from JSON
-                    def extract_first_mockup(mockup_data):
-                        if pd.isna(mockup_data) or not mockup_data:
-                            return ''
-                        try:
-                            if isinstance(mockup_data, str) and (mockup_data.startswith('[') or mockup_data.startswith('{')):
-                                data = json.loads(mockup_data)
-                                if isinstance(data, dict) and len(data) > 0:
-                                    return list(data.values())[0]
-                                elif isinstance(data, list) and len(data) > 0:
-                                    return data[0]
-                            return mockup_data
-                        except:
-                            return ''
-                    
-                    # First handle mockup_urls separately for generated products to ensure they're prioritized
-                    if 'mockup_urls' in export_df.columns and 'product_type' in export_df.columns:
-                        # Create image_url from mockup_urls for generated products
-                        mask_generated = export_df['product_type'] == 'Generated'
-                        if 'image_url' not in export_df.columns:
-                            export_df['image_url'] = ''
-                        
-                        # Apply the extraction function only to generated products with mockup_urls
-                        for idx, row in export_df[mask_generated].iterrows():
-                            if not pd.isna(row.get('mockup_urls')) and row.get('mockup_urls'):
-                                export_df.at[idx, 'image_url'] = extract_first_mockup(row['mockup_urls'])
-                    
-                    # Now handle the rest of the fields
-                    for required_field in required_fields:
-                        if required_field in export_df.columns:
-                            standardized_df[required_field] = export_df[required_field]
-                        else:
-                            # Try to map from existing columns
-                            mapped = False
-                            for src_field, dest_field in field_mapping.items():
-                                if dest_field == required_field and src_field in export_df.columns:
-                                    # For image_url, we've already handled mockup_urls earlier
-                                    if src_field == 'mockup_urls' and dest_field == 'image_url':
-                                        continue
-                                    
-                                    standardized_df[required_field] = export_df[src_field]
-                                    mapped = True
-                                    break
-                            
-                            if not mapped:
-                                # Add empty column if no mapping found
-                                standardized_df[required_field] = ''
-                    
-                    # Set parent_child field based on product type
-                    if 'product_type' in export_df.columns and 'parent_child' in standardized_df.columns:
-                        # For regular products: set as "Parent"
-                        mask_regular = export_df['product_type'] == 'Regular'
-                        if any(mask_regular):
-                            standardized_df.loc[mask_regular, 'parent_child'] = 'Parent'
-                        
-                        # For generated products: set as "Child" 
-                        mask_generated = export_df['product_type'] == 'Generated'
-                        if any(mask_generated):
-                            standardized_df.loc[mask_generated, 'parent_child'] = 'Child'
-                        mask_regular = export_df['product_type'] == 'Regular'
-                        if any(mask_regular):
-                            standardized_df.loc[mask_regular, 'parent_sku'] = ''
+                export_type = st.session_state.product_type_filter
+                
+                # Only the id/SKU lookup is loaded up front; products are streamed in chunks
+                parent_products = db.get_product_sku_map()
+                default_parent_sku = None
+                if export_type == "All" and not parent_products.empty:
+                    default_parent_sku = parent_products['item_sku'].iloc[0]
+                
+                # A failed read raises, and stream_product_export deletes the partial file
+                try:
+                    with st.spinner("Preparing CSV export..."):
+                        export_path, export_rows = stream_product_export(
+                            db.iter_product_chunks(product_type=export_type, chunk_size=EXPORT_CHUNK_SIZE),
+                            parent_products=parent_products,
+                            default_parent_sku=default_parent_sku
+                        )
+                except Exception as e:
+                    st.error(f"CSV export failed, no file was prepared: {e}")
+                else:
+                    # Replace any export prepared earlier in this session
+                    remove_export_file(st.session_state.get('export_csv_path'))
+                    st.session_state.export_csv_path = export_path
+                    st.session_state.export_csv_rows = export_rows
 
-                        # For Generated items, parent_sku should be the item_sku of the Regular item
-                        mask_generated = export_df['product_type'] == 'Generated'
-                        if any(mask_generated) and any(mask_regular):
-                            regular_skus = export_df.loc[mask_regular, 'item_sku'].values
-                            standardized_df.loc[mask_generated, 'parent_sku'] = regular_skus[0] if len(regular_skus) > 0 else ''
-                        
-                    # Add any additional useful fields that might be present
-                    additional_fields = ['price', 'quantity', 'description', 'product_type']
-                    for field in additional_fields:
-                        if field in export_df.columns:
-                            standardized_df[field] = export_df[field]
-                    
-                    # Handle special requirements for generated products
-                    if 'product_type' in standardized_df.columns:
-                        # 1. For generated products, use product_name as category
-                        mask_generated = standardized_df['product_type'] == 'Generated'
-                        if any(mask_generated):
-                            standardized_df.loc[mask_generated, 'category'] = standardized_df.loc[mask_generated, 'product_name']
-                        
-                        # 2. For parent records in generated products, make item_sku blank
-                        mask_parent_generated = (standardized_df['product_type'] == 'Generated') & \
-                                            (standardized_df['parent_child'] == 'Parent')
-                        if any(mask_parent_generated):
-                            standardized_df.loc[mask_parent_generated, 'item_sku'] = ''
-                        
-                        # 3. Set market_place_title for generated products if not present
-                        if 'marketplace_title' not in standardized_df.columns or standardized_df['market_place_title'].isna().any():
-                            # Create market_place_title column if it doesn't exist
-                            if 'marketplace_title' not in standardized_df.columns:
-                                standardized_df['market_place_title'] = ''
-                            
-                            # Format marketplace title for generated products
-                            for idx, row in standardized_df[mask_generated].iterrows():
-                                product_name = row['product_name'] if not pd.isna(row['product_name']) else ''
-                                size = row['size'] if not pd.isna(row['size']) and row['size'] else ''
-                                color = row['color'] if not pd.isna(row['color']) and row['color'] else ''
-                                
-                                # Build marketplace title with available information
-                                title_parts = [part for part in [product_name, size, color] if part]
-                                marketplace_title = ' - '.join(title_parts)
-                                standardized_df.at[idx, 'market_place_title'] = marketplace_title
-                        
-                        # Check if there's an actual marketplace_title field in the original data and use it
-                        if 'marketplace_title' in export_df.columns:
-                            for idx, row in standardized_df[mask_generated].iterrows():
-                                if idx in export_df.index and not pd.isna(export_df.at[idx, 'marketplace_title']) and export_df.at[idx, 'marketplace_title']:
-                                    # Use the original marketplace_title from the database
-                                    standardized_df.at[idx, 'market_place_title'] = export_df.at[idx, 'marketplace_title']
-                        
-                        # 4. For generated products, ensure each color has the correct mockup URL from the mockup_urls dictionary
-                        if 'image_url' in standardized_df.columns and 'color' in standardized_df.columns:
-                            for idx, row in standardized_df[mask_generated].iterrows():
-                                if pd.isna(row['color']) or not row['color']:
-                                    continue
-                                    
-                                # Get original row from export_df to access mockup_urls
-                                if idx in export_df.index and 'mockup_urls' in export_df.columns:
-                                    mockup_urls = export_df.at[idx, 'mockup_urls']
-                                    if pd.isna(mockup_urls) or not mockup_urls:
-                                        continue
-                                        
-                                    try:
-                                        # Parse mockup data
-                                        if isinstance(mockup_urls, str) and (mockup_urls.startswith('{') or mockup_urls.startswith('[')):
-                                            mockup_data = json.loads(mockup_urls)
-                                            
-                                            # Only process dict format mockup data
-                                            if isinstance(mockup_data, dict):
-                                                # Get the color value (could be in different formats)
-                                                color_val = row['color']
-                                                
-                                                # Try multiple formats for matching colors
-                                                matched = False
-                                                
-                                                # 1. Try direct match
-                                                if color_val in mockup_data:
-                                                    standardized_df.at[idx, 'image_url'] = mockup_data[color_val]
-                                                    matched = True
-                                                    
-                                                # 2. Try with # prefix
-                                                if not matched and not color_val.startswith('#'):
-                                                    hex_color = f"#{color_val}"
-                                                    if hex_color in mockup_data:
-                                                        standardized_df.at[idx, 'image_url'] = mockup_data[hex_color]
-                                                        matched = True
-                                                
-                                                # 3. Try without # prefix
-                                                if not matched and color_val.startswith('#'):
-                                                    plain_color = color_val.replace('#', '')
-                                                    if plain_color in mockup_data:
-                                                        standardized_df.at[idx, 'image_url'] = mockup_data[plain_color]
-                                                        matched = True
-                                                
-                                                # 4. Try case-insensitive match
-                                                if not matched:
-                                                    for key, url in mockup_data.items():
-                                                        if key.lower() == color_val.lower() or key.lower() == f"#{color_val.lower()}" or key.lower().replace('#', '') == color_val.lower().replace('#', ''):
-                                                            standardized_df.at[idx, 'image_url'] = url
-                                                            matched = True
-                                                            break
-                                                
-                                                # 5. Try matching color names
-                                                if not matched:
-                                                    color_name = row['color'].lower()
-                                                    for hex_code, url in mockup_data.items():
-                                                        mockup_color_name = hex_to_color_name(hex_code).lower()
-                                                        if mockup_color_name == color_name:
-                                                            standardized_df.at[idx, 'image_url'] = url
-                                                            matched = True
-                                                            break
-                                    except Exception as e:
-                                        print(f"Error matching mockup URL for color {row['color']}: {e}")
+                    st.success("CSV data prepared! Please proceed to the Export page to download the file.")
 
-                        # 5. For generated products, find and set the parent_sku from regular products if possible
-                        if 'parent_id' in export_df.columns:
-                            for idx, row in standardized_df[mask_generated].iterrows():
-                                parent_id = export_df.loc[idx, 'parent_id'] if idx in export_df.index and 'parent_id' in export_df.columns else None
-                                if parent_id and not pd.isna(parent_id):
-                                    # Try to find parent sku in regular products
-                                    parent_product = products_df[products_df['id'] == parent_id]
-                                    if not parent_product.empty and 'item_sku' in parent_product.columns:
-                                        standardized_df.at[idx, 'parent_sku'] = parent_product.iloc[0]['item_sku']
+        # Page anchors let the next query start from an earlier page instead of the first
+        # product; they are only valid for the same filters and catalog contents
+        anchor_filters = (search_term, category_filter, product_type_filter,
+                          st.session_state.items_per_page, get_catalog_version())
+        if st.session_state.get('product_page_anchors', {}).get('filters') != anchor_filters:
+            st.session_state.product_page_anchors = {'filters': anchor_filters, 'pages': {}}
 
-                    # Store the prepared DataFrame in session state for export
-                    # Ensure columns are in the required order
-                    column_order = required_fields + [col for col in standardized_df.columns if col not in required_fields]
-                    st.session_state.export_csv_data = standardized_df[column_order].to_csv(index=False)
+        def query_page(page):
+            """Fetch only the products on a page; search, filters and paging run in SQL"""
+            anchors = st.session_state.product_page_anchors['pages']
+            earlier = [anchor_page for anchor_page in anchors if anchor_page <= page]
+            df, total, anchor = db.query_products(
+                search_term=search_term,
+                category=category_filter,
+                product_type=product_type_filter,
+                page=page,
+                per_page=st.session_state.items_per_page,
+                anchor=anchors[max(earlier)] if earlier else None,
+            )
+            if anchor:
+                anchors[page] = anchor
+            return df, total
 
-                else:
-                    # Empty DataFrame with required columns
-                    empty_df = pd.DataFrame(columns=[
-                        'product_name', 'item_sku', 'parent_child', 'parent_sku',
-                        'size', 'color', 'image_url', 'market_place_title', 'category'
-                    ])
-                    st.session_state.export_csv_data = empty_df.to_csv(index=False)
+        page_df, total_items = query_page(st.session_state.current_page)
+        total_pages = max(1, (total_items + st.session_state.items_per_page - 1) // st.session_state.items_per_page)
 
-                st.success("CSV data prepared! Please proceed to the Export page to download the file.")
+        # Ensure current page is valid, re-querying if the filters shrank the result set
+        if st.session_state.current_page < 1:
+            st.session_state.current_page = 1
+        if st.session_state.current_page > total_pages:
+            st.session_state.current_page = total_pages
+            page_df, total_items = query_page(st.session_state.current_page)
 
-        # Combine DataFrames based on filter selection
-        if product_type_filter == "All":
-            # Combine both dataframes, ensuring they have compatible columns
-            filtered_df = pd.concat([products_df, generated_products_df], ignore_index=True)
-        elif product_type_filter == "Regular":
-            filtered_df = products_df.copy()
-        else:  # Generated
-            filtered_df = generated_products_df.copy()
-
-        # Apply additional filters
-        if not filtered_df.empty:
+        # Apply additional formatting to the current page only
+        if not page_df.empty:
             # Ensure numeric columns have proper data types for regular products
-            if 'price' in filtered_df.columns:
+            if 'price' in page_df.columns:
                 # Convert price to float with error handling
-                filtered_df['price'] = pd.to_numeric(filtered_df['price'], errors='coerce').fillna(0.0)
+                page_df['price'] = pd.to_numeric(page_df['price'], errors='coerce').fillna(0.0)
             
-            if 'quantity' in filtered_df.columns:
+            if 'quantity' in page_df.columns:
                 # Convert quantity to integer with error handling
-                filtered_df['quantity'] = pd.to_numeric(filtered_df['quantity'], errors='coerce').fillna(0).astype(int)
+                page_df['quantity'] = pd.to_numeric(page_df['quantity'], errors='coerce').fillna(0).astype(int)
                 
-            # Expand products with multiple mockup colors into separate rows
+            # Expand products with multiple mockup colors into separate rows, using the
+            # indexed mockup and size tables instead of parsing JSON per row
+            generated_ids = page_df.loc[page_df['product_type'] == 'Generated', 'id'].tolist()
+            mockups_by_product = {
+                product_id: group for product_id, group in db.get_product_mockups(generated_ids).groupby('product_id')
+            }
+            sizes_by_product = {
+                product_id: group['size'].tolist() for product_id, group in db.get_product_sizes(generated_ids).groupby('product_id')
+            }
+            
             expanded_rows = []
-            for idx, row in filtered_df.iterrows():
-                if row.get('product_type') == 'Generated' and 'mockup_urls' in row and row['mockup_urls']:
-                    try:
-                        # Parse mockup_urls JSON
-                        mockup_data = row['mockup_urls']
-                        if isinstance(mockup_data, str) and (mockup_data.startswith('{') or mockup_data.startswith('[')):
-                            mockup_json = json.loads(mockup_data)
-                            
-                            if isinstance(mockup_json, dict) and len(mockup_json) > 0:
-                                # Create a separate row for each color
-                                for color_code, mockup_url in mockup_json.items():
-                                    new_row = row.copy()
-                                    friendly_color = hex_to_color_name(color_code)
-                                    
-                                    # Add color-specific information to row
-                                    new_row['current_color'] = color_code
-                                    new_row['color_name'] = friendly_color
-                                    new_row['current_mockup_url'] = mockup_url
-                                    
-                                    # Also expand for sizes if available
-                                    if 'size' in row and row['size']:
-                                        try:
-                                            size_data = row['size']
-                                            if isinstance(size_data, str) and (size_data.startswith('[') or size_data.startswith('{')):
-                                                size_json = json.loads(size_data)
-                                                if isinstance(size_json, list) and len(size_json) > 0:
-                                                    for size in size_json:
-                                                        size_row = new_row.copy()
-                                                        size_value = size
-                                                        if isinstance(size, dict) and 'name' in size:
-                                                            size_value = size['name']
-                                                        size_row['current_size'] = size_value
-                                                        expanded_rows.append(size_row)
-                                                    continue  # Skip adding the non-sized row
-                                        except Exception as e:
-                                            print(f"Error processing sizes: {e}")
-                                    
-                                    expanded_rows.append(new_row)
-                                continue  # Skip adding the original row
-                            elif isinstance(mockup_json, list) and len(mockup_json) > 0:
-                                # For array format, create a separate row for each mockup
-                                for i, mockup_url in enumerate(mockup_json):
-                                    new_row = row.copy()
-                                    new_row['current_mockup_url'] = mockup_url
-                                    new_row['mockup_variant'] = i + 1
-                                    expanded_rows.append(new_row)
-                                continue  # Skip adding the original row
-                    except Exception as e:
-                        st.error(f"Error parsing mockup URLs: {e}")
+            for idx, row in page_df.iterrows():
+                mockups = mockups_by_product.get(row['id']) if row.get('product_type') == 'Generated' else None
+                if mockups is not None:
+                    sizes = sizes_by_product.get(row['id'], [])
+                    for variant, mockup in enumerate(mockups.itertuples(index=False), start=1):
+                        new_row = row.copy()
+                        new_row['current_mockup_url'] = mockup.s3_url
+                        new_row['current_thumbnail_url'] = mockup.thumbnail_url
+                        
+                        if mockup.color_hex is None:
+                            # Legacy mockups without color information
+                            new_row['mockup_variant'] = variant
+                            expanded_rows.append(new_row)
+                            continue
+                        
+                        # Add color-specific information to row
+                        new_row['current_color'] = mockup.color_hex
+                        new_row['color_name'] = hex_to_color_name(mockup.color_hex)
+                        
+                        # Also expand for sizes if available
+                        for size in sizes:
+                            size_row = new_row.copy()
+                            size_row['current_size'] = size
+                            expanded_rows.append(size_row)
+                        if not sizes:
+                            expanded_rows.append(new_row)
+                    continue  # Skip adding the original row
                 
                 # Add original row if not expanded
                 expanded_rows.append(row)
                 
-            # Replace filtered_df with expanded version
-            if expanded_rows:
-                filtered_df = pd.DataFrame(expanded_rows)
-
-        # Search filter
-        if search_term:
-            # Ensure search works regardless of which product type
-            search_columns = ['product_name', 'item_sku']
+            # Pages count rows, so drop rows of the first and last products that
+            # belong to the neighbouring pages
+            skip = max(0, (st.session_state.current_page - 1) * st.session_state.items_per_page - int(page_df['row_start'].iloc[0]))
+            expanded_rows = expanded_rows[skip:skip + st.session_state.items_per_page]
             
-            # Build search mask dynamically based on available columns
-            search_mask = pd.Series(False, index=filtered_df.index)
-            for col in search_columns:
-                if col in filtered_df.columns:
-                    search_mask |= filtered_df[col].str.contains(search_term, case=False, na=False)
-            filtered_df = filtered_df[search_mask]
-
-        # Category filter
-        if category_filter != "All" and not filtered_df.empty and 'category' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['category'] == category_filter]
+            # Replace page_df with expanded version
+            if expanded_rows:
+                page_df = pd.DataFrame(expanded_rows)
 
         # Display products
-        if filtered_df.empty:
+        if page_df.empty:
             st.info("No products found matching your criteria.")
         else:
-            # Calculate pagination values
-            total_items = len(filtered_df)
-            total_pages = (total_items + st.session_state.items_per_page - 1) // st.session_state.items_per_page
-            
-            # Ensure current page is valid
-            if st.session_state.current_page > total_pages:
-                st.session_state.current_page = total_pages
-            if st.session_state.current_page < 1:
-                st.session_state.current_page = 1
-            
-            # Calculate start and end indices for current page
+            # Calculate start and end indices for the page information line
             start_idx = (st.session_state.current_page - 1) * st.session_state.items_per_page
             end_idx = min(start_idx + st.session_state.items_per_page, total_items)
             
-            # Get products for the current page
-            page_df = filtered_df.iloc[start_idx:end_idx]
-            
             # Display custom product table with image, title, and action columns
             st.subheader("Products")
             
@@ -802,6 +397,17 @@ elif st.session_state.get("authentication_status") is True:
             # Add separator line
             st.markdown("<hr style='margin-top: 0; margin-bottom: 10px;'>", unsafe_allow_html=True)
             
+            # Resolve thumbnails for the whole page up front so rows don't wait on each lookup
+            thumbnail_sources = []
+            for column in ['current_mockup_url', 'image_url', 'original_design_url']:
+                if column in page_df.columns:
+                    thumbnail_sources.extend(page_df[column].dropna().tolist())
+            if 'current_thumbnail_url' in page_df.columns:
+                # Rows with a stored thumbnail need no lookup
+                stored_urls = set(page_df.loc[page_df['current_thumbnail_url'].notna(), 'current_mockup_url'])
+                thumbnail_sources = [url for url in thumbnail_sources if url not in stored_urls]
+            prefetch_thumbnails(thumbnail_sources, 70)
+            
             # Iterate through products and display in rows
             for idx, row in page_df.iterrows():
                 product_id = row['id']
@@ -822,7 +428,9 @@ elif st.session_state.get("authentication_status") is True:
                         
                         # If we've already expanded this row by color, use the specific mockup URL
                         if 'current_mockup_url' in row and row['current_mockup_url']:
-                            st.image(row['current_mockup_url'], width=70, 
+                            stored_thumbnail = row.get('current_thumbnail_url')
+                            thumbnail = stored_thumbnail if isinstance(stored_thumbnail, str) and stored_thumbnail else get_thumbnail_url(row['current_mockup_url'], 70)
+                            st.image(thumbnail, width=70, 
                                      caption=f"{row['color_name'] if 'color_name' in row else ''}")
                         else:
                             # Use existing logic for rows that haven't been expanded
@@ -846,13 +454,13 @@ elif st.session_state.get("authentication_status") is True:
                                         friendly_color = hex_to_color_name(selected_color)
                                         
                                         # Display just one image with color info
-                                        st.image(url, width=70, caption=f"{friendly_color}")
+                                        st.image(get_thumbnail_url(url, 70), width=70, caption=f"{friendly_color}")
                                     elif isinstance(mockup_data, list) and len(mockup_data) > 0:
                                         # For list type mockups, select one based on index
                                         list_idx = idx % len(mockup_data)
-                                        st.image(mockup_data[list_idx], width=70)
+                                        st.image(get_thumbnail_url(mockup_data[list_idx], 70), width=70)
                                 else:
-                                    st.image(row[image_field], width=70)
+                                    st.image(get_thumbnail_url(row[image_field], 70), width=70)
                             except Exception as e:
                                 st.error(f"Error parsing mockup URL: {e}")
                                 st.markdown("📷 *Invalid mockup data*")
@@ -864,7 +472,7 @@ elif st.session_state.get("authentication_status") is True:
                             image_url = row[image_field]
                             # Ensure image_url is a valid string before displaying
                             if image_url and isinstance(image_url, str):
-                                st.image(image_url, width=70)
+                                st.image(get_thumbnail_url(image_url, 70), width=70)
                             else:
                                 st.markdown("📷 *Invalid image URL*")
                         else:
@@ -1,10 +1,9 @@
 import streamlit as st
 import pandas as pd
-import json
-import io  # Add this import
+import os
 from utils.database import get_database_connection
-from utils.export import export_to_csv
-from utils.color_utils import hex_to_color_name  # Import the new function
+from utils.product_cache import get_cached_products, get_cached_generated_products
+from utils.export import EXPORT_PREVIEW_ROWS, export_to_csv, expand_products_for_export, build_marketplace_titles, match_mockup_urls
 import datetime
 import yaml
 from yaml.loader import SafeLoader
@@ -43,10 +42,15 @@ elif st.session_state.get("authentication_status") is True:
     export_df = pd.DataFrame()
 
     # Check if we have data from Product List page or need to load from database
-    if 'export_csv_data' in st.session_state:
-        # Use CSV data from session state (prepared in Product List page)
+    # Export file prepared on the Product List page, if it is still on disk
+    export_csv_path = st.session_state.get('export_csv_path')
+    if export_csv_path and not os.path.exists(export_csv_path):
+        export_csv_path = None
+
+    if export_csv_path:
+        # Use the CSV file prepared in Product List page; only the first rows are loaded for the preview
         st.info("Using product data prepared from Product List page.")
-        products_df = pd.read_csv(io.StringIO(st.session_state.export_csv_data))
+        products_df = pd.read_csv(export_csv_path, nrows=EXPORT_PREVIEW_ROWS)
         
         # Display preview directly without filtering
         st.subheader("Preview Export Data")
@@ -64,12 +68,15 @@ elif st.session_state.get("authentication_status") is True:
             use_container_width=True
         )
         
-        st.write(f"Found {len(products_df)} products ready for export.")
+        export_rows = st.session_state.get('export_csv_rows', len(products_df))
+        if export_rows > len(products_df):
+            st.caption(f"Showing the first {len(products_df)} rows.")
+        st.write(f"Found {export_rows} products ready for export.")
         export_df = products_df
     else:
-        # Get all products from database
-        products_df = db.get_all_products()
-        generated_products_df = db.get_all_generated_products()
+        # Get all products, applying only the changes since the last rerun
+        products_df = get_cached_products(db)
+        generated_products_df = get_cached_generated_products(db)
         
         # Combine datasets with a product type indicator
         if not products_df.empty:
@@ -182,72 +189,8 @@ elif st.session_state.get("authentication_status") is True:
             # Warning: Export from this page will be simpler than from the Product List page
             st.warning("For best results with mockups separated by color, use the 'Generate CSV' button on the Product List page first.")
             
-            # Process for database-loaded data, as Product List has more advanced processing
-            # Define function to extract mockup URLs from JSON and create color-specific entries
-            def process_mockups_by_color(row_data):
-                """Extract mockup URLs from JSON and create individual entries for each color"""
-                if 'mockup_urls' not in row_data or pd.isna(row_data['mockup_urls']) or not row_data['mockup_urls']:
-                    return [row_data]
-                
-                try:
-                    mockup_data = row_data['mockup_urls']
-                    if isinstance(mockup_data, str) and (mockup_data.startswith('[') or mockup_data.startswith('{')):
-                        mockup_json = json.loads(mockup_data)
-                        
-                        # Handle dictionary format: {"#color1": "url1", "#color2": "url2"}
-                        if isinstance(mockup_json, dict) and len(mockup_json) > 0:
-                            result_rows = []
-                            
-                            for color_code, mockup_url in mockup_json.items():
-                                new_row = row_data.copy()
-                                
-                                # Set the image_url to this specific mockup URL
-                                new_row['image_url'] = mockup_url
-                                
-                                # Convert hex to friendly color name
-                                color_name = hex_to_color_name(color_code)
-                                
-                                # Set color value for this mockup
-                                new_row['colour'] = color_name
-                                new_row['color'] = color_name
-                                
-                                # Store original hex code for matching purposes
-                                new_row['original_hex'] = color_code.replace("#", "") if color_code.startswith("#") else color_code
-                                
-                                result_rows.append(new_row)
-                            
-                            return result_rows
-                            
-                        # Handle array format: ["url1", "url2"]
-                        elif isinstance(mockup_json, list) and len(mockup_json) > 0:
-                            # For array format, we'll just use the first URL
-                            # since we don't have color information
-                            row_data['image_url'] = mockup_json[0]
-                            return [row_data]
-                except Exception as e:
-                    print(f"Error processing mockups: {e}")
-                
-                # Default: return the original row
-                return [row_data]
-
-            # Process data for CSV formatting - process mockups intelligently
-            export_rows = []
-            
-            for idx, row in filtered_df.iterrows():
-                product_row = row.copy()
-                
-                # For generated products with mockups, handle them specially
-                if product_row.get('product_type') == 'Generated' and 'mockup_urls' in product_row and not pd.isna(product_row['mockup_urls']) and product_row['mockup_urls']:
-                    # Process mockups by color
-                    color_rows = process_mockups_by_color(product_row.to_dict())
-                    export_rows.extend(color_rows)
-                else:
-                    # Process size and color values as in the original code
-                    # ...existing code for handling size and color...
-                    export_rows.append(product_row.to_dict())
-            
-            # Convert the rows back to a DataFrame
-            export_df = pd.DataFrame(export_rows)
+            # Generated products with mockups get one row per mockup color
+            export_df = expand_products_for_export(filtered_df, split_variants=False)
             
             # Ensure required fields exist and add special handling for generated products
             required_fields = [
@@ -283,73 +226,33 @@ elif st.session_state.get("authentication_status") is True:
                     export_df.loc[mask_parent_generated, 'item_sku'] = ''
                     
                 # Set market_place_title for generated products
-                for idx, row in export_df[mask_generated].iterrows():
-                    product_name = row['product_name'] if not pd.isna(row['product_name']) else ''
-                    size = row['size'] if not pd.isna(row['size']) and row['size'] else ''
-                    color = row['color'] if not pd.isna(row['color']) and row['color'] else ''
-                    
-                    # Build marketplace title with available information
-                    title_parts = [part for part in [product_name, size, color] if part]
-                    marketplace_title = ' - '.join(title_parts)
-                    export_df.at[idx, 'market_place_title'] = marketplace_title
+                if any(mask_generated):
+                    export_df.loc[mask_generated, 'market_place_title'] = build_marketplace_titles(export_df[mask_generated])
 
             # Fix for the filtered data export to properly match color-specific mockups
-            if 'export_csv_data' not in st.session_state and not export_df.empty:
+            if not export_df.empty:
                 # For generated products with colors, ensure the image_url matches the color
                 if 'product_type' in export_df.columns and 'color' in export_df.columns and 'mockup_urls' in export_df.columns:
                     # Get all generated products with mockup_urls
                     mask_generated_with_mockups = (export_df['product_type'] == 'Generated') & (~export_df['mockup_urls'].isna()) & (export_df['mockup_urls'] != '')
                     
-                    # Process each row to match color with the correct mockup URL
-                    for idx, row in export_df[mask_generated_with_mockups].iterrows():
-                        try:
-                            # Get the color for this row
-                            color = row['color'] if not pd.isna(row['color']) else None
-                            if not color:
-                                continue
-                                
-                            # Parse the mockup_urls JSON
-                            if not pd.isna(row['mockup_urls']) and row['mockup_urls']:
-                                mockup_data = row['mockup_urls']
-                                if isinstance(mockup_data, str) and mockup_data.startswith('{'):
-                                    mockup_json = json.loads(mockup_data)
-                                    
-                                    # Try to find matching color in the mockup_urls (different formats)
-                                    # First try direct color name match if mockup_urls contains color names
-                                    if color in mockup_json:
-                                        export_df.at[idx, 'image_url'] = mockup_json[color]
-                                        continue
-                                        
-                                    # Try with # prefix
-                                    hex_color = f"#{color}" if not color.startswith('#') else color
-                                    if hex_color in mockup_json:
-                                        export_df.at[idx, 'image_url'] = mockup_json[hex_color]
-                                        continue
-                                    
-                                    # Try without # prefix
-                                    plain_color = color.replace('#', '')
-                                    if plain_color in mockup_json:
-                                        export_df.at[idx, 'image_url'] = mockup_json[plain_color]
-                                        continue
-                                        
-                                    # If no direct match, look for a color name match
-                                    # Convert each hex to color name and compare
-                                    for hex_code, url in mockup_json.items():
-                                        mockup_color_name = hex_to_color_name(hex_code)
-                                        if mockup_color_name.lower() == color.lower():
-                                            export_df.at[idx, 'image_url'] = url
-                                            break
-                        except Exception as e:
-                            print(f"Error matching mockup URL for color {color}: {e}")
+                    # Match each row's color with the correct mockup URL
+                    if any(mask_generated_with_mockups):
+                        matched = match_mockup_urls(
+                            export_df.loc[mask_generated_with_mockups, 'color'],
+                            export_df.loc[mask_generated_with_mockups, 'mockup_urls']
+                        )
+                        matched = matched.dropna()
+                        export_df.loc[matched.index, 'image_url'] = matched
 
     # Export button
     if not export_df.empty:
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         export_filename = f"product_export_{timestamp}.csv"
         
-        # Prepare CSV data - either from existing session state or by generating new
-        if 'export_csv_data' in st.session_state:
-            csv_data = st.session_state.export_csv_data
+        # Prepare CSV data - either from the prepared export file or by generating new
+        if export_csv_path:
+            csv_data = None
         else:
             # Keep only required fields + any additional useful ones
             all_fields = required_fields + [col for col in export_df.columns if col not in required_fields]
@@ -358,13 +261,31 @@ elif st.session_state.get("authentication_status") is True:
         
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
-            st.download_button(
-                label="📥 Download CSV",
-                data=csv_data,
-                file_name=export_filename,
-                mime="text/csv",
-                use_container_width=True
-            )
+            if export_csv_path:
+                # The download button loads the whole file into memory, so only build it
+                # on request and drop it again once the file has been downloaded
+                if st.session_state.get('export_download_path') != export_csv_path:
+                    if st.button("📦 Prepare download", use_container_width=True):
+                        st.session_state.export_download_path = export_csv_path
+                        st.rerun()
+                else:
+                    with open(export_csv_path, 'rb') as export_file:
+                        st.download_button(
+                            label="📥 Download CSV",
+                            data=export_file,
+                            file_name=export_filename,
+                            mime="text/csv",
+                            use_container_width=True,
+                            on_click=lambda: st.session_state.pop('export_download_path', None)
+                        )
+            else:
+                st.download_button(
+                    label="📥 Download CSV",
+                    data=csv_data,
+                    file_name=export_filename,
+                    mime="text/csv",
+                    use_container_width=True
+                )
 
     # Show export format info
     st.subheader("Export Format Information")
@@ -1,12 +1,16 @@
 import streamlit as st
 import os
-import requests
 import json
-import random
-import string
+import time
+import uuid
 from dotenv import load_dotenv
 from utils.database import get_database_connection
-from utils.s3_storage import upload_image_file_to_s3, check_s3_connection
+from utils.http_client import http_head
+from utils.sku_allocator import allocate_skus, is_reserved_by, reserve_skus, release_skus
+from utils.product_cache import get_cached_products
+from utils.s3_storage import upload_image_file_to_s3, check_s3_connection, transfer_mockups_to_s3, get_thumbnail_url
+from utils.dynamic_mockups import generate_mockup_api_call, render_mockups, cache_rendered_mockup
+from utils.render_jobs import RENDER_QUEUE_ENABLED, RENDER_QUEUE_POLL_INTERVAL, enqueue_mockup_renders, get_batch_progress, batch_to_mockup_results
 import yaml
 from yaml.loader import SafeLoader
 import streamlit_authenticator as stauth
@@ -70,10 +74,19 @@ elif st.session_state.get("authentication_status") is True:
         if sizes and len(sizes) > 0:
             sku += f"{len(sizes)}-"
         
-        # Add a random alphanumeric string to ensure uniqueness
-        sku += ''.join(random.choice(string.ascii_uppercase + string.digits) for _ in range(4))
+        # Reruns with the same prefix keep this session's reserved SKU; a new prefix releases it
+        owner = st.session_state.get('sku_owner')
+        reservation = st.session_state.get('design_sku_reservation')
+        if reservation:
+            if reservation['prefix'] == sku and is_reserved_by(reservation['sku'], owner):
+                return reservation['sku']
+            release_skus([reservation['sku']])
         
-        return sku
+        # Add a random alphanumeric string, reserved so no other product gets the same SKU
+        allocated = allocate_skus(get_database_connection(), [sku], owner=owner)[0]
+        st.session_state.design_sku_reservation = {'prefix': sku, 'sku': allocated} if allocated else None
+        
+        return allocated or ""
 
     # Function to update the SKU based on current inputs
     def update_design_sku():
@@ -98,6 +111,10 @@ elif st.session_state.get("authentication_status") is True:
 
     db = get_database_connection()
 
+    # Identifies this session's SKU reservations
+    if 'sku_owner' not in st.session_state:
+        st.session_state.sku_owner = uuid.uuid4().hex
+
     # Initialize session state for delete confirmation
     if 'confirm_delete' not in st.session_state:
         st.session_state.confirm_delete = False
@@ -106,8 +123,8 @@ elif st.session_state.get("authentication_status") is True:
     if 'mockup_results' not in st.session_state:
         st.session_state.mockup_results = None
 
-    # Get all products from database
-    products_df = db.get_all_products()
+    # Get all products, applying only the changes since the last rerun
+    products_df = get_cached_products(db)
     print("Products DataFrame:", products_df)
 
     # Initialize session state for selected product
@@ -146,7 +163,7 @@ elif st.session_state.get("authentication_status") is True:
         # Format validation - make sure the URL is accessible
         try:
             # Check if the image URL is accessible
-            image_check = requests.head(image_url)
+            image_check = http_head(image_url)
             if image_check.status_code != 200:
                 st.error(f"Image URL is not accessible: {image_url}")
                 st.error(f"Status code: {image_check.status_code}")
@@ -155,57 +172,23 @@ elif st.session_state.get("authentication_status") is True:
             st.error(f"Error validating image URL: {e}")
             return []
         
-        # Generate mockups for each color
+        # Render all colors concurrently; results come back in color order
+        jobs = [
+            {
+                'image_url': image_url,
+                'color': color,
+                'mockup_id': MOCKUP_UUID,
+                'smart_object_uuid': SMART_OBJECT_UUID
+            }
+            for color in colors
+        ]
         mockup_results = []
         
-        for color in colors:
-            # Create request data according to API documentation format
-            request_data = {
-                "mockup_uuid": MOCKUP_UUID,
-                "smart_objects": [
-                    {
-                        "uuid": SMART_OBJECT_UUID,
-                        "color": color,  # For colored objects
-                        "asset": {
-                            "url": image_url  # Image URL nested inside the asset object
-                        }
-                    }
-                ],
-                "format": "png",
-                "width": 1500,
-                "transparent_background": True
-            }        
-            try:
-                response = requests.post(
-                    'https://app.dynamicmockups.com/api/v1/renders',
-                    json=request_data,
-                    headers={
-                        'Content-Type': 'application/json',
-                        'Accept': 'application/json',
-                        'x-api-key': os.getenv('DYNAMIC_MOCKUPS_API_KEY'),
-                    },
-                )
-                
-                if response.status_code != 200:
-                    st.error(f"API returned error status: {response.status_code}")
-                    st.error(f"Response content: {response.text}")
-                    continue
-                    
-                result = response.json()
-                
-                # Get the rendered image URL from the response
-                if 'data' in result and 'export_path' in result['data']:
-                    # Create a mockup result with the expected key
-                    mockup_data = {
-                        'rendered_image_url': result['data']['export_path'],
-                        'color': color
-                    }
-                    mockup_results.append(mockup_data)
-                else:
-                    st.error("Expected 'data.export_path' in API response but it was not found")
-                    
-            except Exception as e:
-                st.error(f"Error generating mockup: {e}")
+        for job, mockup_data in zip(jobs, render_mockups(jobs)):
+            if mockup_data:
+                mockup_results.append(mockup_data)
+            else:
+                st.error(f"Failed to generate mockup for color {job['color']}")
         
         return mockup_results
 
@@ -405,74 +388,24 @@ elif st.session_state.get("authentication_status") is True:
         Returns:
             dict: Mockup data if successful, None otherwise
         """
-        # Use provided IDs or fall back to defaults
-        MOCKUP_UUID = mockup_id or "db90556b-96a3-483c-ba88-557393b992a1"
-        SMART_OBJECT_UUID = smart_object_uuid or "fb677f24-3dce-4d53-b024-26ea52ea43c9"
+        mockup_data = generate_mockup_api_call(image_url, color, mockup_id, smart_object_uuid)
         
-        try:
-            # Create request data according to API documentation format
-            request_data = {
-                "mockup_uuid": MOCKUP_UUID,
-                "smart_objects": [
-                    {
-                        "uuid": SMART_OBJECT_UUID,
-                        "color": color,  # For colored objects
-                        "asset": {
-                            "url": image_url  # Image URL nested inside the asset object
-                        }
-                    }
-                ],
-                "format": "png",
-                "width": 1500,
-                "transparent_background": True
-            }
-            
-            response = requests.post(
-                'https://app.dynamicmockups.com/api/v1/renders',
-                json=request_data,
-                headers={
-                    'Content-Type': 'application/json',
-                    'Accept': 'application/json',
-                    'x-api-key': os.getenv('DYNAMIC_MOCKUPS_API_KEY'),
-                },
-            )
-            
-            if response.status_code != 200:
-                st.error(f"API returned error status: {response.status_code}")
-                st.error(f"Response content: {response.text}")
-                return None
-                
-            result = response.json()
-            
-            # Get the rendered image URL from the response
-            if 'data' in result and 'export_path' in result['data']:
-                mockup_data = {
-                    'rendered_image_url': result['data']['export_path'],
-                    'color': color
-                }
-                return mockup_data
-            else:
-                st.error("Expected 'data.export_path' in API response but it was not found")
-                return None
-                
-        except Exception as e:
-            st.error(f"Error generating mockup: {e}")
+        if not mockup_data:
+            st.error(f"Failed to generate mockup for color {color}")
             return None
+        
+        return mockup_data
 
-    def generate_all_mockups(image_url, colors):
+    def get_selected_templates(colors):
         """
-        Generate mockups for all selected mockups
+        Get the mockup templates of the selected product
         
         Args:
-            image_url (str): URL of the image uploaded to S3
-            colors (list): List of colors for the mockups in hex format
+            colors (list): Colors that will be rendered, for the summary message
             
         Returns:
-            list: List of mockup data for all generated mockups
+            list: (mockup_id, smart_object_uuid) pairs, skipping templates without an ID
         """
-        import time
-        
-        all_results = []
         mockup_ids = st.session_state.mockup_ids if hasattr(st.session_state, 'mockup_ids') else []
         smart_object_uuids = st.session_state.smart_object_uuids if hasattr(st.session_state, 'smart_object_uuids') else []
         
@@ -482,10 +415,6 @@ elif st.session_state.get("authentication_status") is True:
             st.error("No mockup templates available. Please select a product with mockup templates.")
             return []
         
-        # Create a progress bar and status text
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
         # Debug info
         st.info(f"Processing {total_mockups} mockup templates with {len(colors)} colors each")
         st.write(f"Mockup IDs: {mockup_ids}")
@@ -496,48 +425,162 @@ elif st.session_state.get("authentication_status") is True:
             st.warning(f"Not enough smart object UUIDs ({len(smart_object_uuids)}) for all mockups ({total_mockups}). Some will use default smart objects.")
             smart_object_uuids = smart_object_uuids + [None] * (total_mockups - len(smart_object_uuids))
         
-        # Loop through each mockup ID and smart object UUID pair
-        mockup_count = 0
-        total_progress_steps = total_mockups * len(colors)
-        
+        # Skip invalid mockup IDs
+        templates = []
         for i, (mockup_id, smart_object_uuid) in enumerate(zip(mockup_ids, smart_object_uuids)):
-            # Update progress for this mockup
-            progress = (i / total_mockups)
-            progress_bar.progress(progress)
-            status_text.text(f"Processing mockup template {i+1} of {total_mockups}: {mockup_id}")
-            
-            # Skip invalid mockup IDs
             if not mockup_id:
                 st.warning(f"Skipping mockup {i+1} because no valid mockup ID was found.")
                 continue
+            templates.append((mockup_id, smart_object_uuid))
+        
+        return templates
+
+    def load_mockup_results(all_mockup_results, product_details):
+        """
+        Keep generated mockups in session state until they are saved
+        
+        Args:
+            all_mockup_results (list): Mockup data grouped by template
+            product_details (dict): Design name, marketplace title, SKU, sizes,
+                colors and original design URL to save them with
+        """
+        st.session_state.mockup_results_all = all_mockup_results
+        
+        # For backwards compatibility, set the first mockup result as the current one
+        if all_mockup_results and 'results' in all_mockup_results[0]:
+            # Create a dictionary mapping hex colors to their rendered URLs for easier lookup
+            mockup_dict = {mockup['color']: mockup['rendered_image_url'] 
+                        for mockup in all_mockup_results[0]['results']}
+            st.session_state.mockup_results = mockup_dict
+        
+        # Store the selected product details to save later
+        st.session_state.product_data_to_save = dict(product_details, all_mockup_results=all_mockup_results)
+
+    def show_render_batch_status():
+        """
+        Follow the queued render batch until the worker finishes it, then load its mockups
+        
+        Without a batch in progress, lists recent batches so one queued before
+        a page refresh or restart can be picked up again.
+        """
+        batch_id = st.session_state.get('render_batch_id')
+        if not batch_id:
+            recent_batches = db.get_render_batches(owner=st.session_state.get("username"), limit=5)
+            if recent_batches:
+                with st.expander("Recent render batches"):
+                    for recent in recent_batches:
+                        batch_col, open_col = st.columns([3, 1])
+                        batch_col.write(
+                            f"{recent['created_at']}: {recent['done']} of {recent['total']} rendered, "
+                            f"{recent['failed']} failed, {recent['pending']} waiting"
+                        )
+                        if open_col.button("Open", key=f"open_render_batch_{recent['batch_id']}"):
+                            st.session_state.render_batch_id = recent['batch_id']
+                            st.rerun()
+            return
+        
+        batch = db.get_render_batch(batch_id)
+        if batch is None:
+            st.error("Could not load the queued render batch.")
+            st.session_state.render_batch_id = None
+            return
+        
+        progress = get_batch_progress(batch)
+        finished_jobs = progress['done'] + progress['failed'] + progress['cancelled']
+        st.progress(finished_jobs / progress['total'] if progress['total'] else 1.0)
+        st.caption(
+            f"Render queue: {progress['done']} done, {progress['running']} rendering, "
+            f"{progress['queued']} waiting, {progress['failed']} failed, {progress['cancelled']} cancelled"
+        )
+        
+        if not progress['finished']:
+            if st.button("Cancel waiting renders", key="cancel_render_batch"):
+                db.cancel_render_batch(batch_id)
+                st.rerun()
+            # Renders continue in the worker even if this page is closed
+            time.sleep(RENDER_QUEUE_POLL_INTERVAL)
+            st.rerun()
+        
+        if progress['failed'] or progress['cancelled']:
+            st.warning(f"{progress['failed'] + progress['cancelled']} of {progress['total']} mockups were not rendered.")
+            if st.button("Retry failed renders", key="retry_render_batch"):
+                db.retry_render_batch(batch_id)
+                st.session_state.loaded_render_batch_id = None
+                st.rerun()
+        
+        if st.session_state.get('loaded_render_batch_id') == batch_id:
+            return
+        st.session_state.loaded_render_batch_id = batch_id
+        
+        all_mockup_results = batch_to_mockup_results(batch)
+        if not all_mockup_results:
+            st.error("Failed to generate any mockups. See the render worker log for details.")
+            st.session_state.mockup_results = None
+            return
+        
+        context = batch['context'] or {}
+        # Keep the SKU reservation made by the session that queued the batch
+        if context.get('sku_owner'):
+            st.session_state.sku_owner = context['sku_owner']
+        st.session_state.uploaded_image_url = context.get('original_design_url')
+        st.session_state.original_design_url = context.get('original_design_url')
+        load_mockup_results(all_mockup_results, {
+            key: context.get(key)
+            for key in ("design_name", "marketplace_title", "design_sku", "sizes", "colors", "original_design_url")
+        })
+        
+        total_mockups = sum(len(result['results']) for result in all_mockup_results)
+        st.success(f"✅ Generated {total_mockups} mockups for {len(all_mockup_results)} templates successfully!")
+
+    def generate_all_mockups(image_url, colors):
+        """
+        Generate mockups for all selected mockups
+        
+        Args:
+            image_url (str): URL of the image uploaded to S3
+            colors (list): List of colors for the mockups in hex format
             
-            st.info(f"Generating mockups for template {i+1}: {mockup_id} with smart object: {smart_object_uuid}")
-            
-            # Generate the mockups for this template with all selected colors
+        Returns:
+            list: List of mockup data for all generated mockups
+        """
+        all_results = []
+        templates = get_selected_templates(colors)
+        if not templates:
+            return []
+        
+        # Create a progress bar and status text
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+        
+        # Build one render job per template and color, then render them concurrently
+        jobs = [
+            {
+                'image_url': image_url,
+                'color': color,
+                'mockup_id': mockup_id,
+                'smart_object_uuid': smart_object_uuid
+            }
+            for mockup_id, smart_object_uuid in templates
+            for color in colors
+        ]
+        
+        def on_progress(completed, total, job, result):
+            progress_bar.progress(min(completed / total, 1.0))
+            status_text.text(f"Rendered {completed} of {total} mockups (template {job['mockup_id']}, color {job['color']})")
+        
+        rendered = render_mockups(jobs, progress_callback=on_progress)
+        
+        # Group results by template, keeping the selected color order
+        mockup_count = 0
+        for t, (mockup_id, smart_object_uuid) in enumerate(templates):
             mockup_results = []
             for j, color in enumerate(colors):
-                sub_status = st.empty()
-                sub_status.text(f"Generating color {j+1}/{len(colors)}: {color}")
-                
-                # Create request data for this specific mockup ID, smart object UUID, and color
-                result = generate_single_mockup(
-                    image_url,
-                    color,
-                    mockup_id=mockup_id,
-                    smart_object_uuid=smart_object_uuid
-                )
-                
+                result = rendered[t * len(colors) + j]
                 if result:
                     mockup_results.append(result)
                     mockup_count += 1
                 else:
                     st.warning(f"Failed to generate mockup for template {mockup_id} with color {color}")
-                
-                # Update progress including color progress
-                current_progress = (i * len(colors) + j + 1) / total_progress_steps
-                progress_bar.progress(min(current_progress, 1.0))
-                
-                sub_status.empty()
             
             # Add results for this mockup ID if any were generated
             if mockup_results:
@@ -834,46 +877,72 @@ elif st.session_state.get("authentication_status") is True:
                                 # Success! Show the uploaded image URL
                                 st.success("✅ Image uploaded to S3")
                         
-                                # Step 2: Generate mockups for all selected mockups
-                                with st.spinner("Generating mockups for all templates..."):
-                                    # Convert color names to hex format
-                                    color_hex_list = [color_name_to_hex(color) for color in selected_colors]
-                                    
-                                    # Generate all mockups
-                                    all_mockup_results = generate_all_mockups(image_url, color_hex_list)
+                                # Convert color names to hex format
+                                color_hex_list = [color_name_to_hex(color) for color in selected_colors]
+                                
+                                if RENDER_QUEUE_ENABLED:
+                                    # Step 2: Queue the renders for the worker; progress is polled below
+                                    templates = get_selected_templates(color_hex_list)
+                                    batch_id = None
+                                    if templates:
+                                        batch_id = enqueue_mockup_renders(
+                                            db,
+                                            image_url,
+                                            color_hex_list,
+                                            templates,
+                                            owner=st.session_state.get("username"),
+                                            context={
+                                                "design_name": design_name,
+                                                "marketplace_title": marketplace_title,
+                                                "design_sku": update_design_sku(),
+                                                "sizes": sizes,
+                                                "colors": colors,
+                                                "original_design_url": image_url,
+                                                "sku_owner": st.session_state.sku_owner
+                                            }
+                                        )
+                                    if batch_id:
+                                        st.session_state.render_batch_id = batch_id
+                                        st.session_state.loaded_render_batch_id = None
+                                        st.session_state.mockup_results_all = []
+                                        st.session_state.mockup_results = None
+                                        st.session_state.product_data_to_save = None
+                                        st.success(f"✅ Queued {len(templates) * len(color_hex_list)} mockups for rendering")
+                                    elif templates:
+                                        st.error("Failed to queue mockups for rendering. Check the database connection.")
+                                
+                                else:
+                                    # Step 2: Generate mockups for all selected mockups
+                                    with st.spinner("Generating mockups for all templates..."):
+                                        # Generate all mockups
+                                        all_mockup_results = generate_all_mockups(image_url, color_hex_list)
                                     
-                                    # Store the mockup results in session state
-                                    if all_mockup_results:
-                                        st.session_state.mockup_results_all = all_mockup_results
+                                        # Store the mockup results in session state
+                                        if all_mockup_results:
+                                            # Make sure we have the latest SKU
+                                            current_sku = update_design_sku()
                                         
-                                        # For backwards compatibility, set the first mockup result as the current one
-                                        if all_mockup_results and 'results' in all_mockup_results[0]:
-                                            # Create a dictionary mapping hex colors to their rendered URLs for easier lookup
-                                            mockup_dict = {mockup['color']: mockup['rendered_image_url'] 
-                                                        for mockup in all_mockup_results[0]['results']}
-                                            st.session_state.mockup_results = mockup_dict
+                                            # Store the selected product details to save later
+                                            load_mockup_results(all_mockup_results, {
+                                                "design_name": design_name,
+                                                "marketplace_title": marketplace_title,
+                                                "design_sku": current_sku,
+                                                "sizes": sizes,
+                                                "colors": colors,
+                                                "original_design_url": image_url
+                                            })
                                         
-                                        # Make sure we have the latest SKU
-                                        current_sku = update_design_sku()
-                                        
-                                        # Store the selected product details to save later
-                                        st.session_state.product_data_to_save = {
-                                            "design_name": design_name,
-                                            "marketplace_title": marketplace_title,
-                                            "design_sku": current_sku,
-                                            "sizes": sizes,
-                                            "colors": colors,
-                                            "original_design_url": image_url,
-                                            "all_mockup_results": all_mockup_results
-                                        }
-                                        
-                                        # Success! Show the generated mockups
-                                        total_mockups = sum(len(result['results']) for result in all_mockup_results)
-                                        st.success(f"✅ Generated {total_mockups} mockups for {len(all_mockup_results)} templates successfully!")
-                                    else:
-                                        st.error("Failed to generate any mockups. See error details above.")
-                                        st.session_state.mockup_results = None
+                                            # Success! Show the generated mockups
+                                            total_mockups = sum(len(result['results']) for result in all_mockup_results)
+                                            st.success(f"✅ Generated {total_mockups} mockups for {len(all_mockup_results)} templates successfully!")
+                                        else:
+                                            st.error("Failed to generate any mockups. See error details above.")
+                                            st.session_state.mockup_results = None
                         
+            # Follow a queued render batch; it keeps rendering if this page is refreshed or closed
+            if RENDER_QUEUE_ENABLED:
+                show_render_batch_status()
+            
             # Add Save Product button that appears only after mockups are generated
             if st.session_state.mockup_results and hasattr(st.session_state, 'product_data_to_save'):
             # Add Save All Mockups button that appears only after mockups are generated
@@ -886,13 +955,8 @@ elif st.session_state.get("authentication_status") is True:
                             design_sku = update_design_sku()
                             st.session_state.product_data_to_save["design_sku"] = design_sku
                         
-                        # Import necessary libraries upfront
-                        import tempfile
-                        import os
-                        import boto3
-                        from botocore.exceptions import ClientError
-                        
                         # Initialize S3 client once
+                        import boto3
                         s3_client = boto3.client('s3', 
                             aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
                             aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
@@ -903,88 +967,74 @@ elif st.session_state.get("authentication_status") is True:
                         
                         # Save all generated mockups
                         all_mockup_s3_urls = {}
-                        all_mockup_results = st.session_state.product_data_to_save["all_mockup_results"]
+                        product_data_to_save = st.session_state.product_data_to_save
+                        all_mockup_results = product_data_to_save["all_mockup_results"]
                         
                         # Set up progress tracking
                         total_mockups = sum(len(result['results']) for result in all_mockup_results)
                         progress_bar = st.progress(0)
+                        status_text = st.empty()
                         completed = 0
                         
-                        # Create a temp directory for all files
-                        temp_dir = tempfile.mkdtemp()
-                        
-                        # Process each mockup set
-                        for mockup_set_idx, mockup_set in enumerate(all_mockup_results):
+                        # Collect the mockups that still need to be copied into our bucket
+                        transfers = []
+                        for mockup_set in all_mockup_results:
                             mockup_id = mockup_set['mockup_id']
-                            mockup_s3_urls = {}
+                            mockup_s3_urls = all_mockup_s3_urls.setdefault(mockup_id, {})
                             
-                            # Process each mockup in this set
                             for mockup in mockup_set['results']:
                                 hex_color = mockup['color']
                                 mockup_url = mockup['rendered_image_url']
                                 
-                                try:
-                                    # Download and upload to S3
-                                    response = requests.get(mockup_url, timeout=15)
-                                    if response.status_code == 200:
-                                        # Create color-specific filename
-                                        color_name = hex_to_color_name(hex_color) or hex_color.lstrip('#')
-                                        local_filename = f"mockup_{design_sku}_{color_name}_{mockup_id[-6:]}.png"
-                                        local_filepath = os.path.join(temp_dir, local_filename)
-                                        
-                                        # Save to temp file
-                                        with open(local_filepath, 'wb') as f:
-                                            f.write(response.content)
-                                        
-                                        # Upload to S3
-                                        s3_key = f"mockups/{local_filename}"
-                                        try:
-                                            s3_client.upload_file(
-                                                local_filepath,
-                                                bucket_name,
-                                                s3_key,
-                                                ExtraArgs={
-                                                    'ContentType': 'image/png',
-                                                    'StorageClass': 'STANDARD',
-                                                },
-                                                Config=boto3.s3.transfer.TransferConfig(
-                                                    use_threads=True,
-                                                    max_concurrency=10,
-                                                    multipart_threshold=8388608,  # 8MB
-                                                    multipart_chunksize=8388608,  # 8MB
-                                                )
-                                            )
-                                            
-                                            # Generate the URL for the uploaded file
-                                            s3_url = f"https://{bucket_name}.s3.{region}.amazonaws.com/{s3_key}"
-                                            mockup_s3_urls[hex_color] = s3_url
-                                        except Exception as e:
-                                            st.warning(f"Error uploading to S3: {e}")
-                                        
-                                        # Clean up temp file (keep directory)
-                                        try:
-                                            os.unlink(local_filepath)
-                                        except Exception:
-                                            pass
-                                    else:
-                                        st.warning(f"Failed to download mockup (Status: {response.status_code})")
-                                    
-                                except Exception as e:
-                                    st.warning(f"Error processing mockup: {e}")
+                                # Cached renders may already point at our bucket; no need to copy them again
+                                if mockup_url.startswith(f"https://{bucket_name}.s3."):
+                                    mockup_s3_urls[hex_color] = mockup_url
+                                    completed += 1
+                                    continue
                                 
-                                # Update progress
-                                completed += 1
-                                progress_bar.progress(completed / total_mockups)
-                            
-                            # Store this mockup set's S3 URLs
-                            all_mockup_s3_urls[mockup_id] = mockup_s3_urls
+                                # Create color-specific filename
+                                color_name = hex_to_color_name(hex_color) or hex_color.lstrip('#')
+                                transfers.append({
+                                    'source_url': mockup_url,
+                                    's3_key': f"mockups/mockup_{design_sku}_{color_name}_{mockup_id[-6:]}.png",
+                                    'content_type': 'image/png',
+                                    'mockup_id': mockup_id,
+                                    'smart_object_uuid': mockup_set.get('smart_object_uuid'),
+                                    'color': hex_color
+                                })
                         
-                        # Clean up temp directory
-                        import shutil
-                        try:
-                            shutil.rmtree(temp_dir)
-                        except Exception:
-                            pass
+                        if total_mockups:
+                            progress_bar.progress(completed / total_mockups)
+                        
+                        def on_transfer_progress(done, total, transfer, s3_url, error):
+                            progress_bar.progress((completed + done) / total_mockups)
+                            status_text.text(f"Uploaded {done} of {total} mockups to S3")
+                        
+                        # Stream every mockup from the render URL straight into S3, several at a time
+                        s3_urls = transfer_mockups_to_s3(
+                            transfers,
+                            s3_client=s3_client,
+                            bucket_name=bucket_name,
+                            region=region,
+                            progress_callback=on_transfer_progress
+                        )
+                        status_text.empty()
+                        
+                        for transfer, s3_url in zip(transfers, s3_urls):
+                            if not s3_url:
+                                st.warning(f"Error uploading mockup for color {transfer['color']} to S3")
+                                continue
+                            
+                            all_mockup_s3_urls[transfer['mockup_id']][transfer['color']] = s3_url
+                            
+                            # Later renders with the same inputs reuse the S3 copy
+                            cache_rendered_mockup(
+                                product_data_to_save["original_design_url"],
+                                transfer['color'],
+                                transfer['mockup_id'],
+                                transfer['smart_object_uuid'],
+                                s3_url
+                            )
                         
                         # Get parent SKU from selected product if available
                         parent_sku = ""
@@ -993,57 +1043,87 @@ elif st.session_state.get("authentication_status") is True:
                             if parent_product and 'item_sku' in parent_product:
                                 parent_sku = parent_product['item_sku']
                         
-                        # Save all products to database - one for each mockup template/type
+                        # Save all products to database - one for each mockup template/type, in one transaction
                         product_data = st.session_state.product_data_to_save
-                        success_count = 0
+                        products_to_save = []
                         
                         for mockup_set_idx, mockup_set in enumerate(all_mockup_results):
                             mockup_id = mockup_set['mockup_id']
                             mockup_s3_urls = all_mockup_s3_urls.get(mockup_id, {})
                             
                             if mockup_s3_urls:
-                                try:
-                                    # Generate a unique SKU suffix for each mockup template
-                                    sku_suffix = f"-{mockup_set_idx+1}" if mockup_set_idx > 0 else ""
-                                    current_design_sku = f"{design_sku}{sku_suffix}"
-                                    
-                                    # Create product data dictionary for this mockup template
-                                    product_dict = {
-                                        "product_name": f"{product_data['design_name']} - Template {mockup_set_idx+1}",
-                                        "marketplace_title": product_data["marketplace_title"],
-                                        "item_sku": current_design_sku,
-                                        "parent_sku": parent_sku,
-                                        "size": json.dumps(product_data["sizes"]),
-                                        "color": json.dumps([color_name_to_hex(color) for color in product_data["colors"]]),
-                                        "original_design_url": product_data["original_design_url"],
-                                        "mockup_urls": json.dumps(mockup_s3_urls),
-                                        "mockup_id": mockup_id,
-                                        "smart_object_uuid": mockup_set.get('smart_object_uuid')
-                                    }
-                                    
-                                    # Add parent_product_id if editing an existing product
-                                    if st.session_state.selected_product_id:
-                                        product_dict["parent_product_id"] = st.session_state.selected_product_id
-                                    
-                                    # Save to database
-                                    new_id = db.create_generated_product(product_dict)
-                                    if new_id:
-                                        success_count += 1
-                                except Exception as e:
-                                    st.error(f"Error saving mockup set {mockup_set_idx+1}: {str(e)}")
+                                # Generate a unique SKU suffix for each mockup template
+                                sku_suffix = f"-{mockup_set_idx+1}" if mockup_set_idx > 0 else ""
+                                current_design_sku = f"{design_sku}{sku_suffix}"
+                                
+                                # List-view thumbnails are stored alongside each mockup row
+                                mockup_thumbnails = {}
+                                for hex_color, url in mockup_s3_urls.items():
+                                    thumbnail_url = get_thumbnail_url(url, 70)
+                                    if thumbnail_url != url:
+                                        mockup_thumbnails[hex_color] = thumbnail_url
+                                
+                                # Create product data dictionary for this mockup template
+                                product_dict = {
+                                    "product_name": f"{product_data['design_name']} - Template {mockup_set_idx+1}",
+                                    "marketplace_title": product_data["marketplace_title"],
+                                    "item_sku": current_design_sku,
+                                    "parent_sku": parent_sku,
+                                    "size": json.dumps(product_data["sizes"]),
+                                    "color": json.dumps([color_name_to_hex(color) for color in product_data["colors"]]),
+                                    "original_design_url": product_data["original_design_url"],
+                                    "mockup_urls": json.dumps(mockup_s3_urls),
+                                    "mockup_id": mockup_id,
+                                    "smart_object_uuid": mockup_set.get('smart_object_uuid'),
+                                    "mockup_thumbnails": mockup_thumbnails
+                                }
+                                
+                                # Add parent_product_id if editing an existing product
+                                if st.session_state.selected_product_id:
+                                    product_dict["parent_product_id"] = st.session_state.selected_product_id
+                                
+                                products_to_save.append(product_dict)
                         
-                        if success_count > 0:
-                            st.success(f"Successfully saved {success_count} of {len(all_mockup_results)} mockup templates to database!")
-                            # Clear the data to avoid re-saving
-                            st.session_state.product_data_to_save = None
-                            
-                            # Show a link to the Product List page to view the saved products
-                            if st.button("Go to Product List to view your new products"):
-                                # This will redirect to the Product List page
-                                st.experimental_set_query_params(page="product_list")
-                                st.rerun()
+                        # Reserve every template SKU at once; taken ones get a fresh suffix
+                        sku_owner = st.session_state.sku_owner
+                        taken_skus = reserve_skus(db, [p["item_sku"] for p in products_to_save], owner=sku_owner)
+                        if taken_skus is None:
+                            st.error("Could not check existing SKUs, so nothing was saved. Please try again.")
                         else:
-                            st.error("Failed to save any mockups to database. Check the errors above.")
+                            taken_products = [p for p in products_to_save if p["item_sku"] in taken_skus]
+                            replacement_skus = allocate_skus(db, [f"{p['item_sku']}-" for p in taken_products], owner=sku_owner)
+                            for product_dict, new_sku in zip(taken_products, replacement_skus):
+                                if new_sku:
+                                    st.warning(f"SKU {product_dict['item_sku']} already exists in database. Saving as {new_sku}.")
+                                    product_dict["item_sku"] = new_sku
+                        
+                            save_results = db.create_generated_products_batch(products_to_save)
+                            success_count = 0
+                        
+                            for product_dict, result in zip(products_to_save, save_results):
+                                if result['status'] == 'inserted':
+                                    success_count += 1
+                                elif result['status'] in ('invalid', 'duplicate'):
+                                    st.error(f"Error saving {product_dict['product_name']}: {result['error']}")
+                        
+                            release_skus(
+                                [result['item_sku'] for result in save_results if result['status'] == 'inserted'],
+                                used=True
+                            )
+                        
+                            if success_count > 0:
+                                st.success(f"Successfully saved {success_count} of {len(all_mockup_results)} mockup templates to database!")
+                                # Clear the data to avoid re-saving
+                                st.session_state.product_data_to_save = None
+                                st.session_state.render_batch_id = None
+                            
+                                # Show a link to the Product List page to view the saved products
+                                if st.button("Go to Product List to view your new products"):
+                                    # This will redirect to the Product List page
+                                    st.experimental_set_query_params(page="product_list")
+                                    st.rerun()
+                            else:
+                                st.error("Failed to save any mockups to database. Check the errors above.")
 
         # Initialize the mockup color tracking
         if 'original_mockup_colors' not in st.session_state:
@@ -1238,7 +1318,7 @@ elif st.session_state.get("authentication_status") is True:
                                         if result['color'] == new_hex:
                                             # We already have this color, show it
                                             st.image(
-                                                result['rendered_image_url'],
+                                                get_thumbnail_url(result['rendered_image_url'], 300),
                                                 caption=f"{selected_color}",
                                                 use_container_width=True
                                             )
@@ -1269,7 +1349,7 @@ elif st.session_state.get("authentication_status") is True:
                                 else:
                                     # Show the original color mockup
                                     st.image(
-                                        color_to_url_map[hex_color],
+                                        get_thumbnail_url(color_to_url_map[hex_color], 300),
                                         caption=f"{color_name}",
                                         use_container_width=True
                                     )
@@ -1355,7 +1435,7 @@ elif st.session_state.get("authentication_status") is True:
                             if selected_hex in st.session_state.mockup_results:
                                 # We have this mockup already, show it
                                 st.image(
-                                    st.session_state.mockup_results[selected_hex],
+                                    get_thumbnail_url(st.session_state.mockup_results[selected_hex], 300),
                                     caption=f"{selected_color}",
                                     use_container_width=True
                                 )
@@ -0,0 +1,178 @@
+import streamlit as st
+import pandas as pd
+import datetime
+from utils.database import get_pool_stats, get_circuit_breaker_state
+from utils.query_metrics import SLOW_QUERY_MS, get_query_metrics, dump_query_metrics, reset_query_metrics
+from utils.render_cache import get_render_cache_stats
+from utils.singleflight import get_singleflight_stats, reset_singleflight_stats
+import yaml
+from yaml.loader import SafeLoader
+import streamlit_authenticator as stauth
+
+with open('config.yaml') as file:
+    config = yaml.load(file, Loader=SafeLoader)
+
+# Initialize authenticator
+authenticator = stauth.Authenticate(
+    config['credentials'],
+    config['cookie']['name'],
+    config['cookie']['key'],
+    config['cookie']['expiry_days'],
+)
+
+if not st.session_state.get("authentication_status"):
+    # Show login form
+    authenticator.login(location='main')
+    if st.session_state.get("authentication_status") is False:
+        st.error('Username/password is incorrect')
+    elif st.session_state.get("authentication_status") is None:
+        st.warning('Please enter your username and password')
+
+elif st.session_state.get("authentication_status") is True:
+    st.title("📊 Admin")
+    st.caption("Metrics cover this app process since it started or since they were last reset.")
+
+    metrics = get_query_metrics()
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        if st.button("Refresh", use_container_width=True):
+            st.rerun()
+    with col2:
+        if st.button("Reset metrics", use_container_width=True):
+            reset_query_metrics()
+            reset_singleflight_stats()
+            st.rerun()
+    with col3:
+        st.download_button(
+            label="Download metrics as JSON",
+            data=dump_query_metrics(),
+            file_name=f"query_metrics_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+        )
+
+    # Circuit breaker
+    st.subheader("Database Availability")
+    breaker = get_circuit_breaker_state()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Circuit breaker", breaker['state'].replace('_', '-'))
+    col2.metric("Consecutive failures", breaker['failures'])
+    col3.metric("Times opened", breaker['trips'])
+    col4.metric("Calls failed fast", breaker['rejected'])
+    if breaker['state'] == 'open':
+        st.error(f"Database unreachable for {breaker['open_seconds']:.0f} s; reconnecting in the background. Last error: {breaker['last_error']}")
+    elif breaker['last_error']:
+        st.caption(f"Last connection error: {breaker['last_error']}")
+
+    # Connection pool
+    st.subheader("Connection Pool")
+    pool = get_pool_stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("In use", f"{pool['in_use']} / {pool['pool_size']}")
+    col2.metric("Peak in use", pool['peak_in_use'])
+    col3.metric("Avg wait", f"{pool['wait_time_avg'] * 1000:.1f} ms")
+    col4.metric("Timeouts", pool['timeouts'])
+
+    # Which page actions hit the database hardest
+    st.subheader("Database Operations")
+    if metrics['operations']:
+        st.dataframe(
+            pd.DataFrame(metrics['operations']),
+            column_config={
+                "operation": "Operation",
+                "calls": "Calls",
+                "queries": "Queries",
+                "total_ms": st.column_config.NumberColumn("Total (ms)", format="%.1f"),
+                "query_ms": st.column_config.NumberColumn("In queries (ms)", format="%.1f"),
+                "max_ms": st.column_config.NumberColumn("Slowest call (ms)", format="%.1f"),
+                "connection_waits": "Connection checkouts",
+                "wait_ms": st.column_config.NumberColumn("Waiting for connection (ms)", format="%.1f"),
+                "wait_max_ms": st.column_config.NumberColumn("Longest wait (ms)", format="%.1f"),
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+    else:
+        st.info("No database activity recorded yet.")
+
+    st.subheader("Queries")
+    if metrics['queries']:
+        queries_df = pd.DataFrame(metrics['queries']).drop(columns=['histogram'])
+        st.dataframe(
+            queries_df,
+            column_config={
+                "operation": "Operation",
+                "fingerprint": st.column_config.TextColumn("Query", width="large"),
+                "calls": "Calls",
+                "errors": "Errors",
+                "rows": "Rows",
+                "total_ms": st.column_config.NumberColumn("Total (ms)", format="%.1f"),
+                "avg_ms": st.column_config.NumberColumn("Avg (ms)", format="%.2f"),
+                "p95_ms": st.column_config.NumberColumn("p95 ≤ (ms)", format="%.0f"),
+                "max_ms": st.column_config.NumberColumn("Max (ms)", format="%.1f"),
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+
+        # Duration histogram for one query
+        labels = [f"≤{bound} ms" for bound in metrics['histogram_buckets_ms']] + [f">{metrics['histogram_buckets_ms'][-1]} ms"]
+        selected = st.selectbox(
+            "Duration histogram",
+            range(len(metrics['queries'])),
+            format_func=lambda i: f"{metrics['queries'][i]['operation']}: {metrics['queries'][i]['fingerprint'][:120]}"
+        )
+        histogram_df = pd.DataFrame({'calls': metrics['queries'][selected]['histogram']}, index=labels)
+        st.bar_chart(histogram_df)
+
+    st.subheader(f"Slow Queries (over {SLOW_QUERY_MS:.0f} ms)")
+    if metrics['slow_queries']:
+        for entry in metrics['slow_queries']:
+            with st.expander(f"{entry['time']} · {entry['duration_ms']:.0f} ms · {entry['operation']}"):
+                st.code(entry['sql'], language="sql")
+                st.write(f"Rows: {entry['rows']}")
+                if entry['error']:
+                    st.error(entry['error'])
+                if isinstance(entry['explain'], list):
+                    st.dataframe(pd.DataFrame(entry['explain']), hide_index=True, use_container_width=True)
+                elif entry['explain']:
+                    st.warning(entry['explain'])
+    else:
+        st.info("No slow queries recorded.")
+
+    # Render cache
+    st.subheader("Render Cache")
+    render_cache = get_render_cache_stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Hit rate", f"{render_cache['hit_rate']:.0%}")
+    col2.metric("Hits", render_cache['hits'])
+    col3.metric("Misses", render_cache['misses'])
+    col4.metric("Entries", render_cache['entries'])
+
+    # Identical renders that shared one API call
+    st.subheader("Render Deduplication")
+    flights = get_singleflight_stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Render requests", flights['calls'])
+    col2.metric("API calls made", flights['executions'])
+    col3.metric("Shared", flights['shared'])
+    col4.metric("In flight", flights['in_flight'])
+    shared_keys = [entry for entry in flights['keys'] if entry['shared']]
+    if shared_keys:
+        shared_df = pd.DataFrame(shared_keys)
+        shared_df['last_call'] = pd.to_datetime(shared_df['last_call'], unit='s')
+        st.dataframe(
+            shared_df,
+            column_config={
+                "key": st.column_config.TextColumn("Render", width="large"),
+                "calls": "Requests",
+                "executions": "API calls",
+                "shared": "Shared",
+                "errors": "Errors",
+                "last_call": "Last request",
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+    else:
+        st.info("No duplicate renders recorded.")
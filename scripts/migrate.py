@@ -0,0 +1,95 @@
+import os
+import sys
+import argparse
+import mysql.connector
+from mysql.connector import Error, errorcode
+
+# Allow running as `python scripts/migrate.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_CONFIG
+from utils.migrations import LATEST_SCHEMA_VERSION, MIGRATIONS, get_schema_version, apply_migrations
+
+def connect(database=None):
+    """
+    Connect to MySQL using the app's database configuration
+
+    Args:
+        database (str): Database to select, or None for no database
+
+    Returns:
+        MySQL connection
+    """
+    connection_args = {
+        'host': DB_CONFIG['host'],
+        'port': DB_CONFIG.get('port', 3306),
+        'user': DB_CONFIG['user'],
+        'password': DB_CONFIG['password'],
+    }
+    if database:
+        connection_args['database'] = database
+
+    if DB_CONFIG.get('ssl_mode') == 'REQUIRED' and os.path.exists(DB_CONFIG.get('ssl_ca', '')):
+        connection_args.update({
+            'ssl_ca': DB_CONFIG['ssl_ca'],
+            'ssl_verify_cert': DB_CONFIG.get('ssl_verify', True),
+        })
+
+    return mysql.connector.connect(**connection_args)
+
+def connect_to_app_database():
+    """Connect to DB_NAME, creating the database first if it does not exist"""
+    try:
+        return connect(DB_CONFIG['database'])
+    except Error as e:
+        if e.errno != errorcode.ER_BAD_DB_ERROR:
+            raise
+
+    print(f"Database '{DB_CONFIG['database']}' does not exist, creating it...")
+    connection = connect()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{DB_CONFIG['database']}`")
+        cursor.close()
+    finally:
+        connection.close()
+
+    return connect(DB_CONFIG['database'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending database schema migrations")
+    parser.add_argument('--status', action='store_true', help="Show the schema version without migrating")
+    args = parser.parse_args()
+
+    try:
+        connection = connect_to_app_database()
+    except Error as e:
+        print(f"Error connecting to database: {e}")
+        return 1
+
+    try:
+        cursor = connection.cursor(dictionary=True)
+        version = get_schema_version(cursor)
+        cursor.close()
+
+        print(f"Schema version: {'none' if version is None else version} (latest: {LATEST_SCHEMA_VERSION})")
+        if args.status:
+            for migration_version, description, _ in MIGRATIONS:
+                state = "applied" if version is not None and migration_version <= version else "pending"
+                print(f"  {migration_version}: {description} [{state}]")
+            return 0
+
+        applied = apply_migrations(connection)
+        if applied:
+            print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+        else:
+            print("Schema is up to date.")
+        return 0
+    except (Error, RuntimeError) as e:
+        print(f"Migration failed: {e}")
+        return 1
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
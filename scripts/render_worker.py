@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import signal
+import argparse
+
+# Allow running as `python scripts/render_worker.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import Database, init_connection_pool
+from utils.render_jobs import RENDER_WORKER_BATCH_SIZE, RENDER_WORKER_POLL_INTERVAL, make_worker_id, process_render_jobs
+
+# Set by SIGTERM/SIGINT so the current jobs finish before the worker exits
+stop_requested = False
+
+def request_stop(signum, frame):
+    global stop_requested
+    if stop_requested:
+        raise KeyboardInterrupt
+    print("Stopping after the current jobs (signal again to exit now)...")
+    stop_requested = True
+
+def main():
+    parser = argparse.ArgumentParser(description="Render queued mockup jobs from the render_jobs table")
+    parser.add_argument('--batch-size', type=int, default=RENDER_WORKER_BATCH_SIZE, help="Jobs to claim per poll")
+    parser.add_argument('--poll-interval', type=float, default=RENDER_WORKER_POLL_INTERVAL, help="Seconds to sleep when the queue is empty")
+    parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    init_connection_pool()
+    db = Database()
+    worker_id = make_worker_id()
+    print(f"Render worker {worker_id} started")
+
+    processed = 0
+    while not stop_requested:
+        try:
+            claimed = process_render_jobs(db, worker_id, args.batch_size)
+        except Exception as e:
+            print(f"Error processing render jobs: {e}")
+            claimed = 0
+
+        processed += claimed
+        if claimed:
+            print(f"Processed {claimed} render jobs ({processed} total)")
+            continue
+        if args.once:
+            break
+        time.sleep(args.poll_interval)
+
+    print(f"Render worker {worker_id} stopped after {processed} jobs")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,6 @@ import sys
 import pandas as pd
 from PIL import Image, ImageDraw
 import io
-import requests
 import uuid
 import streamlit as st
 from dotenv import load_dotenv
@@ -14,6 +13,7 @@ load_dotenv()
 # Import application modules
 from utils.api import save_uploaded_image, generate_mockup, is_s3_url
 from utils.s3_storage import get_image_from_s3_url
+from utils.http_client import http_head
 from utils.export import export_to_csv
 
 # Configure test settings
@@ -114,7 +114,7 @@ def test_full_workflow():
     # Step 6: Verify image accessibility 
     print("Step 6: Verifying mockup image is accessible...")
     if is_s3_url(mockup_url):
-        response = requests.head(mockup_url)
+        response = http_head(mockup_url)
         if response.status_code != 200:
             print(f"❌ Mockup image not accessible. Status code: {response.status_code}")
             return False
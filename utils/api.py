@@ -1,11 +1,12 @@
 import os
-import requests
 import streamlit as st
 from PIL import Image
 import uuid
 import io
 from config import API_KEY, API_URL, IMAGES_DIR, S3_CONFIG
 from utils.s3_storage import upload_image_file_to_s3, upload_mockup_to_s3
+from utils.rate_limiter import wait_for_api_slot
+from utils.http_client import http_get, http_post
 
 def ensure_images_dir():
     """
@@ -35,7 +36,7 @@ def generate_mockup(image_path_or_url, template_id="t-shirt", is_s3_url=False):
         
         # If we have an S3 URL, we need to download the file first
         if is_s3_url:
-            response = requests.get(image_path_or_url)
+            response = http_get(image_path_or_url)
             if response.status_code != 200:
                 st.error(f"Failed to download image from S3: {response.status_code}")
                 return None
@@ -67,7 +68,8 @@ def generate_mockup(image_path_or_url, template_id="t-shirt", is_s3_url=False):
             
             # Make the API request
             st.info("Sending request to DynamicMockups API...")
-            response = requests.post(url, files=files, data=data, headers=headers)
+            # The image file handle cannot be replayed, so this upload is not retried
+            response = http_post(url, files=files, data=data, headers=headers, before_attempt=wait_for_api_slot, max_retries=0)
             
             if response.status_code == 200:
                 result = response.json()
@@ -148,7 +150,7 @@ def verify_api_functionality():
         
         # Make a test request to the API (using templates endpoint which is lightweight)
         test_url = f"{API_URL}/templates"  # Most APIs have a templates or similar endpoint
-        response = requests.get(test_url, headers=headers)
+        response = http_get(test_url, headers=headers, max_retries=0)
         
         if response.status_code == 200:
             return True, "API connection successful"
@@ -1,27 +1,109 @@
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errorcode
 from mysql.connector import pooling
 import streamlit as st
 import pandas as pd
 from config import DB_CONFIG
+from utils.migrations import LATEST_SCHEMA_VERSION, get_schema_version, apply_migrations
+from utils.product_variants import normalize_color_hex, parse_generated_variants, list_row_count
+from utils.query_metrics import instrument_cursor, track_operation, record_connection_wait
 import os
+import re
 import sys
+import json
 import time
+import uuid
+import hashlib
+import datetime
+import functools
+import threading
+from contextlib import contextmanager
+
+# Insert statement shared by single and batch generated product inserts
+GENERATED_PRODUCT_INSERT = """
+INSERT INTO generated_products (
+    product_name, parent_sku, marketplace_title, size, color,
+    original_design_url, mockup_urls, is_published, parent_product_id, item_sku
+) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# Columns covered by the ft_search n-gram FULLTEXT index on products and generated_products
+FULLTEXT_COLUMNS = "product_name, item_sku, marketplace_title"
+
+# Shorter search terms are below the n-gram token size and cannot use the index
+FULLTEXT_MIN_TERM_LENGTH = 2
+
+# Product List sort key columns, without and with a search term (all descending)
+PRODUCT_LIST_KEY_COLUMNS = {
+    False: ('created_at', 'id', 'product_type'),
+    True: ('relevance', 'created_at', 'id', 'product_type'),
+}
+
+# Sort keys read per query while walking to a Product List page without a nearby anchor
+PRODUCT_LIST_WALK_SIZE = 1000
+
+# Seconds the change feed watermark trails the server clock. updated_at is set when a
+# statement runs, not when its transaction commits, so a row committed later than this
+# after its statement would be missed by every delta; keep it above the longest product
+# write transaction (e.g. a large create_generated_products_batch)
+CHANGE_FEED_OVERLAP = DB_CONFIG.get('change_feed_overlap', 300)
+
+# Seconds deletion tombstones are kept; older watermarks get a full snapshot instead of a delta
+CHANGE_FEED_RETENTION = DB_CONFIG.get('change_feed_retention', 7 * 24 * 3600)
 
 # Global connection pool - will be initialized once and reused
 connection_pool = None
 
+# Free pool slots; lets callers wait for a connection instead of failing when the pool is exhausted
+_pool_slots = None
+
+# Checkout metrics for the shared pool
+pool_stats = {
+    'checkouts': 0,
+    'in_use': 0,
+    'peak_in_use': 0,
+    'wait_time_total': 0.0,
+    'wait_time_max': 0.0,
+    'timeouts': 0
+}
+_pool_stats_lock = threading.Lock()
+
+# Circuit breaker for reaching MySQL. After DB_BREAKER_FAILURES consecutive connection
+# failures it opens: calls fail fast while a background thread probes the server, then
+# it half-opens and a single trial call decides whether it closes again.
+circuit_breaker = {
+    'state': 'closed',  # 'closed', 'open' or 'half_open'
+    'failures': 0,
+    'opened_at': None,
+    'last_error': None,
+    'trips': 0,
+    'rejected': 0,
+    'probing': False,
+    'trial_thread': None,  # Thread making the half-open trial call
+    'trial_started_at': None
+}
+_breaker_lock = threading.Lock()
+
+# Set once this process has seen a current schema version
+_schema_checked = False
+
+# Bumped after every committed product write so caches built on catalog data can tell they are stale
+catalog_version = 0
+_catalog_version_lock = threading.Lock()
+
 def init_connection_pool():
     """Initialize a connection pool that can be shared across sessions"""
-    global connection_pool
+    global connection_pool, _pool_slots
     if connection_pool is not None:
         return connection_pool
+    if not breaker_allows_request():
+        return None
          
     try:
         # Configure pool with connection parameters
         pool_config = {
             'pool_name': 'demo_image_app_pool',
-            'pool_size': 5,  # Adjust based on your needs and server limits
+            'pool_size': DB_CONFIG.get('pool_size', 5),  # Adjust based on your needs and server limits
             'pool_reset_session': True,
             'host': DB_CONFIG['host'],
             'port': DB_CONFIG.get('port', 3306),
@@ -29,6 +111,7 @@ def init_connection_pool():
             'user': DB_CONFIG['user'],
             'password': DB_CONFIG['password'],
             'use_pure': True,
+            'connection_timeout': DB_CONFIG.get('connect_timeout', 5),
         } 
         
         # Add SSL configuration if needed
@@ -40,22 +123,386 @@ def init_connection_pool():
             
         # Create the pool
         connection_pool = mysql.connector.pooling.MySQLConnectionPool(**pool_config)
+        _pool_slots = threading.BoundedSemaphore(pool_config['pool_size'])
+        record_connection_success()
         st.success(f"Connection pool initialized with size: {pool_config['pool_size']}")
         return connection_pool
     except Error as e:
+        record_connection_failure(e)
         st.error(f"Error creating connection pool: {e}")
         return None
 
+def _probe_connection_args():
+    """Arguments for a throwaway connection that checks whether the server is reachable"""
+    args = {
+        'host': DB_CONFIG['host'],
+        'port': DB_CONFIG.get('port', 3306),
+        'database': DB_CONFIG['database'],
+        'user': DB_CONFIG['user'],
+        'password': DB_CONFIG['password'],
+        'use_pure': True,
+        'connection_timeout': DB_CONFIG.get('connect_timeout', 5),
+    }
+    if DB_CONFIG.get('ssl_mode') == 'REQUIRED' and os.path.exists(DB_CONFIG.get('ssl_ca', '')):
+        args.update({
+            'ssl_ca': DB_CONFIG['ssl_ca'],
+            'ssl_verify_cert': DB_CONFIG.get('ssl_verify', True),
+        })
+    return args
+
+def breaker_allows_request():
+    """
+    Check whether database work may be attempted
+
+    When the breaker is half-open only one thread gets through, to make the
+    trial connection; everyone else keeps failing fast until it reports back
+    through record_connection_success/failure. A trial that has not reported
+    back within DB_BREAKER_RESET_TIMEOUT seconds is handed to the next caller.
+
+    Returns:
+        bool: False while the circuit breaker is open, or half-open with a trial in progress elsewhere
+    """
+    with _breaker_lock:
+        state = circuit_breaker['state']
+        if state == 'closed':
+            return True
+
+        if state == 'half_open':
+            now = time.time()
+            thread_id = threading.get_ident()
+            trial_thread = circuit_breaker['trial_thread']
+            if trial_thread == thread_id:
+                return True
+            if (trial_thread is None
+                    or now - circuit_breaker['trial_started_at'] > DB_CONFIG.get('breaker_reset_timeout', 15)):
+                circuit_breaker['trial_thread'] = thread_id
+                circuit_breaker['trial_started_at'] = now
+                return True
+
+        circuit_breaker['rejected'] += 1
+        return False
+
+def record_connection_success():
+    """Close the circuit breaker after a connection attempt succeeded"""
+    # Unlocked fast path for the common case
+    if circuit_breaker['state'] == 'closed' and circuit_breaker['failures'] == 0:
+        return
+    with _breaker_lock:
+        if circuit_breaker['state'] != 'closed':
+            print("Database connection restored, closing circuit breaker")
+        circuit_breaker.update({
+            'state': 'closed', 'failures': 0, 'opened_at': None, 'trial_thread': None, 'trial_started_at': None
+        })
+
+def record_connection_failure(error):
+    """
+    Count a failed connection attempt, opening the circuit breaker past the threshold
+
+    Args:
+        error (Exception): The connection error
+    """
+    start_probe = False
+    with _breaker_lock:
+        circuit_breaker['failures'] += 1
+        circuit_breaker['last_error'] = str(error)
+        if (circuit_breaker['state'] == 'half_open'
+                or (circuit_breaker['state'] == 'closed'
+                    and circuit_breaker['failures'] >= DB_CONFIG.get('breaker_failures', 3))):
+            circuit_breaker['state'] = 'open'
+            circuit_breaker['opened_at'] = time.time()
+            circuit_breaker['trips'] += 1
+            circuit_breaker['trial_thread'] = None
+            circuit_breaker['trial_started_at'] = None
+            print(f"Database unreachable, opening circuit breaker: {error}")
+        if circuit_breaker['state'] == 'open' and not circuit_breaker['probing']:
+            circuit_breaker['probing'] = True
+            start_probe = True
+
+    if start_probe:
+        threading.Thread(target=_probe_until_reachable, name="db-reconnect", daemon=True).start()
+
+def _probe_until_reachable():
+    """Background loop that half-opens the circuit breaker once the server accepts connections"""
+    interval = DB_CONFIG.get('breaker_reset_timeout', 15)
+    while True:
+        time.sleep(interval)
+        try:
+            connection = mysql.connector.connect(**_probe_connection_args())
+            connection.close()
+        except Error as e:
+            with _breaker_lock:
+                circuit_breaker['last_error'] = str(e)
+            continue
+
+        with _breaker_lock:
+            circuit_breaker['state'] = 'half_open'
+            circuit_breaker['probing'] = False
+            circuit_breaker['trial_thread'] = None
+        print("Database reachable again, half-opening circuit breaker")
+        return
+
+def get_circuit_breaker_state():
+    """
+    Get the database circuit breaker state for this process
+
+    Returns:
+        dict: 'state' ('closed', 'open' or 'half_open'), consecutive 'failures',
+            'trips', calls 'rejected' while open, 'last_error' and 'open_seconds'
+    """
+    with _breaker_lock:
+        state = dict(circuit_breaker)
+    state['open_seconds'] = time.time() - state['opened_at'] if state['opened_at'] else 0.0
+    return state
+
+def design_hash(design_url):
+    """
+    Hash a design URL the way the generated design_hash column does
+    
+    Args:
+        design_url (str): URL of the original design image
+        
+    Returns:
+        str: Hex SHA-256 digest, matching MySQL SHA2(original_design_url, 256)
+    """
+    return hashlib.sha256(design_url.encode('utf-8')).hexdigest()
+
+def fulltext_phrase(term):
+    """
+    Quote a search term as a boolean-mode FULLTEXT phrase
+
+    Inside a phrase the boolean operators (+ - * ...) are literal, so SKUs such
+    as "TS-001" are matched as typed.
+
+    Args:
+        term (str): Search term entered by the user
+
+    Returns:
+        str: The term as a quoted phrase
+    """
+    return '"' + term.replace('"', ' ').strip() + '"'
+
+def is_duplicate_sku_error(error):
+    """
+    Check whether an error is a duplicate entry on a product table's unique item_sku key
+
+    Other duplicate keys, e.g. on the generated product child tables, return False.
+
+    Args:
+        error (mysql.connector.Error): Error raised by a statement
+
+    Returns:
+        bool: True if the duplicate entry was the SKU
+    """
+    # MySQL names the key in the message: "Duplicate entry 'X' for key 'generated_products.item_sku'"
+    return error.errno == errorcode.ER_DUP_ENTRY and re.search(r"for key '(\w+\.)?item_sku'", error.msg or '') is not None
+
+def acquire_pooled_connection(timeout=None):
+    """
+    Check a connection out of the shared pool, waiting for a free one
+    
+    Args:
+        timeout (float): Seconds to wait for a free connection, defaults to DB_POOL_TIMEOUT
+        
+    Returns:
+        Pooled connection; close() it (or use release_pooled_connection) to return it
+        
+    Raises:
+        mysql.connector.Error: If the pool is unavailable or no connection frees up in time
+    """
+    if not breaker_allows_request():
+        raise Error(msg="Database unavailable (circuit breaker open)")
+    if connection_pool is None:
+        init_connection_pool()
+    if connection_pool is None:
+        raise Error(msg="Connection pool is not available")
+    
+    timeout = DB_CONFIG.get('pool_timeout', 10) if timeout is None else timeout
+    started = time.monotonic()
+    if not _pool_slots.acquire(timeout=timeout):
+        with _pool_stats_lock:
+            pool_stats['timeouts'] += 1
+        raise pooling.PoolError(msg=f"No pooled connection became free within {timeout} seconds")
+    waited = time.monotonic() - started
+    
+    try:
+        # The pool pings the connection and reconnects it if the server dropped it
+        connection = connection_pool.get_connection()
+    except Exception as e:
+        _pool_slots.release()
+        if isinstance(e, Error) and not isinstance(e, pooling.PoolError):
+            record_connection_failure(e)
+        raise
+    record_connection_success()
+    
+    with _pool_stats_lock:
+        pool_stats['checkouts'] += 1
+        pool_stats['in_use'] += 1
+        pool_stats['peak_in_use'] = max(pool_stats['peak_in_use'], pool_stats['in_use'])
+        pool_stats['wait_time_total'] += waited
+        pool_stats['wait_time_max'] = max(pool_stats['wait_time_max'], waited)
+    
+    return connection
+
+def release_pooled_connection(connection):
+    """
+    Return a connection from acquire_pooled_connection to the pool
+    
+    Args:
+        connection: Pooled connection
+    """
+    try:
+        connection.close()
+    except Exception as e:
+        print(f"Error returning connection to pool: {e}")
+    finally:
+        with _pool_stats_lock:
+            pool_stats['in_use'] -= 1
+        _pool_slots.release()
+
+def get_pool_stats():
+    """
+    Get connection pool utilization and wait-time metrics for this process
+    
+    Returns:
+        dict: Counters plus 'pool_size', 'utilization' and 'wait_time_avg'
+    """
+    with _pool_stats_lock:
+        stats = dict(pool_stats)
+    
+    pool_size = connection_pool.pool_size if connection_pool is not None else 0
+    stats['pool_size'] = pool_size
+    stats['utilization'] = stats['in_use'] / pool_size if pool_size else 0.0
+    stats['wait_time_avg'] = stats['wait_time_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    return stats
+
+def mark_catalog_changed():
+    """Record that products or generated products were written by this process"""
+    global catalog_version
+    with _catalog_version_lock:
+        catalog_version += 1
+
+def get_catalog_version():
+    """
+    Get the catalog write counter
+
+    Returns:
+        int: Number of committed product writes made by this process
+    """
+    return catalog_version
+
+def _uses_connection(method):
+    """Run a Database method inside its own connection checkout, recording its queries under its name"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with track_operation(f"Database.{method.__name__}"), self._checkout():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class Database:
     def __init__(self):
         """Initialize database connection"""
-        self.connection = None
-        self.cursor = None
-        self.max_reconnect_attempts = 3
-        self.reconnect_delay = 2  # seconds
+        # Connections are checked out per operation and kept per thread, so
+        # sessions sharing this instance never share a cursor
+        self._local = threading.local()
+        self._direct_connection = None
+        self._direct_cursor = None
+        self._direct_lock = threading.RLock()
+        # When the direct connection was last known to work
+        self._direct_validated_at = 0.0
         
-        # Get a connection from the pool instead of creating a new one
+        # Check that the pool works and create tables on the first connection
         self._get_connection_from_pool()
+    
+    @property
+    def connection(self):
+        """Connection for the current operation"""
+        if getattr(self._local, 'pooled', False):
+            return self._local.connection
+        return self._direct_connection
+    
+    @connection.setter
+    def connection(self, value):
+        if getattr(self._local, 'pooled', False):
+            self._local.connection = value
+        else:
+            self._direct_connection = value
+    
+    @property
+    def cursor(self):
+        """Dictionary cursor for the current operation"""
+        if getattr(self._local, 'pooled', False):
+            return self._local.cursor
+        return self._direct_cursor
+    
+    @cursor.setter
+    def cursor(self, value):
+        if getattr(self._local, 'pooled', False):
+            self._local.cursor = value
+        else:
+            self._direct_cursor = value
+    
+    @contextmanager
+    def _checkout(self):
+        """
+        Check a pooled connection out for one unit of work
+        
+        Nested checkouts in the same thread reuse the outer connection. If the
+        pool is unavailable or exhausted past DB_POOL_TIMEOUT, the work runs on
+        the fallback direct connection, one thread at a time.
+        """
+        if getattr(self._local, 'depth', 0) > 0:
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+        
+        started = time.perf_counter()
+        try:
+            connection = acquire_pooled_connection()
+        except Error as e:
+            if circuit_breaker['state'] != 'open':
+                print(f"Pooled connection unavailable, using the direct connection: {e}")
+            connection = None
+        
+        if connection is None:
+            with self._direct_lock:
+                record_connection_wait(time.perf_counter() - started)
+                self._local.depth = 1
+                try:
+                    yield
+                finally:
+                    self._local.depth = 0
+            return
+        
+        record_connection_wait(time.perf_counter() - started)
+        self._local.pooled = True
+        self._local.connection = connection
+        self._local.depth = 1
+        try:
+            self._local.cursor = instrument_cursor(connection.cursor(dictionary=True), connection)
+            yield
+        finally:
+            # reconnect() may have swapped in a direct connection; close whichever is current
+            current_cursor = self._local.cursor if hasattr(self._local, 'cursor') else None
+            current_connection = self._local.connection
+            self._local.pooled = False
+            self._local.depth = 0
+            self._local.cursor = None
+            self._local.connection = None
+            
+            if current_cursor is not None:
+                try:
+                    current_cursor.close()
+                except Exception:
+                    pass
+            if current_connection is not None and current_connection is not connection:
+                try:
+                    current_connection.close()
+                except Exception:
+                    pass
+            release_pooled_connection(connection)
         
     def _get_connection_from_pool(self):
         """Get a connection from the connection pool"""
@@ -73,15 +520,14 @@ class Database:
                         self._connect_without_ssl()
                 return
                 
-            # Get a connection from the pool
-            self.connection = connection_pool.get_connection()
-            if self.connection.is_connected():
-                self.cursor = self.connection.cursor(dictionary=True)
-                server_info = self.connection.get_server_info()
-                st.success(f"Connected to MySQL server version {server_info} (pooled connection)")
-                
-                # Create tables if they don't exist
-                self._create_tables()
+            # Borrow a connection from the pool just long enough to set up the schema
+            with self._checkout():
+                if self.connection is not None and self.connection.is_connected():
+                    server_info = self.connection.get_server_info()
+                    st.success(f"Connected to MySQL server version {server_info} (pooled connection)")
+                    
+                    # Check the schema version, migrating if needed
+                    self._ensure_schema()
         except Error as e:
             st.warning(f"Pool connection failed: {e}. Trying direct connection methods...")
             # Fall back to direct connection methods
@@ -108,16 +554,17 @@ class Database:
                 database=DB_CONFIG['database'],
                 user=DB_CONFIG['user'],
                 password=DB_CONFIG['password'],
+                connection_timeout=DB_CONFIG.get('connect_timeout', 5),
                 **ssl_config
             )
             
             if self.connection.is_connected():
-                self.cursor = self.connection.cursor(dictionary=True)
+                self.cursor = instrument_cursor(self.connection.cursor(dictionary=True), self.connection)
                 server_info = self.connection.get_server_info()
                 st.success(f"Connected to MySQL server version {server_info} with SSL")
                 
-                # Create tables if they don't exist
-                self._create_tables()
+                # Check the schema version, migrating if needed
+                self._ensure_schema()
                 return True
             return False
         except Error as e:
@@ -141,16 +588,17 @@ class Database:
                 database=DB_CONFIG['database'],
                 user=DB_CONFIG['user'],
                 password=DB_CONFIG['password'],
+                connection_timeout=DB_CONFIG.get('connect_timeout', 5),
                 **ssl_config
             )
             
             if self.connection.is_connected():
-                self.cursor = self.connection.cursor(dictionary=True)
+                self.cursor = instrument_cursor(self.connection.cursor(dictionary=True), self.connection)
                 server_info = self.connection.get_server_info()
                 st.success(f"Connected to MySQL server version {server_info} with SSL (no verification)")
                 
-                # Create tables if they don't exist
-                self._create_tables()
+                # Check the schema version, migrating if needed
+                self._ensure_schema()
                 return True
             return False
         except Error as e:
@@ -169,16 +617,17 @@ class Database:
                 database=DB_CONFIG['database'],
                 user=DB_CONFIG['user'],
                 password=DB_CONFIG['password'],
+                connection_timeout=DB_CONFIG.get('connect_timeout', 5),
                 use_pure=True  # Use pure Python implementation
             )
             
             if self.connection.is_connected():
-                self.cursor = self.connection.cursor(dictionary=True)
+                self.cursor = instrument_cursor(self.connection.cursor(dictionary=True), self.connection)
                 server_info = self.connection.get_server_info()
                 st.success(f"Connected to MySQL server version {server_info} without SSL")
                 
-                # Create tables if they don't exist
-                self._create_tables()
+                # Check the schema version, migrating if needed
+                self._ensure_schema()
                 return True
             
             st.error("All connection attempts failed. Please check your database configuration.")
@@ -188,185 +637,106 @@ class Database:
             return False
 
     def _check_connection(self):
-        """Check if connection is alive and reconnect if necessary"""
+        """
+        Check that the current operation has a usable connection
+
+        Pooled connections were already validated by the pool at checkout. The
+        direct connection is only pinged after DB_VALIDATE_INTERVAL seconds
+        idle. While the circuit breaker is open this fails fast instead of
+        reconnecting; a background thread waits for the server to come back.
+
+        Returns:
+            bool: True if the connection can be used
+        """
+        if not breaker_allows_request():
+            return False
+
+        if getattr(self._local, 'pooled', False):
+            return self.connection is not None
+
+        if self._direct_connection is None:
+            return self.reconnect()
+
+        if time.monotonic() - self._direct_validated_at < DB_CONFIG.get('validate_interval', 30):
+            return True
+
         try:
-            if self.connection is None or not self.connection.is_connected():
-                st.warning("Database connection lost. Attempting to reconnect...")
-                return self.reconnect()
+            self._direct_connection.ping(reconnect=False)
+            self._direct_validated_at = time.monotonic()
             return True
         except Error as e:
-            st.warning(f"Connection check failed: {e}")
+            print(f"Direct database connection lost: {e}")
             return self.reconnect()
     
     def reconnect(self):
-        """Attempt to reconnect to the database"""
-        attempts = 0
-        
-        while attempts < self.max_reconnect_attempts:
+        """
+        Replace the direct connection, trying each connection strategy once
+
+        There are no retries or sleeps here. Repeated failures open the circuit
+        breaker, which fails later calls fast until the server is reachable again.
+
+        Returns:
+            bool: True if a new connection was made
+        """
+        if not breaker_allows_request():
+            return False
+
+        # Close existing connections if they exist
+        if self.cursor is not None:
             try:
-                attempts += 1
-                st.info(f"Reconnection attempt {attempts}/{self.max_reconnect_attempts}...")
-                
-                # Close existing connections if they exist
-                if hasattr(self, 'cursor') and self.cursor is not None:
-                    try:
-                        self.cursor.close()
-                    except:
-                        pass
-                    
-                if hasattr(self, 'connection') and self.connection is not None:
-                    try:
-                        self.connection.close()
-                    except:
-                        pass
-                
-                # Reset connection attributes
-                self.connection = None
-                self.cursor = None
-                
-                # Try reconnecting with the same strategy as in __init__
-                if self._connect_with_ssl():
-                    return True
-                if self._connect_without_ssl_verify():
-                    return True
-                if self._connect_without_ssl():
-                    return True
-                
-                # If we reach here, reconnection failed
-                st.warning(f"Reconnection attempt {attempts} failed. Retrying in {self.reconnect_delay} seconds...")
-                time.sleep(self.reconnect_delay)
-                
-            except Exception as e:
-                st.warning(f"Reconnection error: {e}. Retrying in {self.reconnect_delay} seconds...")
-                time.sleep(self.reconnect_delay)
-                
-        st.error("Failed to reconnect to database after multiple attempts.")
+                self.cursor.close()
+            except Exception:
+                pass
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+        self.connection = None
+        self.cursor = None
+
+        # Try reconnecting with the same strategy as in __init__
+        if self._connect_with_ssl() or self._connect_without_ssl_verify() or self._connect_without_ssl():
+            self._direct_validated_at = time.monotonic()
+            record_connection_success()
+            return True
+
+        record_connection_failure(Error(msg="Every connection strategy failed"))
+        st.error("Could not connect to the database. Retrying in the background.")
         return False
 
-    def _create_tables(self):
-        """Create necessary tables if they don't exist"""
-        if not self.cursor:
-            st.error("No database cursor available. Tables not created.")
-            return
-            
-        create_products_table = """
-        CREATE TABLE IF NOT EXISTS products (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            product_name VARCHAR(255) NOT NULL,
-            item_sku VARCHAR(100) NOT NULL,
-            parent_child ENUM('Parent', 'Child') NOT NULL,
-            parent_sku VARCHAR(100) NULL,
-            size TEXT NULL,
-            color TEXT NULL,
-            image_url TEXT NULL,
-            marketplace_title TEXT NULL,
-            category VARCHAR(1000) NULL,
-            tax_class VARCHAR(50) NULL,
-            quantity INT NOT NULL DEFAULT 0,
-            price DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            mockup_id VARCHAR(100) NULL,
-            smart_object_uuid VARCHAR(100) NULL,
-            mockup_ids TEXT NULL,
-            smart_object_uuids TEXT NULL
-        )
-        """
-        self.cursor.execute(create_products_table)
-        
-        # Create generated_products table if it doesn't exist
-        create_generated_products_table = """
-        CREATE TABLE IF NOT EXISTS generated_products (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            product_name VARCHAR(255) NOT NULL,
-            item_sku VARCHAR(100) NULL,
-            marketplace_title TEXT NULL,
-            size TEXT NULL,
-            color TEXT NULL,
-            original_design_url TEXT NULL,
-            mockup_urls TEXT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-            is_published BOOLEAN DEFAULT FALSE,
-            parent_product_id INT NULL,
-            parent_sku VARCHAR(100) NULL,
-            parent_child VARCHAR(10) DEFAULT 'Child',
-
-            INDEX idx_item_sku (item_sku),
-            INDEX idx_parent_sku (parent_sku),
-            INDEX idx_created_at (created_at),
-            INDEX idx_is_published (is_published),
-            INDEX idx_parent_product_id (parent_product_id)
-        )
+    def _ensure_schema(self):
         """
-        self.cursor.execute(create_generated_products_table)
+        Make sure the database schema is current
         
-        # Check if columns exist and add them if they don't
-        try:
-            # Check if mockup_id column exists
-            self.cursor.execute("SHOW COLUMNS FROM products LIKE 'mockup_id'")
-            if not self.cursor.fetchone():
-                self.cursor.execute("ALTER TABLE products ADD COLUMN mockup_id VARCHAR(255) NULL")
-            
-            # Check if smart_object_uuid column exists
-            self.cursor.execute("SHOW COLUMNS FROM products LIKE 'smart_object_uuid'")
-            if not self.cursor.fetchone():
-                self.cursor.execute("ALTER TABLE products ADD COLUMN smart_object_uuid VARCHAR(255) NULL")
-            
-            # Check if item_sku column exists in generated_products
-            self.cursor.execute("SHOW COLUMNS FROM generated_products LIKE 'item_sku'")
-            if not self.cursor.fetchone():
-                self.cursor.execute("ALTER TABLE generated_products ADD COLUMN item_sku VARCHAR(100) NULL")
-                self.cursor.execute("ALTER TABLE generated_products ADD INDEX idx_item_sku (item_sku)")
-            
-            # Check if parent_sku column exists in generated_products
-            self.cursor.execute("SHOW COLUMNS FROM generated_products LIKE 'parent_sku'")
-            if not self.cursor.fetchone():
-                self.cursor.execute("ALTER TABLE generated_products ADD COLUMN parent_sku VARCHAR(100) NULL")
-                
-            # Check if mockup_ids column exists
-            self.cursor.execute("SHOW COLUMNS FROM products LIKE 'mockup_ids'")
-            if not self.cursor.fetchone():
-                self.cursor.execute("ALTER TABLE products ADD COLUMN mockup_ids TEXT NULL")
-            
-            # Check if smart_object_uuids column exists
-            self.cursor.execute("SHOW COLUMNS FROM products LIKE 'smart_object_uuids'")
-            if not self.cursor.fetchone():
-                self.cursor.execute("ALTER TABLE products ADD COLUMN smart_object_uuids TEXT NULL")
-            
-            self.connection.commit()
-        except Error as e:
-            st.error(f"Error modifying tables: {e}")
+        Costs one schema version check per process. Pending migrations are
+        normally applied at deploy time by scripts/migrate.py; when
+        DB_AUTO_MIGRATE is enabled they are applied here instead.
+        """
+        global _schema_checked
+        if _schema_checked:
+            return
         
-        self.connection.commit()
+        if not self.cursor:
+            st.error("No database cursor available. Schema not checked.")
+            return
         
-        # Alter table to modify columns if they already exist with smaller size
         try:
-            alter_size_query = "ALTER TABLE products MODIFY COLUMN size TEXT"
-            self.cursor.execute(alter_size_query)
-            
-            alter_color_query = "ALTER TABLE products MODIFY COLUMN color TEXT"
-            self.cursor.execute(alter_color_query)
-            
-            # Add mockup_id and smart_object_uuid columns if they don't exist
-            check_column_query = """
-            SELECT COUNT(*) as column_exists FROM information_schema.columns 
-            WHERE table_schema = DATABASE() AND table_name = 'products' AND column_name = 'mockup_id'
-            """
-            self.cursor.execute(check_column_query)
-            result = self.cursor.fetchone()
-            
-            if result and result['column_exists'] == 0:
-                add_column_query = """
-                ALTER TABLE products 
-                ADD COLUMN mockup_id VARCHAR(100) NULL,
-                ADD COLUMN smart_object_uuid VARCHAR(100) NULL
-                """
-                self.cursor.execute(add_column_query)
+            version = get_schema_version(self.cursor)
+            if version is None or version < LATEST_SCHEMA_VERSION:
+                if not DB_CONFIG.get('auto_migrate', False):
+                    st.warning("Database schema is out of date. Run `python scripts/migrate.py` to update it.")
+                    return
                 
-            self.connection.commit()
-        except Error as e:
-            st.warning(f"Table alteration notice: {e}")
+                applied = apply_migrations(self.connection)
+                if applied:
+                    st.info(f"Applied database migrations: {', '.join(str(version) for version in applied)}")
+            
+            _schema_checked = True
+        except (Error, RuntimeError) as e:
+            st.warning(f"Schema migration notice: {e}")
     
+    @_uses_connection
     def add_product(self, product_data):
         """
         Add a new product to the database
@@ -410,11 +780,13 @@ class Database:
             
             self.cursor.execute(query, values)
             self.connection.commit()
+            mark_catalog_changed()
             return self.cursor.lastrowid
         except Error as e:
             st.error(f"Error adding product: {e}")
             return None
     
+    @_uses_connection
     def get_all_products(self):
         """
         Get all products from database
@@ -435,91 +807,435 @@ class Database:
             self.cursor.execute(query)
             result = self.cursor.fetchall()
             df = pd.DataFrame(result) if result else pd.DataFrame()
-            
-            # Ensure image_url is properly formatted if using S3
-            # This ensures any relative paths are converted to absolute when needed
-            # but preserves S3 URLs as they are
-            if not df.empty and 'image_url' in df.columns:
-                from utils.api import is_s3_url
-                import os
-                
-                def format_image_url(url):
-                    if not url:
-                        return url
-                    if is_s3_url(url):
-                        return url  # S3 URLs are already complete
-                    # Convert relative paths to absolute if needed
-                    elif os.path.exists(url):
-                        return os.path.abspath(url)
-                    return url
-                
-                df['image_url'] = df['image_url'].apply(format_image_url)
-            
-            return df
+
+            return self._format_image_urls(df)
         except Error as e:
             st.error(f"Error retrieving products: {e}")
             return pd.DataFrame()
-    
-    def get_product(self, product_id):
+
+    @_uses_connection
+    def get_recent_products(self, limit=5):
         """
-        Get a specific product by ID
-        
+        Get the most recently created products
+
         Args:
-            product_id (int): Product ID
-            
+            limit (int): Maximum number of products to return
+
         Returns:
-            dict: Product data or None if not found
+            DataFrame: Products as pandas DataFrame, newest first
         """
         if not self._check_connection():
-            st.error(f"Cannot get product {product_id}: database connection failed")
-            return None
-            
+            st.error("Cannot get recent products: database connection failed")
+            return pd.DataFrame()
+
         try:
-            query = "SELECT * FROM products WHERE id = %s"
-            self.cursor.execute(query, (product_id,))
-            return self.cursor.fetchone()
+            query = "SELECT * FROM products ORDER BY created_at DESC, id DESC LIMIT %s"
+            self.cursor.execute(query, (int(limit),))
+            result = self.cursor.fetchall()
+            df = pd.DataFrame(result) if result else pd.DataFrame()
+
+            return self._format_image_urls(df)
         except Error as e:
-            st.error(f"Error retrieving product {product_id}: {e}")
-            return None
-    
-    def update_product(self, product_id, product_data):
+            st.error(f"Error retrieving recent products: {e}")
+            return pd.DataFrame()
+
+    def _format_image_urls(self, df):
         """
-        Update a product
-        
+        Ensure image_url is properly formatted if using S3
+
+        Any relative paths are converted to absolute when needed
+        but S3 URLs are preserved as they are
+        """
+        if df.empty or 'image_url' not in df.columns:
+            return df
+
+        from utils.api import is_s3_url
+
+        def format_image_url(url):
+            if not url or not isinstance(url, str):
+                return url
+            if is_s3_url(url):
+                return url  # S3 URLs are already complete
+            # Convert relative paths to absolute if needed
+            elif os.path.exists(url):
+                return os.path.abspath(url)
+            return url
+
+        df['image_url'] = df['image_url'].apply(format_image_url)
+        return df
+
+    def _product_list_branches(self, search_term=None, category=None, product_type="All",
+                               keys_only=False, after=None, limit=None):
+        """
+        Build the per-table SELECT branches used by the Product List queries
+
+        Both tables are projected onto the same set of columns so they can be
+        combined with UNION ALL and paginated in a single statement. Every
+        branch selects 'list_rows', the number of rows the Product List shows
+        for the product.
+
         Args:
-            product_id (int): Product ID to update
-            product_data (dict): Updated product data
-            
+            keys_only (bool): Select only the sort key columns and list_rows
+            after (tuple, optional): (created_at, id) to start from, inclusive; without
+                a search term each branch then walks its created_at index from there
+            limit (int, optional): Maximum rows per branch, in Product List order;
+                only applied without a search term
+
         Returns:
-            bool: True if update successful, False otherwise
+            list: (select_sql, params) tuples, one per table that can match the filters.
+                With a search term each branch also selects a 'relevance' score.
         """
-        if not self._check_connection():
-            st.error(f"Cannot update product {product_id}: database connection failed")
-            return False
-            
-        try:
-            query = """
-            UPDATE products SET
-                product_name = %s,
-                item_sku = %s,
-                parent_child = %s,
-                parent_sku = %s,
-                size = %s,
-                color = %s,
-                image_url = %s,
-                marketplace_title = %s,
-                category = %s,
-                tax_class = %s,
-                quantity = %s,
-                price = %s,
-                mockup_id = %s,
-                smart_object_uuid = %s,
-                mockup_ids = %s,
-                smart_object_uuids = %s
-            WHERE id = %s
+        if keys_only:
+            regular_columns = "id, created_at, 'Regular' AS product_type, 1 AS list_rows"
+            generated_columns = "id, created_at, 'Generated' AS product_type, list_rows"
+        else:
+            regular_columns = """
+                id, product_name, item_sku, parent_child, parent_sku, size, color,
+                image_url, NULL AS original_design_url, NULL AS mockup_urls,
+                category, price, quantity, created_at, 'Regular' AS product_type, 1 AS list_rows
             """
-            values = (
-                product_data['product_name'],
+            generated_columns = """
+                id, product_name, item_sku, parent_child, parent_sku, size, color,
+                NULL AS image_url, original_design_url, mockup_urls,
+                NULL AS category, NULL AS price, NULL AS quantity, created_at, 'Generated' AS product_type,
+                list_rows
+            """
+
+        branches = []
+        if product_type in ("All", "Regular"):
+            branches.append(("products", regular_columns, True))
+        # Generated products have no category, so a category filter excludes them
+        if product_type in ("All", "Generated") and not (category and category != "All"):
+            branches.append(("generated_products", generated_columns, False))
+
+        search_term = (search_term or '').strip()
+        fulltext = len(search_term) >= FULLTEXT_MIN_TERM_LENGTH
+
+        result = []
+        for table, columns, has_category in branches:
+            conditions = []
+            params = []
+            select_params = []
+
+            if fulltext:
+                # Phrase search on the n-gram index matches name, SKU or title fragments
+                columns += f", MATCH({FULLTEXT_COLUMNS}) AGAINST (%s IN BOOLEAN MODE) AS relevance"
+                select_params.append(fulltext_phrase(search_term))
+                conditions.append(f"MATCH({FULLTEXT_COLUMNS}) AGAINST (%s IN BOOLEAN MODE)")
+                params.append(fulltext_phrase(search_term))
+            elif search_term:
+                # Too short for the index; fall back to a scan
+                pattern = f"%{search_term}%"
+                columns += ", 0 AS relevance"
+                conditions.append("(product_name LIKE %s OR item_sku LIKE %s)")
+                params.extend([pattern, pattern])
+
+            if has_category and category and category != "All":
+                conditions.append("category = %s")
+                params.append(category)
+
+            # Relevance order cannot use an index, so keyset and limit only apply to the created_at order
+            if after is not None and not search_term:
+                conditions.append("(created_at, id) <= (%s, %s)")
+                params.extend(after)
+
+            where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            sql = f"SELECT {columns} FROM {table}{where_sql}"
+            if limit is not None and not search_term:
+                # One spare row: the caller's exact keyset filter may drop the row equal to `after`
+                sql += " ORDER BY created_at DESC, id DESC LIMIT %s"
+                params.append(int(limit) + (1 if after is not None else 0))
+            result.append((sql, select_params + params))
+
+        return result
+
+    def _product_list_page_keys(self, search_term, category, product_type, after, inclusive, limit):
+        """
+        Get the sort keys and list_rows of the next products in Product List order
+
+        Args:
+            after (tuple, optional): Sort key to continue from (see query_products), None for the start
+            inclusive (bool): Include the product whose key is after
+            limit (int): Maximum products to return
+
+        Returns:
+            list: Row dicts with the sort key columns and 'list_rows'
+        """
+        searching = bool((search_term or '').strip())
+        key_columns = PRODUCT_LIST_KEY_COLUMNS[searching]
+        branches = self._product_list_branches(
+            search_term, category, product_type, keys_only=True,
+            after=after[-3:-1] if after else None, limit=limit
+        )
+        if not branches:
+            return []
+
+        union_sql = " UNION ALL ".join(f"({sql})" for sql, _ in branches)
+        params = [param for _, params in branches for param in params]
+
+        keyset_sql = ""
+        if after:
+            placeholders = ', '.join(['%s'] * len(key_columns))
+            keyset_sql = f" WHERE ({', '.join(key_columns)}) {'<=' if inclusive else '<'} ({placeholders})"
+            params.extend(after)
+
+        order_sql = ", ".join(f"{column} DESC" for column in key_columns)
+        self.cursor.execute(
+            f"SELECT * FROM ({union_sql}) AS matched{keyset_sql} ORDER BY {order_sql} LIMIT %s",
+            params + [int(limit)]
+        )
+        return self.cursor.fetchall()
+
+    @_uses_connection
+    def query_products(self, search_term=None, category=None, product_type="All", page=1, per_page=5, anchor=None):
+        """
+        Get a single page of regular and generated products with filters applied in SQL
+
+        Pages are counted in Product List rows rather than products, since a
+        generated product is shown once per mockup color and size (its stored
+        list_rows). The page is located by walking the narrow sort keys from
+        an anchor, the first product of an earlier page, so moving to the next
+        page reads about one page of keys; without an anchor the walk starts at
+        the first product. Each walk and the page itself are keyset queries
+        that, without a search term, read each table's created_at index.
+
+        A product whose rows straddle a page boundary is returned for both
+        pages; its 'row_start' column is the 0-based index of its first row, so
+        the caller can keep only the rows that fall on this page.
+
+        Args:
+            search_term (str, optional): Matched against product name, SKU and marketplace
+                title; results are then ordered by relevance
+            category (str, optional): Category to filter on ("All" or None for no filter)
+            product_type (str): "All", "Regular" or "Generated"
+            page (int): 1-based page number
+            per_page (int): Number of rows per page
+            anchor (dict, optional): An anchor returned for an earlier call with the same filters
+
+        Returns:
+            tuple: (DataFrame with the products on the requested page, total matching row count,
+                anchor of this page to pass back for later pages, or None)
+        """
+        if not self._check_connection():
+            st.error("Cannot query products: database connection failed")
+            return pd.DataFrame(), 0, None
+
+        try:
+            branches = self._product_list_branches(search_term, category, product_type, keys_only=True)
+            if not branches:
+                return pd.DataFrame(), 0, None
+
+            union_sql = " UNION ALL ".join(f"({sql})" for sql, _ in branches)
+            union_params = [param for _, params in branches for param in params]
+
+            # Total rows from the stored per-product counts, without touching the child tables
+            count_query = f"SELECT CAST(COALESCE(SUM(list_rows), 0) AS SIGNED) AS total FROM ({union_sql}) AS matched"
+            self.cursor.execute(count_query, union_params)
+            total = self.cursor.fetchone()['total']
+
+            if total == 0:
+                return pd.DataFrame(), 0, None
+
+            page = max(1, int(page))
+            offset = (page - 1) * per_page
+            key_columns = PRODUCT_LIST_KEY_COLUMNS[bool((search_term or '').strip())]
+
+            # Walk the sort keys from the anchor to the product holding row `offset`
+            if anchor and anchor['row_start'] <= offset:
+                position, key, inclusive = anchor['row_start'], tuple(anchor['key']), True
+            else:
+                position, key, inclusive = 0, None, True
+            start = None
+            while start is None:
+                rows = self._product_list_page_keys(
+                    search_term, category, product_type, key, inclusive, PRODUCT_LIST_WALK_SIZE
+                )
+                if not rows:
+                    return pd.DataFrame(), total, None
+                for row in rows:
+                    if position + row['list_rows'] > offset:
+                        start = tuple(row[column] for column in key_columns)
+                        break
+                    position += row['list_rows']
+                else:
+                    key, inclusive = tuple(rows[-1][column] for column in key_columns), False
+
+            # Every product has at least one row, so a page never needs more than per_page products
+            page_branches = self._product_list_branches(
+                search_term, category, product_type, after=start[-3:-1], limit=per_page
+            )
+            page_sql = " UNION ALL ".join(f"({sql})" for sql, _ in page_branches)
+            page_params = [param for _, params in page_branches for param in params]
+            placeholders = ', '.join(['%s'] * len(key_columns))
+            order_sql = ", ".join(f"{column} DESC" for column in key_columns)
+            self.cursor.execute(
+                f"""
+                SELECT * FROM ({page_sql}) AS matched
+                WHERE ({', '.join(key_columns)}) <= ({placeholders})
+                ORDER BY {order_sql} LIMIT %s
+                """,
+                page_params + list(start) + [per_page]
+            )
+            result = self.cursor.fetchall()
+            if not result:
+                return pd.DataFrame(), total, None
+
+            df = pd.DataFrame(result)
+            df['row_start'] = position + (df['list_rows'].cumsum() - df['list_rows'])
+            return self._format_image_urls(df), total, {'row_start': position, 'key': start}
+        except Error as e:
+            st.error(f"Error querying products: {e}")
+            return pd.DataFrame(), 0, None
+
+    @_uses_connection
+    def search_products(self, term, filters=None, limit=50, cursor=None):
+        """
+        Search regular and generated products by name, SKU or marketplace title, best matches first
+
+        Results are paged with a keyset cursor rather than an offset, so later
+        pages cost the same as the first.
+
+        Args:
+            term (str): Search term; fragments of names and SKUs match
+            filters (dict, optional): 'category' and/or 'product_type' ("All", "Regular" or "Generated")
+            limit (int): Maximum number of products to return
+            cursor (tuple, optional): next_cursor from the previous call
+
+        Returns:
+            tuple: (DataFrame of matches with a 'relevance' column,
+                next_cursor or None when there are no more matches)
+        """
+        term = (term or '').strip()
+        if not term:
+            return pd.DataFrame(), None
+
+        if not self._check_connection():
+            st.error("Cannot search products: database connection failed")
+            return pd.DataFrame(), None
+
+        filters = filters or {}
+        try:
+            branches = self._product_list_branches(
+                term, filters.get('category'), filters.get('product_type', "All")
+            )
+            if not branches:
+                return pd.DataFrame(), None
+
+            union_sql = " UNION ALL ".join(f"({sql})" for sql, _ in branches)
+            params = [param for _, params in branches for param in params]
+
+            cursor_sql = ""
+            if cursor:
+                cursor_sql = " WHERE (relevance, product_type, id) < (%s, %s, %s)"
+                params.extend(cursor)
+
+            # Fetch one extra row to know whether another page exists
+            query = f"""
+                SELECT * FROM ({union_sql}) AS matches{cursor_sql}
+                ORDER BY relevance DESC, product_type DESC, id DESC
+                LIMIT %s
+            """
+            self.cursor.execute(query, params + [int(limit) + 1])
+            rows = self.cursor.fetchall()
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = (last['relevance'], last['product_type'], last['id'])
+
+            df = pd.DataFrame(rows) if rows else pd.DataFrame()
+            return self._format_image_urls(df), next_cursor
+        except Error as e:
+            st.error(f"Error searching products: {e}")
+            return pd.DataFrame(), None
+
+    @_uses_connection
+    def get_product_categories(self):
+        """
+        Get the distinct product categories
+
+        Returns:
+            list: Sorted list of category names
+        """
+        if not self._check_connection():
+            st.error("Cannot get categories: database connection failed")
+            return []
+
+        try:
+            query = """
+            SELECT DISTINCT category FROM products
+            WHERE category IS NOT NULL AND category != ''
+            ORDER BY category
+            """
+            self.cursor.execute(query)
+            return [row['category'] for row in self.cursor.fetchall()]
+        except Error as e:
+            st.error(f"Error retrieving categories: {e}")
+            return []
+    
+    @_uses_connection
+    def get_product(self, product_id):
+        """
+        Get a specific product by ID
+        
+        Args:
+            product_id (int): Product ID
+            
+        Returns:
+            dict: Product data or None if not found
+        """
+        if not self._check_connection():
+            st.error(f"Cannot get product {product_id}: database connection failed")
+            return None
+            
+        try:
+            query = "SELECT * FROM products WHERE id = %s"
+            self.cursor.execute(query, (product_id,))
+            return self.cursor.fetchone()
+        except Error as e:
+            st.error(f"Error retrieving product {product_id}: {e}")
+            return None
+    
+    @_uses_connection
+    def update_product(self, product_id, product_data):
+        """
+        Update a product
+        
+        Args:
+            product_id (int): Product ID to update
+            product_data (dict): Updated product data
+            
+        Returns:
+            bool: True if update successful, False otherwise
+        """
+        if not self._check_connection():
+            st.error(f"Cannot update product {product_id}: database connection failed")
+            return False
+            
+        try:
+            query = """
+            UPDATE products SET
+                product_name = %s,
+                item_sku = %s,
+                parent_child = %s,
+                parent_sku = %s,
+                size = %s,
+                color = %s,
+                image_url = %s,
+                marketplace_title = %s,
+                category = %s,
+                tax_class = %s,
+                quantity = %s,
+                price = %s,
+                mockup_id = %s,
+                smart_object_uuid = %s,
+                mockup_ids = %s,
+                smart_object_uuids = %s
+            WHERE id = %s
+            """
+            values = (
+                product_data['product_name'],
                 product_data['item_sku'],
                 product_data['parent_child'],
                 product_data['parent_sku'],
@@ -540,11 +1256,13 @@ class Database:
             
             self.cursor.execute(query, values)
             self.connection.commit()
+            mark_catalog_changed()
             return True
         except Error as e:
             st.error(f"Error updating product {product_id}: {e}")
             return False
             
+    @_uses_connection
     def create_generated_product(self, product_data):
         """
         Add a new generated product to the database
@@ -568,9 +1286,6 @@ class Database:
             return None
             
         try:
-            # Check if the table exists, create it if not
-            self._ensure_generated_products_table()
-            
             # Validate required fields
             if 'product_name' not in product_data:
                 st.error("Missing required field: product_name")
@@ -602,32 +1317,11 @@ class Database:
                 if parent_result:
                     parent_sku = parent_result['item_sku']
                 
-            query = """
-            INSERT INTO generated_products (
-                product_name, parent_sku, marketplace_title, size, color,
-                original_design_url, mockup_urls, is_published, parent_product_id, item_sku
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            # Default to not published
-            is_published = product_data.get('is_published', False)
-            
-            values = (
-                product_data['product_name'],
-                parent_sku,  # Use the determined parent_sku
-                product_data.get('marketplace_title', ''),
-                product_data.get('size', '[]'),
-                product_data.get('color', '[]'),
-                product_data.get('original_design_url', ''),
-                product_data.get('mockup_urls', '{}'),
-                is_published,
-                product_data.get('parent_product_id', None),
-                product_data['item_sku']  # Make sure item_sku is included
-            )
-            
-            self.cursor.execute(query, values)
-            self.connection.commit()
+            self.cursor.execute(GENERATED_PRODUCT_INSERT, self._generated_product_values(product_data, parent_sku))
             new_id = self.cursor.lastrowid
+            self._write_generated_variants([(new_id, product_data)])
+            self.connection.commit()
+            mark_catalog_changed()
             st.success(f"Generated product '{product_data['product_name']}' added with ID: {new_id}")
             return new_id
         except KeyError as e:
@@ -637,137 +1331,709 @@ class Database:
             st.error(f"Error adding generated product: {e}")
             return None
     
-    def update_generated_product(self, product_id, product_data):
+    def _generated_product_values(self, product_data, parent_sku):
+        """Build the GENERATED_PRODUCT_INSERT parameters for one product"""
+        return (
+            product_data['product_name'],
+            parent_sku,  # Use the determined parent_sku
+            product_data.get('marketplace_title', ''),
+            product_data.get('size', '[]'),
+            product_data.get('color', '[]'),
+            product_data.get('original_design_url', ''),
+            product_data.get('mockup_urls', '{}'),
+            product_data.get('is_published', False),  # Default to not published
+            product_data.get('parent_product_id', None),
+            product_data['item_sku']  # Make sure item_sku is included
+        )
+    
+    def _write_generated_variants(self, products, replace=False):
         """
-        Update a generated product
+        Write the mockup/size/color child rows of generated products
+        
+        Also stores each product's list_rows, the number of rows it expands
+        to on the Product List. Runs inside the caller's transaction; the
+        caller commits.
         
         Args:
-            product_id (int): Generated Product ID to update
-            product_data (dict): Updated product data
-            
-        Returns:
-            bool: True if update successful, False otherwise
+            products (list): (product id, product data dict) pairs
+            replace (bool): Delete existing child rows first (for updates)
         """
-        if not self._check_connection():
-            st.error(f"Cannot update generated product {product_id}: database connection failed")
-            return False
-            
-        try:
-            query = """
-            UPDATE generated_products SET
-                product_name = %s,
-                item_sku = %s,
-                parent_sku = %s,
-                marketplace_title = %s,
-                size = %s,
-                color = %s,
-                original_design_url = %s,
-                mockup_urls = %s,
-                is_published = %s,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-            """
-            
-            # Default to current published state if not specified
-            is_published = product_data.get('is_published', False)
+        sizes, colors, mockups, list_rows = [], [], [], []
+        for product_id, product_data in products:
+            variants = parse_generated_variants(
+                product_data.get('size'),
+                product_data.get('color'),
+                product_data.get('mockup_urls'),
+                mockup_id=product_data.get('mockup_id'),
+                mockup_thumbnails=product_data.get('mockup_thumbnails')
+            )
+            sizes.extend((product_id,) + size for size in variants['sizes'])
+            colors.extend((product_id,) + color for color in variants['colors'])
+            mockups.extend((product_id,) + mockup for mockup in variants['mockups'])
             
-            values = (
-                product_data['product_name'],
-                product_data.get('item_sku', ''),
-                product_data.get('parent_sku', ''),
-                product_data.get('marketplace_title', ''),
-                product_data.get('size', '[]'),
-                product_data.get('color', '[]'),
-                product_data.get('original_design_url', ''),
-                product_data.get('mockup_urls', '{}'),
-                is_published,
+            plain_mockups = sum(1 for mockup in variants['mockups'] if mockup[2] is None)
+            list_rows.append((
+                list_row_count(plain_mockups, len(variants['mockups']) - plain_mockups, len(variants['sizes'])),
                 product_id
+            ))
+        
+        if replace and products:
+            product_ids = [product_id for product_id, _ in products]
+            placeholders = ', '.join(['%s'] * len(product_ids))
+            for table in ('generated_product_mockups', 'generated_product_sizes', 'generated_product_colors'):
+                self.cursor.execute(f"DELETE FROM {table} WHERE product_id IN ({placeholders})", product_ids)
+        
+        if sizes:
+            self.cursor.executemany(
+                "INSERT INTO generated_product_sizes (product_id, position, size) VALUES (%s, %s, %s)",
+                sizes
             )
-            
-            self.cursor.execute(query, values)
-            self.connection.commit()
-            return True
-        except Error as e:
-            st.error(f"Error updating generated product {product_id}: {e}")
-            return False
+        if colors:
+            self.cursor.executemany(
+                "INSERT INTO generated_product_colors (product_id, position, color_hex) VALUES (%s, %s, %s)",
+                colors
+            )
+        if mockups:
+            self.cursor.executemany("""
+                INSERT INTO generated_product_mockups
+                    (product_id, position, mockup_id, color_hex, s3_url, thumbnail_url)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, mockups)
+        if list_rows:
+            self.cursor.executemany("UPDATE generated_products SET list_rows = %s WHERE id = %s", list_rows)
     
-    def get_all_generated_products(self):
+    @_uses_connection
+    def get_product_mockups(self, product_ids, color=None):
         """
-        Get all generated products from database
+        Get the mockups of generated products from the mockup table
         
+        Args:
+            product_ids (list): Generated product IDs
+            color (str): Only mockups of this color (hex code), optional
+            
         Returns:
-            DataFrame: Generated products as pandas DataFrame or None if error
+            DataFrame: product_id, position, mockup_id, color_hex, s3_url and
+                thumbnail_url, ordered by product and position
         """
-        if not self._check_connection():
-            st.error("Cannot get generated products: database connection failed")
-            return pd.DataFrame()
-            
+        columns = ['product_id', 'position', 'mockup_id', 'color_hex', 's3_url', 'thumbnail_url']
+        product_ids = [int(product_id) for product_id in product_ids]
+        if not product_ids or not self._check_connection():
+            return pd.DataFrame(columns=columns)
+        
         try:
-            # Ensure the table exists
-            self._ensure_generated_products_table()
+            placeholders = ', '.join(['%s'] * len(product_ids))
+            query = f"SELECT {', '.join(columns)} FROM generated_product_mockups WHERE product_id IN ({placeholders})"
+            params = list(product_ids)
+            if color:
+                query += " AND color_hex = %s"
+                params.append(normalize_color_hex(color))
+            query += " ORDER BY product_id, position"
             
-            query = "SELECT * FROM generated_products ORDER BY created_at DESC"
-            self.cursor.execute(query)
+            self.cursor.execute(query, params)
             result = self.cursor.fetchall()
-            return pd.DataFrame(result) if result else pd.DataFrame()
+            return pd.DataFrame(result, columns=columns) if result else pd.DataFrame(columns=columns)
         except Error as e:
-            st.error(f"Error retrieving generated products: {e}")
-            return pd.DataFrame()
+            st.error(f"Error retrieving product mockups: {e}")
+            return pd.DataFrame(columns=columns)
     
-    def get_generated_product(self, product_id):
+    @_uses_connection
+    def get_mockup_url(self, product_id, color):
         """
-        Get a specific generated product by ID
+        Get the mockup image of a generated product for one color
         
         Args:
-            product_id (int): Generated Product ID
+            product_id (int): Generated product ID
+            color (str): Hex color code
             
         Returns:
-            dict: Product data or None if not found
+            str: S3 URL of the mockup, or None if there is none
         """
         if not self._check_connection():
-            st.error(f"Cannot get generated product {product_id}: database connection failed")
             return None
-            
+        
         try:
-            query = "SELECT * FROM generated_products WHERE id = %s"
-            self.cursor.execute(query, (product_id,))
-            return self.cursor.fetchone()
+            self.cursor.execute(
+                "SELECT s3_url FROM generated_product_mockups WHERE product_id = %s AND color_hex = %s",
+                (product_id, normalize_color_hex(color))
+            )
+            row = self.cursor.fetchone()
+            return row['s3_url'] if row else None
         except Error as e:
-            st.error(f"Error retrieving generated product {product_id}: {e}")
+            st.error(f"Error retrieving mockup for product {product_id}: {e}")
             return None
-            
-    def _ensure_generated_products_table(self):
-        """Create the generated_products table if it doesn't exist"""
-        try:
-            # This is now handled in _create_tables() during initialization
-            # Keep this method for backward compatibility with existing code
-            pass
-        except Error as e:
-            st.warning(f"Table creation notice: {e}")
-
-    def delete_product(self, product_id):
+    
+    @_uses_connection
+    def get_design_mockups(self, original_design_url, color=None):
         """
-        Delete a product
+        Get every mockup rendered from one design, optionally for one color
         
         Args:
-            product_id (int): Product ID to delete
+            original_design_url (str): URL of the design image
+            color (str): Only mockups of this color (hex code), optional
             
         Returns:
-            bool: True if deletion successful, False otherwise
+            DataFrame: Mockup rows joined with the generated product's name and SKU
         """
         if not self._check_connection():
-            st.error(f"Cannot delete product {product_id}: database connection failed")
-            return False
-            
+            return pd.DataFrame()
+        
         try:
-            query = "DELETE FROM products WHERE id = %s"
-            self.cursor.execute(query, (product_id,))
-            self.connection.commit()
-            return True
-        except Error as e:
+            query = """
+            SELECT m.product_id, gp.product_name, gp.item_sku, m.mockup_id, m.color_hex, m.s3_url, m.thumbnail_url
+            FROM generated_products gp
+            JOIN generated_product_mockups m ON m.product_id = gp.id
+            WHERE gp.design_hash = %s AND gp.original_design_url = %s
+            """
+            params = [design_hash(original_design_url), original_design_url]
+            if color:
+                query += " AND m.color_hex = %s"
+                params.append(normalize_color_hex(color))
+            query += " ORDER BY m.product_id, m.position"
+            
+            self.cursor.execute(query, params)
+            result = self.cursor.fetchall()
+            return pd.DataFrame(result) if result else pd.DataFrame()
+        except Error as e:
+            st.error(f"Error retrieving design mockups: {e}")
+            return pd.DataFrame()
+    
+    @_uses_connection
+    def get_product_sizes(self, product_ids):
+        """
+        Get the sizes of generated products from the size table
+        
+        Args:
+            product_ids (list): Generated product IDs
+            
+        Returns:
+            DataFrame: product_id, position and size, ordered by product and position
+        """
+        columns = ['product_id', 'position', 'size']
+        product_ids = [int(product_id) for product_id in product_ids]
+        if not product_ids or not self._check_connection():
+            return pd.DataFrame(columns=columns)
+        
+        try:
+            placeholders = ', '.join(['%s'] * len(product_ids))
+            self.cursor.execute(
+                f"SELECT product_id, position, size FROM generated_product_sizes "
+                f"WHERE product_id IN ({placeholders}) ORDER BY product_id, position",
+                product_ids
+            )
+            result = self.cursor.fetchall()
+            return pd.DataFrame(result, columns=columns) if result else pd.DataFrame(columns=columns)
+        except Error as e:
+            st.error(f"Error retrieving product sizes: {e}")
+            return pd.DataFrame(columns=columns)
+    
+    @_uses_connection
+    def create_generated_products_batch(self, products_data, batch_size=500):
+        """
+        Add many generated products in a single transaction
+        
+        Existing SKUs and parent SKUs are looked up with one query each, rows
+        are written with a multi-row INSERT (executemany) and everything is
+        committed once. item_sku is unique, so products whose SKU already
+        exists (or repeats an earlier product in the batch) are left out of
+        the INSERT with status 'duplicate' instead of failing the batch. If a
+        concurrent insert takes a SKU between the lookup and the INSERT, the
+        batch is rolled back and retried once with a fresh lookup.
+        
+        Args:
+            products_data (list): Generated product dicts, as for create_generated_product
+            batch_size (int): Maximum rows per INSERT statement
+            
+        Returns:
+            list: One dict per input product, in order, with 'item_sku', 'id',
+                'status' ('inserted', 'duplicate', 'invalid' or 'failed'),
+                'sku_exists' and 'error'
+        """
+        results = [
+            {'item_sku': None, 'id': None, 'status': 'failed', 'sku_exists': False, 'error': None}
+            for _ in products_data
+        ]
+        if not products_data:
+            return results
+        
+        if not self._check_connection():
+            st.error("Cannot add generated products: database connection failed")
+            for result in results:
+                result['error'] = "database connection failed"
+            return results
+        
+        # Validate and normalize every product before touching the database
+        pending = []
+        for index, product_data in enumerate(products_data):
+            product_data = dict(product_data)
+            if 'item_sku' not in product_data and 'design_sku' in product_data:
+                product_data['item_sku'] = product_data['design_sku']
+            
+            missing = [field for field in ('product_name', 'item_sku') if not product_data.get(field)]
+            results[index]['item_sku'] = product_data.get('item_sku')
+            if missing:
+                results[index]['status'] = 'invalid'
+                results[index]['error'] = f"Missing required field: {', '.join(missing)}"
+                continue
+            pending.append((index, product_data))
+        
+        if not pending:
+            return results
+        
+        for attempt in range(2):
+            try:
+                inserted = self._insert_generated_products(pending, results, batch_size)
+                self.connection.commit()
+                break
+            except Error as e:
+                try:
+                    self.connection.rollback()
+                except Error:
+                    pass
+                if attempt == 0 and is_duplicate_sku_error(e):
+                    # Another session took one of the SKUs after our lookup; look again
+                    continue
+                st.error(f"Error adding generated products: {e}")
+                for index, _ in pending:
+                    results[index]['status'] = 'failed'
+                    results[index]['error'] = str(e)
+                return results
+        
+        if inserted:
+            mark_catalog_changed()
+        for index, new_id in inserted:
+            results[index]['id'] = new_id
+            results[index]['status'] = 'inserted'
+        
+        return results
+    
+    def _insert_generated_products(self, pending, results, batch_size):
+        """
+        Insert the products of create_generated_products_batch whose SKUs are free
+        
+        Runs inside the caller's transaction; the caller commits or rolls back.
+        Products with a SKU that is already taken get status 'duplicate' in results.
+        
+        Args:
+            pending (list): (result index, product data dict) pairs
+            results (list): Per-product result dicts to update
+            batch_size (int): Maximum rows per INSERT statement
+            
+        Returns:
+            list: (result index, new id) pairs for the inserted products
+        """
+        # One lookup for SKUs that are already taken
+        skus = list({product_data['item_sku'] for _, product_data in pending})
+        placeholders = ', '.join(['%s'] * len(skus))
+        self.cursor.execute(
+            f"SELECT DISTINCT item_sku FROM generated_products WHERE item_sku IN ({placeholders})",
+            skus
+        )
+        existing_skus = {row['item_sku'] for row in self.cursor.fetchall()}
+        
+        # item_sku is unique: leave taken SKUs, and repeats within the batch, out of the INSERT
+        to_insert = []
+        batch_skus = set()
+        for index, product_data in pending:
+            sku = product_data['item_sku']
+            results[index]['sku_exists'] = sku in existing_skus
+            if sku in existing_skus or sku in batch_skus:
+                results[index]['status'] = 'duplicate'
+                results[index]['error'] = f"SKU {sku} already exists"
+                continue
+            results[index]['status'] = 'failed'
+            results[index]['error'] = None
+            batch_skus.add(sku)
+            to_insert.append((index, product_data))
+        
+        if not to_insert:
+            return []
+        
+        # One lookup for the parent SKUs that were not passed in
+        parent_ids = list({
+            product_data['parent_product_id'] for _, product_data in to_insert
+            if not product_data.get('parent_sku') and product_data.get('parent_product_id')
+        })
+        parent_skus = {}
+        if parent_ids:
+            placeholders = ', '.join(['%s'] * len(parent_ids))
+            self.cursor.execute(f"SELECT id, item_sku FROM products WHERE id IN ({placeholders})", parent_ids)
+            parent_skus = {row['id']: row['item_sku'] for row in self.cursor.fetchall()}
+        
+        rows = []
+        for index, product_data in to_insert:
+            parent_sku = product_data.get('parent_sku', '')
+            if not parent_sku and product_data.get('parent_product_id'):
+                parent_sku = parent_skus.get(product_data['parent_product_id'], '')
+            rows.append(self._generated_product_values(product_data, parent_sku))
+        
+        for start in range(0, len(rows), batch_size):
+            self.cursor.executemany(GENERATED_PRODUCT_INSERT, rows[start:start + batch_size])
+        
+        # Read the new ids back by their unique SKU rather than assuming consecutive ids
+        new_ids = {}
+        inserted_skus = [product_data['item_sku'] for _, product_data in to_insert]
+        for start in range(0, len(inserted_skus), batch_size):
+            chunk = inserted_skus[start:start + batch_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            self.cursor.execute(
+                f"SELECT id, item_sku FROM generated_products WHERE item_sku IN ({placeholders})",
+                chunk
+            )
+            new_ids.update((row['item_sku'], row['id']) for row in self.cursor.fetchall())
+        
+        inserted = [(index, new_ids[product_data['item_sku']]) for index, product_data in to_insert]
+        self._write_generated_variants([
+            (new_id, product_data) for (_, product_data), (_, new_id) in zip(to_insert, inserted)
+        ])
+        return inserted
+    
+    @_uses_connection
+    def update_generated_product(self, product_id, product_data):
+        """
+        Update a generated product
+        
+        Args:
+            product_id (int): Generated Product ID to update
+            product_data (dict): Updated product data
+            
+        Returns:
+            bool: True if update successful, False otherwise
+        """
+        if not self._check_connection():
+            st.error(f"Cannot update generated product {product_id}: database connection failed")
+            return False
+            
+        try:
+            query = """
+            UPDATE generated_products SET
+                product_name = %s,
+                item_sku = %s,
+                parent_sku = %s,
+                marketplace_title = %s,
+                size = %s,
+                color = %s,
+                original_design_url = %s,
+                mockup_urls = %s,
+                is_published = %s,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+            """
+            
+            # Default to current published state if not specified
+            is_published = product_data.get('is_published', False)
+            
+            values = (
+                product_data['product_name'],
+                product_data.get('item_sku', ''),
+                product_data.get('parent_sku', ''),
+                product_data.get('marketplace_title', ''),
+                product_data.get('size', '[]'),
+                product_data.get('color', '[]'),
+                product_data.get('original_design_url', ''),
+                product_data.get('mockup_urls', '{}'),
+                is_published,
+                product_id
+            )
+            
+            self.cursor.execute(query, values)
+            self._write_generated_variants([(product_id, product_data)], replace=True)
+            self.connection.commit()
+            mark_catalog_changed()
+            return True
+        except Error as e:
+            st.error(f"Error updating generated product {product_id}: {e}")
+            return False
+    
+    @_uses_connection
+    def get_all_generated_products(self):
+        """
+        Get all generated products from database
+        
+        Returns:
+            DataFrame: Generated products as pandas DataFrame or None if error
+        """
+        if not self._check_connection():
+            st.error("Cannot get generated products: database connection failed")
+            return pd.DataFrame()
+            
+        try:
+            query = "SELECT * FROM generated_products ORDER BY created_at DESC"
+            self.cursor.execute(query)
+            result = self.cursor.fetchall()
+            return pd.DataFrame(result) if result else pd.DataFrame()
+        except Error as e:
+            st.error(f"Error retrieving generated products: {e}")
+            return pd.DataFrame()
+    
+    @_uses_connection
+    def get_product_sku_map(self):
+        """
+        Get just the id and item_sku of every regular product, newest first
+        
+        Returns:
+            DataFrame: id and item_sku columns, empty if error
+        """
+        if not self._check_connection():
+            st.error("Cannot get product SKUs: database connection failed")
+            return pd.DataFrame(columns=['id', 'item_sku'])
+            
+        try:
+            self.cursor.execute("SELECT id, item_sku FROM products ORDER BY created_at DESC")
+            result = self.cursor.fetchall()
+            return pd.DataFrame(result) if result else pd.DataFrame(columns=['id', 'item_sku'])
+        except Error as e:
+            st.error(f"Error retrieving product SKUs: {e}")
+            return pd.DataFrame(columns=['id', 'item_sku'])
+    
+    def _open_stream_connection(self):
+        """
+        Get a dedicated pooled connection for a long streaming read
+        
+        Returns:
+            Connection from the pool, or None to use a regular checkout
+        """
+        try:
+            return acquire_pooled_connection()
+        except Error as e:
+            print(f"No pooled connection free for streaming, using a regular checkout: {e}")
+            return None
+    
+    def iter_product_chunks(self, product_type="All", chunk_size=500):
+        """
+        Stream products from the database in chunks
+        
+        Rows are read over a dedicated pooled connection with an unbuffered
+        cursor and fetchmany, so the server sends them as they are consumed
+        and only one chunk is held in memory. Regular products come first,
+        then generated ones, each newest first. If no spare connection is
+        free, each table is paged with iter_products instead (in id order),
+        so nothing stays checked out while the consumer works on a chunk.
+        
+        Args:
+            product_type (str): "All", "Regular" or "Generated"
+            chunk_size (int): Rows per chunk
+            
+        Yields:
+            DataFrame: Chunk of products with a product_type column
+            
+        Raises:
+            mysql.connector.Error: If the database is unreachable or the read fails part way,
+                so a cut-off stream is never mistaken for a complete one
+        """
+        tables = []
+        if product_type in ("All", "Regular"):
+            tables.append(("products", 'Regular'))
+        if product_type in ("All", "Generated"):
+            tables.append(("generated_products", 'Generated'))
+        
+        def label_chunk(df, label):
+            df['product_type'] = label
+            if label == 'Regular':
+                return self._format_image_urls(df)
+            if 'design_sku' in df.columns:
+                return df.rename(columns={'design_sku': 'item_sku'})
+            return df
+        
+        # A connection of its own keeps the stream from blocking other work in this thread
+        stream_connection = self._open_stream_connection()
+        if stream_connection is None:
+            for table, label in tables:
+                for df in self.iter_products(table, batch_size=chunk_size, as_dataframe=True):
+                    yield label_chunk(df, label)
+            return
+        
+        try:
+            for table, label in tables:
+                cursor = instrument_cursor(stream_connection.cursor(dictionary=True, buffered=False), stream_connection)
+                try:
+                    with track_operation("Database.iter_product_chunks"):
+                        cursor.execute(f"SELECT * FROM {table} ORDER BY created_at DESC")
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        yield label_chunk(pd.DataFrame(rows), label)
+                finally:
+                    cursor.close()
+        finally:
+            release_pooled_connection(stream_connection)
+    
+    def iter_products(self, table="products", batch_size=500, where=None, params=None, since_id=0,
+                      columns="*", as_dataframe=False):
+        """
+        Iterate over every row of a product table in id order, one page at a time
+
+        Pages are read with WHERE id > last_id ORDER BY id LIMIT batch_size, so
+        each page is an index range scan that costs the same wherever it falls
+        in the table. The connection is only checked out while a page is read,
+        so a slow consumer does not hold a pool slot between pages.
+
+        Args:
+            table (str): "products" or "generated_products"
+            batch_size (int): Rows per page
+            where (str, optional): Extra SQL condition, with %s placeholders
+            params (list, optional): Values for the placeholders in where
+            since_id (int): Only rows with an id greater than this are returned
+            columns (str): Columns to select; id is always included
+            as_dataframe (bool): Yield one DataFrame per page instead of rows
+
+        Yields:
+            Row named tuples, or DataFrames of up to batch_size rows
+
+        Raises:
+            mysql.connector.Error: If the database is unreachable or a page cannot be read,
+                so callers never mistake a cut-off iteration for a complete one
+        """
+        if table not in ("products", "generated_products"):
+            raise ValueError(f"Cannot iterate over table {table!r}")
+
+        if columns != "*" and "id" not in [column.strip() for column in columns.split(",")]:
+            columns = f"id, {columns}"
+        condition = f" AND ({where})" if where else ""
+        query = f"SELECT {columns} FROM {table} WHERE id > %s{condition} ORDER BY id LIMIT %s"
+
+        last_id = since_id or 0
+        while True:
+            with track_operation("Database.iter_products"), self._checkout():
+                if not self._check_connection():
+                    raise Error(msg=f"Cannot read {table}: database connection failed")
+
+                cursor = instrument_cursor(self.connection.cursor(named_tuple=True), self.connection)
+                try:
+                    cursor.execute(query, [last_id] + list(params or []) + [batch_size])
+                    rows = cursor.fetchall()
+                finally:
+                    cursor.close()
+
+            if not rows:
+                return
+            last_id = rows[-1].id
+
+            if as_dataframe:
+                yield pd.DataFrame(rows, columns=rows[0]._fields)
+            else:
+                yield from rows
+
+            if len(rows) < batch_size:
+                return
+
+    @_uses_connection
+    def get_generated_product(self, product_id):
+        """
+        Get a specific generated product by ID
+        
+        Args:
+            product_id (int): Generated Product ID
+            
+        Returns:
+            dict: Product data or None if not found
+        """
+        if not self._check_connection():
+            st.error(f"Cannot get generated product {product_id}: database connection failed")
+            return None
+            
+        try:
+            query = "SELECT * FROM generated_products WHERE id = %s"
+            self.cursor.execute(query, (product_id,))
+            return self.cursor.fetchone()
+        except Error as e:
+            st.error(f"Error retrieving generated product {product_id}: {e}")
+            return None
+            
+    def _log_deletion(self, table, product_id):
+        """Record a tombstone for the change feed in the current transaction"""
+        self.cursor.execute(
+            "INSERT INTO product_deletions (table_name, product_id) VALUES (%s, %s)",
+            (table, product_id)
+        )
+
+    @_uses_connection
+    def get_changes_since(self, watermark=None):
+        """
+        Get products inserted, updated or deleted since a watermark
+
+        Pass the returned watermark to the next call. The watermark trails the
+        server clock by CHANGE_FEED_OVERLAP seconds, so rows whose transaction
+        committed up to that long after their updated_at are returned again
+        rather than missed; applying a change set twice is harmless. A
+        watermark older than CHANGE_FEED_RETENTION, whose deletion tombstones
+        may have been pruned, gets a full snapshot.
+
+        Args:
+            watermark (datetime, optional): Watermark from the previous call;
+                None returns every product
+
+        Returns:
+            dict: 'full' (True if this is a complete snapshot), 'products' and
+                'generated_products' (DataFrames of changed rows), 'deleted'
+                (table name -> list of deleted ids) and 'watermark'; None on error
+        """
+        if not self._check_connection():
+            print("Cannot read product changes: database connection failed")
+            return None
+
+        try:
+            # Read the clock first so rows changed while we query are picked up next time
+            self.cursor.execute("SELECT NOW() AS server_now")
+            server_now = self.cursor.fetchone()['server_now']
+            if watermark is not None and watermark < server_now - datetime.timedelta(seconds=CHANGE_FEED_RETENTION):
+                watermark = None
+
+            changes = {
+                'full': watermark is None,
+                'deleted': {'products': [], 'generated_products': []},
+                'watermark': server_now - datetime.timedelta(seconds=CHANGE_FEED_OVERLAP)
+            }
+            for table in ('products', 'generated_products'):
+                if watermark is None:
+                    self.cursor.execute(f"SELECT * FROM {table}")
+                else:
+                    self.cursor.execute(f"SELECT * FROM {table} WHERE updated_at >= %s", (watermark,))
+                result = self.cursor.fetchall()
+                df = pd.DataFrame(result) if result else pd.DataFrame()
+                changes[table] = self._format_image_urls(df) if table == 'products' else df
+
+            if watermark is not None:
+                self.cursor.execute(
+                    "SELECT table_name, product_id FROM product_deletions WHERE deleted_at >= %s",
+                    (watermark,)
+                )
+                for row in self.cursor.fetchall():
+                    changes['deleted'].setdefault(row['table_name'], []).append(row['product_id'])
+
+            return changes
+        except Error as e:
+            print(f"Error reading product changes: {e}")
+            return None
+
+    @_uses_connection
+    def delete_product(self, product_id):
+        """
+        Delete a product
+        
+        Args:
+            product_id (int): Product ID to delete
+            
+        Returns:
+            bool: True if deletion successful, False otherwise
+        """
+        if not self._check_connection():
+            st.error(f"Cannot delete product {product_id}: database connection failed")
+            return False
+            
+        try:
+            query = "DELETE FROM products WHERE id = %s"
+            self.cursor.execute(query, (product_id,))
+            if self.cursor.rowcount:
+                self._log_deletion("products", product_id)
+            self.connection.commit()
+            mark_catalog_changed()
+            return True
+        except Error as e:
             st.error(f"Error deleting product {product_id}: {e}")
             return False
 
+    @_uses_connection
     def delete_generated_product(self, product_id):
         """
         Delete a generated product
@@ -785,53 +2051,184 @@ class Database:
         try:
             query = "DELETE FROM generated_products WHERE id = %s"
             self.cursor.execute(query, (product_id,))
+            if self.cursor.rowcount:
+                self._log_deletion("generated_products", product_id)
             self.connection.commit()
+            mark_catalog_changed()
             return True
         except Error as e:
             st.error(f"Error deleting generated product {product_id}: {e}")
             return False
     
-    def get_stats(self):
+    @_uses_connection
+    def get_stats(self, series_since=None):
         """
-        Get basic statistics for dashboard
-        
+        Get dashboard statistics for regular and generated products in one aggregate query
+
+        Args:
+            series_since (date, optional): First day of the per-day created series;
+                None skips the series
+
         Returns:
-            dict: Dictionary containing stats
+            dict: Counters ('total_products', 'parent_count' and 'image_count' for
+                regular products; 'generated_count', 'generated_parent_count',
+                'mockup_count' and 'published_count' for generated products),
+                'categories' (category -> regular product count) and
+                'created_per_day' (list of {'day', 'product_type', 'count'})
         """
+        stats = {
+            'total_products': 0,
+            'parent_count': 0,
+            'image_count': 0,
+            'generated_count': 0,
+            'generated_parent_count': 0,
+            'mockup_count': 0,
+            'published_count': 0,
+            'categories': {},
+            'created_per_day': []
+        }
+
         if not self._check_connection():
             st.error("Cannot get stats: database connection failed")
-            return {
-                'total_products': 0,
-                'parent_count': 0,
-                'image_count': 0
-            }
-            
+            return stats
+
+        # Both tables are scanned once; rows are grouped only as finely as the
+        # category and per-day breakdowns need, and the totals are summed in Python.
+        # Rows created before series_since share a NULL day so they collapse together.
+        query = """
+            SELECT product_type, category, created_day,
+                   COUNT(*) AS total,
+                   SUM(parent_child = 'Parent') AS parents,
+                   SUM(has_image) AS images,
+                   SUM(published) AS published
+            FROM (
+                SELECT 'Regular' AS product_type, category, parent_child,
+                       image_url IS NOT NULL AS has_image, 0 AS published,
+                       IF(created_at >= %s, DATE(created_at), NULL) AS created_day
+                FROM products
+                UNION ALL
+                SELECT 'Generated' AS product_type, NULL AS category, parent_child,
+                       mockup_urls IS NOT NULL AND mockup_urls NOT IN ('', '{}', '[]') AS has_image,
+                       COALESCE(is_published, 0) AS published,
+                       IF(created_at >= %s, DATE(created_at), NULL) AS created_day
+                FROM generated_products
+            ) AS catalog
+            GROUP BY product_type, category, created_day
+        """
+
         try:
-            # Total products
-            self.cursor.execute("SELECT COUNT(*) as total FROM products")
-            total_products = self.cursor.fetchone()['total']
-            
-            # Total parent products
-            self.cursor.execute("SELECT COUNT(*) as parent_count FROM products WHERE parent_child = 'Parent'")
-            parent_count = self.cursor.fetchone()['parent_count']
-            
-            # Total images stored
-            self.cursor.execute("SELECT COUNT(*) as image_count FROM products WHERE image_url IS NOT NULL")
-            image_count = self.cursor.fetchone()['image_count']
-            
-            return {
-                'total_products': total_products,
-                'parent_count': parent_count,
-                'image_count': image_count
-            }
+            self.cursor.execute(query, (series_since, series_since))
+            rows = self.cursor.fetchall()
         except Error as e:
             st.error(f"Error getting stats: {e}")
-            return {
-                'total_products': 0,
-                'parent_count': 0,
-                'image_count': 0
-            }
-    
+            return stats
+
+        created_per_day = {}
+        for row in rows:
+            total = int(row['total'] or 0)
+            parents = int(row['parents'] or 0)
+            images = int(row['images'] or 0)
+
+            if row['product_type'] == 'Regular':
+                stats['total_products'] += total
+                stats['parent_count'] += parents
+                stats['image_count'] += images
+                category = row['category'] or 'Uncategorized'
+                stats['categories'][category] = stats['categories'].get(category, 0) + total
+            else:
+                stats['generated_count'] += total
+                stats['generated_parent_count'] += parents
+                stats['mockup_count'] += images
+                stats['published_count'] += int(row['published'] or 0)
+
+            if row['created_day'] is not None:
+                key = (row['created_day'], row['product_type'])
+                created_per_day[key] = created_per_day.get(key, 0) + total
+
+        stats['created_per_day'] = [
+            {'day': day, 'product_type': product_type, 'count': count}
+            for (day, product_type), count in sorted(created_per_day.items())
+        ]
+        return stats
+
+    @_uses_connection
+    def refresh_stats_rollup(self, since):
+        """
+        Recompute the catalog_daily_stats rows from a given day onwards
+
+        Days in the range are rebuilt from scratch, so deletions are reflected too.
+        Change feed deletion tombstones older than CHANGE_FEED_RETENTION are
+        pruned in the same pass.
+
+        Args:
+            since (date): First day to recompute
+
+        Returns:
+            bool: True if the rollup was refreshed
+        """
+        if not self._check_connection():
+            print("Cannot refresh stats rollup: database connection failed")
+            return False
+
+        try:
+            self.cursor.execute("DELETE FROM catalog_daily_stats WHERE stat_date >= %s", (since,))
+            self.cursor.execute("""
+                INSERT INTO catalog_daily_stats (stat_date, product_type, created_count, published_count)
+                SELECT DATE(created_at), 'Regular', COUNT(*), 0
+                FROM products
+                WHERE created_at >= %s
+                GROUP BY DATE(created_at)
+                UNION ALL
+                SELECT DATE(created_at), 'Generated', COUNT(*), SUM(COALESCE(is_published, 0))
+                FROM generated_products
+                WHERE created_at >= %s
+                GROUP BY DATE(created_at)
+            """, (since, since))
+            self.cursor.execute(
+                "DELETE FROM product_deletions WHERE deleted_at < NOW() - INTERVAL %s SECOND",
+                (CHANGE_FEED_RETENTION,)
+            )
+            self.connection.commit()
+            return True
+        except Error as e:
+            try:
+                self.connection.rollback()
+            except Error:
+                pass
+            print(f"Error refreshing stats rollup: {e}")
+            return False
+
+    @_uses_connection
+    def get_stats_rollup(self, since):
+        """
+        Get the per-day created series from the catalog_daily_stats rollup
+
+        Args:
+            since (date): First day of the series
+
+        Returns:
+            list: {'day', 'product_type', 'count'} dicts ordered by day
+        """
+        if not self._check_connection():
+            print("Cannot read stats rollup: database connection failed")
+            return []
+
+        try:
+            self.cursor.execute("""
+                SELECT stat_date, product_type, created_count
+                FROM catalog_daily_stats
+                WHERE stat_date >= %s
+                ORDER BY stat_date, product_type
+            """, (since,))
+            return [
+                {'day': row['stat_date'], 'product_type': row['product_type'], 'count': row['created_count']}
+                for row in self.cursor.fetchall()
+            ]
+        except Error as e:
+            print(f"Error reading stats rollup: {e}")
+            return []
+
+    @_uses_connection
     def check_if_sku_exists(self, sku):
         """
         Check if a SKU already exists in the database
@@ -840,39 +2237,111 @@ class Database:
             sku (str): The SKU to check
             
         Returns:
-            bool: True if the SKU exists, False otherwise
+            bool: True if the SKU exists or could not be checked, False otherwise
         """
+        existing = self.find_existing_skus([sku])
+        return existing is None or sku in existing
+
+    @_uses_connection
+    def find_existing_skus(self, skus, batch_size=1000):
+        """
+        Find which of many SKUs are already used, in one query per batch
+
+        A SKU counts as used if it is the item SKU of a regular or generated
+        product, or the parent SKU of a generated product. Each branch of the
+        query is an indexed IN lookup.
+
+        Args:
+            skus (list): SKUs to check
+            batch_size (int): Maximum SKUs per query
+
+        Returns:
+            set: The SKUs that already exist, or None if they could not be checked;
+                callers must not treat unchecked SKUs as free
+        """
+        skus = list(dict.fromkeys(sku for sku in skus if sku))
+        if not skus:
+            return set()
+
         if not self._check_connection():
-            st.error(f"Cannot check SKU {sku}: database connection failed")
-            return False
-            
+            st.error("Cannot check SKUs: database connection failed")
+            return None
+
+        existing = set()
         try:
-            # Use the existing cursor
-            cursor = self.cursor if hasattr(self, 'cursor') else self.connection.cursor()
-            
-            # Execute query to check if SKU exists in generated_products table
-            cursor.execute(
-                "SELECT COUNT(*) as count FROM generated_products WHERE item_sku = %s OR parent_sku = %s", 
-                (sku, sku)
-            )
-            
-            # Get the result
-            result = cursor.fetchone()
-            count = result['count'] if isinstance(result, dict) else result[0]
-            
-            return count > 0
-        except Exception as e:
-            st.error(f"Error checking if SKU exists: {e}")
-            return False
+            for start in range(0, len(skus), batch_size):
+                batch = skus[start:start + batch_size]
+                placeholders = ', '.join(['%s'] * len(batch))
+                self.cursor.execute(f"""
+                    SELECT item_sku AS sku FROM products WHERE item_sku IN ({placeholders})
+                    UNION
+                    SELECT item_sku FROM generated_products WHERE item_sku IN ({placeholders})
+                    UNION
+                    SELECT parent_sku FROM generated_products WHERE parent_sku IN ({placeholders})
+                """, batch * 3)
+                existing.update(row['sku'] for row in self.cursor.fetchall())
+            return existing
+        except Error as e:
+            st.error(f"Error checking if SKUs exist: {e}")
+            return None
 
+    @_uses_connection
+    def get_skus_after(self, high_water=None):
+        """
+        Get item SKUs of products added after the given ids
+
+        Args:
+            high_water (dict, optional): Table name -> highest id already seen;
+                tables that are missing are read in full
+
+        Returns:
+            tuple: (set of SKUs, updated high_water dict), or (set(), None) on error
+        """
+        high_water = dict(high_water or {})
+
+        if not self._check_connection():
+            print("Cannot read SKUs: database connection failed")
+            return set(), None
+
+        skus = set()
+        try:
+            for table in ('products', 'generated_products'):
+                self.cursor.execute(
+                    f"SELECT id, item_sku FROM {table} WHERE id > %s ORDER BY id",
+                    (high_water.get(table, 0),)
+                )
+                rows = self.cursor.fetchall()
+                skus.update(row['item_sku'] for row in rows if row['item_sku'])
+                if rows:
+                    high_water[table] = rows[-1]['id']
+            return skus, high_water
+        except Error as e:
+            print(f"Error reading SKUs: {e}")
+            return set(), None
+
+    @_uses_connection
     def get_related_products_by_design(self, design_url, exclude_id=None):
-        """Get all generated products that use the same original design"""
+        """
+        Get all generated products that use the same original design
+        
+        Uses the indexed design_hash column rather than scanning the TEXT URL.
+        
+        Args:
+            design_url (str): URL of the original design image
+            exclude_id (int): Product ID to leave out, optional
+            
+        Returns:
+            DataFrame: Generated products ordered by id
+        """
+        if not design_url or not self._check_connection():
+            return pd.DataFrame()
+        
         try:
             query = """
                 SELECT * FROM generated_products 
-                WHERE original_design_url = %s
+                WHERE design_hash = %s AND original_design_url = %s
             """
-            params = [design_url]
+            params = [design_hash(design_url), design_url]
             
             # Exclude the current product if specified
             if exclude_id is not None:
@@ -883,12 +2352,318 @@ class Database:
             query += " ORDER BY id"
             
             self.cursor.execute(query, params)
-            columns = [col[0] for col in self.cursor.description]
-            result = [dict(zip(columns, row)) for row in self.cursor.fetchall()]
-            return pd.DataFrame(result)
+            result = self.cursor.fetchall()
+            return pd.DataFrame(result) if result else pd.DataFrame()
         except Exception as e:
             print(f"Error getting related products: {e}")
             return pd.DataFrame()
+
+    @_uses_connection
+    def enqueue_render_batch(self, jobs, owner=None, context=None, max_attempts=3):
+        """
+        Queue a batch of render jobs for scripts/render_worker.py
+
+        Args:
+            jobs (list): Job dicts with 'image_url', 'color', 'mockup_id' and 'smart_object_uuid'
+            owner (str, optional): Who queued the batch, e.g. the logged-in username
+            context (dict, optional): JSON-serializable data the page needs to resume the batch
+            max_attempts (int): Attempts per job before it is marked failed
+
+        Returns:
+            str: Batch id, or None on error
+        """
+        if not jobs:
+            return None
+
+        if not self._check_connection():
+            print("Cannot queue render jobs: database connection failed")
+            return None
+
+        batch_id = str(uuid.uuid4())
+        try:
+            self.cursor.execute(
+                "INSERT INTO render_batches (batch_id, owner, context) VALUES (%s, %s, %s)",
+                (batch_id, owner, json.dumps(context, default=str) if context is not None else None)
+            )
+            self.cursor.executemany("""
+                INSERT INTO render_jobs (batch_id, position, image_url, color, mockup_id, smart_object_uuid, max_attempts)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, [
+                (batch_id, position, job['image_url'], job['color'], job.get('mockup_id'), job.get('smart_object_uuid'), max_attempts)
+                for position, job in enumerate(jobs)
+            ])
+            self.connection.commit()
+            return batch_id
+        except Error as e:
+            try:
+                self.connection.rollback()
+            except Error:
+                pass
+            print(f"Error queueing render jobs: {e}")
+            return None
+
+    @_uses_connection
+    def claim_render_jobs(self, worker_id, limit=10, lease_seconds=300):
+        """
+        Claim queued render jobs for a worker
+
+        Jobs whose worker let its lease expire are queued again first (or
+        failed, once out of attempts). Claiming uses SKIP LOCKED, so several
+        workers can poll at once without taking the same job.
+
+        Args:
+            worker_id (str): Identifies the claiming worker
+            limit (int): Maximum jobs to claim
+            lease_seconds (int): Seconds the worker has to finish before the jobs are reclaimed
+
+        Returns:
+            list: Claimed job dicts, oldest first; empty on error
+        """
+        if not self._check_connection():
+            print("Cannot claim render jobs: database connection failed")
+            return []
+
+        try:
+            self.cursor.execute("""
+                UPDATE render_jobs
+                SET status = IF(attempts >= max_attempts, 'failed', 'queued'),
+                    error = IF(attempts >= max_attempts, 'Worker stopped before finishing the job', error),
+                    worker_id = NULL,
+                    lease_expires_at = NULL
+                WHERE status = 'running' AND lease_expires_at < NOW()
+            """)
+            self.connection.commit()
+
+            self.cursor.execute("""
+                SELECT id FROM render_jobs
+                WHERE status = 'queued' AND run_after <= NOW()
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (limit,))
+            job_ids = [row['id'] for row in self.cursor.fetchall()]
+            if not job_ids:
+                self.connection.commit()
+                return []
+
+            placeholders = ', '.join(['%s'] * len(job_ids))
+            self.cursor.execute(f"""
+                UPDATE render_jobs
+                SET status = 'running', worker_id = %s, attempts = attempts + 1,
+                    lease_expires_at = NOW() + INTERVAL %s SECOND
+                WHERE id IN ({placeholders})
+            """, [worker_id, lease_seconds] + job_ids)
+            self.cursor.execute(f"SELECT * FROM render_jobs WHERE id IN ({placeholders}) ORDER BY id", job_ids)
+            jobs = self.cursor.fetchall()
+            self.connection.commit()
+            return jobs
+        except Error as e:
+            try:
+                self.connection.rollback()
+            except Error:
+                pass
+            print(f"Error claiming render jobs: {e}")
+            return []
+
+    @_uses_connection
+    def complete_render_job(self, job_id, worker_id, result_url):
+        """
+        Mark a claimed render job as done
+
+        Args:
+            job_id (int): Job id
+            worker_id (str): Worker that claimed the job
+            result_url (str): Rendered image URL
+
+        Returns:
+            bool: True if the job was still held by this worker and is now done
+        """
+        if not self._check_connection():
+            print(f"Cannot complete render job {job_id}: database connection failed")
+            return False
+
+        try:
+            self.cursor.execute("""
+                UPDATE render_jobs
+                SET status = 'done', result_url = %s, error = NULL, lease_expires_at = NULL
+                WHERE id = %s AND worker_id = %s AND status = 'running'
+            """, (result_url, job_id, worker_id))
+            updated = self.cursor.rowcount == 1
+            self.connection.commit()
+            return updated
+        except Error as e:
+            print(f"Error completing render job {job_id}: {e}")
+            return False
+
+    @_uses_connection
+    def fail_render_job(self, job_id, worker_id, error, retry_delay=30):
+        """
+        Record a failed attempt, queueing the job again if it has attempts left
+
+        Args:
+            job_id (int): Job id
+            worker_id (str): Worker that claimed the job
+            error (str): What went wrong
+            retry_delay (int): Seconds before the job may be claimed again
+
+        Returns:
+            str: The job's new status ('queued' or 'failed'), or None if it was
+                no longer held by this worker or on error
+        """
+        if not self._check_connection():
+            print(f"Cannot fail render job {job_id}: database connection failed")
+            return None
+
+        try:
+            self.cursor.execute("""
+                UPDATE render_jobs
+                SET status = IF(attempts < max_attempts, 'queued', 'failed'),
+                    error = %s,
+                    run_after = NOW() + INTERVAL %s SECOND,
+                    worker_id = NULL,
+                    lease_expires_at = NULL
+                WHERE id = %s AND worker_id = %s AND status = 'running'
+            """, (str(error)[:2000], retry_delay, job_id, worker_id))
+            if self.cursor.rowcount != 1:
+                self.connection.commit()
+                return None
+            self.cursor.execute("SELECT status FROM render_jobs WHERE id = %s", (job_id,))
+            status = self.cursor.fetchone()['status']
+            self.connection.commit()
+            return status
+        except Error as e:
+            print(f"Error failing render job {job_id}: {e}")
+            return None
+
+    @_uses_connection
+    def get_render_batch(self, batch_id):
+        """
+        Get a render batch and its jobs
+
+        Args:
+            batch_id (str): Batch id
+
+        Returns:
+            dict: 'batch_id', 'owner', 'context', 'created_at' and 'jobs' (job
+                dicts in queue order); None if not found or on error
+        """
+        if not self._check_connection():
+            print("Cannot read render batch: database connection failed")
+            return None
+
+        try:
+            self.cursor.execute("SELECT * FROM render_batches WHERE batch_id = %s", (batch_id,))
+            batch = self.cursor.fetchone()
+            if not batch:
+                return None
+
+            context = batch['context']
+            if isinstance(context, (bytes, bytearray)):
+                context = context.decode('utf-8')
+            batch['context'] = json.loads(context) if context else None
+
+            self.cursor.execute("SELECT * FROM render_jobs WHERE batch_id = %s ORDER BY position", (batch_id,))
+            batch['jobs'] = self.cursor.fetchall()
+            return batch
+        except Error as e:
+            print(f"Error reading render batch {batch_id}: {e}")
+            return None
+
+    @_uses_connection
+    def get_render_batches(self, owner=None, limit=10):
+        """
+        Get the most recent render batches with per-status job counts
+
+        Args:
+            owner (str, optional): Only batches queued by this owner
+            limit (int): Maximum batches to return
+
+        Returns:
+            list: Batch dicts with 'batch_id', 'owner', 'created_at', 'total',
+                'done', 'failed' and 'pending', newest first
+        """
+        if not self._check_connection():
+            print("Cannot read render batches: database connection failed")
+            return []
+
+        try:
+            where = "WHERE b.owner = %s" if owner is not None else ""
+            params = [owner] if owner is not None else []
+            self.cursor.execute(f"""
+                SELECT b.batch_id, b.owner, b.created_at,
+                       COUNT(*) AS total,
+                       SUM(j.status = 'done') AS done,
+                       SUM(j.status = 'failed') AS failed,
+                       SUM(j.status IN ('queued', 'running')) AS pending
+                FROM render_batches b
+                JOIN render_jobs j ON j.batch_id = b.batch_id
+                {where}
+                GROUP BY b.batch_id, b.owner, b.created_at
+                ORDER BY b.created_at DESC
+                LIMIT %s
+            """, params + [limit])
+            return [
+                {**row, 'done': int(row['done'] or 0), 'failed': int(row['failed'] or 0), 'pending': int(row['pending'] or 0)}
+                for row in self.cursor.fetchall()
+            ]
+        except Error as e:
+            print(f"Error reading render batches: {e}")
+            return []
+
+    @_uses_connection
+    def cancel_render_batch(self, batch_id):
+        """
+        Cancel the jobs of a batch that no worker has claimed yet
+
+        Args:
+            batch_id (str): Batch id
+
+        Returns:
+            int: Number of jobs cancelled
+        """
+        if not self._check_connection():
+            print("Cannot cancel render batch: database connection failed")
+            return 0
+
+        try:
+            self.cursor.execute(
+                "UPDATE render_jobs SET status = 'cancelled' WHERE batch_id = %s AND status = 'queued'",
+                (batch_id,)
+            )
+            cancelled = self.cursor.rowcount
+            self.connection.commit()
+            return cancelled
+        except Error as e:
+            print(f"Error cancelling render batch {batch_id}: {e}")
+            return 0
+
+    @_uses_connection
+    def retry_render_batch(self, batch_id):
+        """
+        Queue the failed and cancelled jobs of a batch again with fresh attempts
+
+        Args:
+            batch_id (str): Batch id
+
+        Returns:
+            int: Number of jobs queued
+        """
+        if not self._check_connection():
+            print("Cannot retry render batch: database connection failed")
+            return 0
+
+        try:
+            self.cursor.execute("""
+                UPDATE render_jobs
+                SET status = 'queued', attempts = 0, error = NULL, run_after = NOW()
+                WHERE batch_id = %s AND status IN ('failed', 'cancelled')
+            """, (batch_id,))
+            queued = self.cursor.rowcount
+            self.connection.commit()
+            return queued
+        except Error as e:
+            print(f"Error retrying render batch {batch_id}: {e}")
+            return 0
     
     def __del__(self):
         """Close database connection when object is destroyed"""
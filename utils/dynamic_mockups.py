@@ -1,10 +1,13 @@
 import os
-import requests
 import json
 import streamlit as st
 from dotenv import load_dotenv
 from utils.s3_storage import upload_mockup_to_s3
-import time
+from utils.rate_limiter import wait_for_api_slot
+from utils.http_client import http_get, http_post
+from utils.singleflight import singleflight
+from utils.render_cache import make_render_key, get_cached_render, store_render
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Load environment variables
 load_dotenv()
@@ -13,6 +16,40 @@ load_dotenv()
 API_KEY = os.getenv('DYNAMIC_MOCKUPS_API_KEY')
 API_BASE_URL = "https://app.dynamicmockups.com/api/v1"
 
+# Number of render requests allowed in flight at the same time
+RENDER_MAX_WORKERS = int(os.getenv('RENDER_MAX_WORKERS', '6'))
+
+# Run render_mockups() on one asyncio event loop (utils.dynamic_mockups_async) instead of a thread pool
+RENDER_ASYNC = os.getenv('RENDER_ASYNC', 'false').lower() == 'true'
+
+# Template used when a product has no mockup configured
+DEFAULT_MOCKUP_UUID = "db90556b-96a3-483c-ba88-557393b992a1"
+DEFAULT_SMART_OBJECT_UUID = "fb677f24-3dce-4d53-b024-26ea52ea43c9"
+
+def fetch_mockup_collections():
+    """
+    Request the list of mockup collections from the API
+    
+    Safe to call from background threads; errors are raised rather than
+    reported through Streamlit.
+    
+    Returns:
+        list: List of collections
+        
+    Raises:
+        RuntimeError: If the API returns an error status
+    """
+    response = http_get(
+        f"{API_BASE_URL}/collections",
+        before_attempt=wait_for_api_slot,
+        headers={"Authorization": f"Bearer {API_KEY}"}
+    )
+    
+    if response.status_code != 200:
+        raise RuntimeError(f"Failed to fetch mockup collections: {response.status_code}")
+    
+    return response.json().get('collections', [])
+
 def get_mockup_collections():
     """
     Get list of available mockup collections
@@ -21,23 +58,44 @@ def get_mockup_collections():
         list: List of collections or empty list if error occurs
     """
     try:
-        response = requests.get(
-            f"{API_BASE_URL}/collections",
-            headers={"Authorization": f"Bearer {API_KEY}"}
-        )
-        
-        if response.status_code == 200:
-            print(f"API response: {response.json()}")
-            return response.json().get('collections', [])
-        else:
-            print(f"Failed to fetch collections: {response.status_code}")
-            st.error(f"Failed to fetch mockup collections: {response.status_code}")
-            return []
+        return fetch_mockup_collections()
     except Exception as e:
         print(f"Error fetching mockup collections: {e}")
         st.error(f"Error fetching mockup collections: {e}")
         return []
 
+def fetch_mockups():
+    """
+    Request the available mockups from the Dynamic Mockups API
+    
+    Safe to call from background threads; errors are raised rather than
+    reported through Streamlit.
+    
+    Returns:
+        list: List of mockup data
+        
+    Raises:
+        RuntimeError: If the API returns an error status or an invalid response
+    """
+    response = http_get(
+        'https://app.dynamicmockups.com/api/v1/mockups',
+        before_attempt=wait_for_api_slot,
+        headers={
+            'Accept': 'application/json',
+            'x-api-key': os.getenv('DYNAMIC_MOCKUPS_API_KEY'),
+        },
+    )
+    
+    if response.status_code != 200:
+        raise RuntimeError(f"API returned error status: {response.status_code} - {response.text}")
+        
+    result = response.json()
+    
+    if 'data' in result and isinstance(result['data'], list):
+        return result['data']
+    
+    raise RuntimeError("Invalid API response format")
+
 def get_mockups():
     """
     Fetch available mockups from the Dynamic Mockups API
@@ -46,27 +104,7 @@ def get_mockups():
         list: List of mockup data if successful, empty list otherwise
     """
     try:
-        response = requests.get(
-            'https://app.dynamicmockups.com/api/v1/mockups',
-            headers={
-                'Accept': 'application/json',
-                'x-api-key': os.getenv('DYNAMIC_MOCKUPS_API_KEY'),
-            },
-        )
-        
-        if response.status_code != 200:
-            st.error(f"API returned error status: {response.status_code}")
-            st.error(f"Response content: {response.text}")
-            return []
-            
-        result = response.json()
-        
-        if 'data' in result and isinstance(result['data'], list):
-            return result['data']
-        else:
-            st.error("Invalid API response format")
-            return []
-            
+        return fetch_mockups()
     except Exception as e:
         st.error(f"Error fetching mockups: {e}")
         return []
@@ -106,8 +144,11 @@ def generate_mockup(image_url, color, mockup_id=None, smart_object_uuid=None):
             "transparent_background": True
         }
         
-        response = requests.post(
+        response = http_post(
             'https://app.dynamicmockups.com/api/v1/renders',
+            before_attempt=wait_for_api_slot,
+            # Rendering the same request twice has no side effects
+            retry_unsafe=True,
             json=request_data,
             headers={
                 'Content-Type': 'application/json',
@@ -136,37 +177,29 @@ def generate_mockup(image_url, color, mockup_id=None, smart_object_uuid=None):
 
 def batch_generate_mockups(image_url, colors, mockup_id=None, smart_object_uuid=None, delay=1):
     """
-    Generate multiple mockups in sequence using the Dynamic Mockups API
+    Generate multiple mockups concurrently using the Dynamic Mockups API
     
     Args:
         image_url (str): URL of the image to use for all mockups
         colors (list): List of hex color codes to generate mockups for
         mockup_id (str, optional): ID of the mockup to use
         smart_object_uuid (str, optional): UUID of the smart object to use
-        delay (int, optional): Delay between API requests in seconds
+        delay (int, optional): Unused, kept for backwards compatibility
         
     Returns:
         list: List of mockup data if successful, empty list otherwise
     """
-    results = []
-    
-    for i, color in enumerate(colors):
-        # Generate the mockup for this color
-        mockup_data = generate_mockup_api_call(
-            image_url, 
-            color, 
-            mockup_id, 
-            smart_object_uuid
-        )
-        
-        if mockup_data:
-            results.append(mockup_data)
-        
-        # Add a delay between requests to avoid rate limiting, except for the last color
-        if i < len(colors) - 1:
-            time.sleep(delay)
+    jobs = [
+        {
+            'image_url': image_url,
+            'color': color,
+            'mockup_id': mockup_id,
+            'smart_object_uuid': smart_object_uuid
+        }
+        for color in colors
+    ]
     
-    return results
+    return [result for result in render_mockups(jobs) if result]
 
 def generate_mockup_with_color(image_url, mockup_id, color_hex=None, output_format="jpg"):
     """
@@ -205,8 +238,11 @@ def generate_mockup_with_color(image_url, mockup_id, color_hex=None, output_form
         st.write(f"Sending API request to generate mockup with template: {mockup_id}")
         
         # Call the render API
-        response = requests.post(
+        response = http_post(
             f"{API_BASE_URL}/render",
+            before_attempt=wait_for_api_slot,
+            # Rendering the same request twice has no side effects
+            retry_unsafe=True,
             headers={
                 "Authorization": f"Bearer {API_KEY}",
                 "Content-Type": "application/json"
@@ -238,6 +274,30 @@ def generate_mockup_with_color(image_url, mockup_id, color_hex=None, output_form
         st.error(f"Error generating mockup: {e}")
         return None
 
+def fetch_mockup_details(mockup_id):
+    """
+    Request details for a specific mockup template from the API
+    
+    Args:
+        mockup_id: ID of the mockup template
+        
+    Returns:
+        dict: Mockup details
+        
+    Raises:
+        RuntimeError: If the API returns an error status
+    """
+    response = http_get(
+        f"{API_BASE_URL}/mockups/{mockup_id}",
+        before_attempt=wait_for_api_slot,
+        headers={"Authorization": f"Bearer {API_KEY}"}
+    )
+    
+    if response.status_code != 200:
+        raise RuntimeError(f"Failed to fetch mockup details: {response.status_code}")
+    
+    return response.json().get('mockup')
+
 def get_mockup_details(mockup_id):
     """
     Get details for a specific mockup template
@@ -249,16 +309,7 @@ def get_mockup_details(mockup_id):
         dict: Mockup details or None if error occurs
     """
     try:
-        response = requests.get(
-            f"{API_BASE_URL}/mockups/{mockup_id}",
-            headers={"Authorization": f"Bearer {API_KEY}"}
-        )
-        
-        if response.status_code == 200:
-            return response.json().get('mockup')
-        else:
-            st.error(f"Failed to fetch mockup details: {response.status_code}")
-            return None
+        return fetch_mockup_details(mockup_id)
     except Exception as e:
         st.error(f"Error fetching mockup details: {e}")
         return None
@@ -295,8 +346,11 @@ def upload_psd_template(psd_file_path, name, category=None, tags=None):
                 'metadata': (None, json.dumps(metadata), 'application/json')
             }
             
-            response = requests.post(
+            response = http_post(
                 f"{API_BASE_URL}/psd/upload",
+                before_attempt=wait_for_api_slot,
+                # The file handle cannot be replayed
+                max_retries=0,
                 headers={"Authorization": f"Bearer {API_KEY}"},
                 files=files
             )
@@ -329,39 +383,134 @@ def generate_mockup_for_all_templates(image_url, colors, mockup_ids, smart_objec
     if len(smart_object_uuids) < len(mockup_ids):
         smart_object_uuids.extend([None] * (len(mockup_ids) - len(smart_object_uuids)))
     
-    # Generate mockups for each template and color combination
-    for i, (mockup_id, smart_object_uuid) in enumerate(zip(mockup_ids, smart_object_uuids)):
-        template_results = []
+    # Build one render job for each template and color combination
+    jobs = [
+        {
+            'image_url': image_url,
+            'color': color,
+            'mockup_id': mockup_id,
+            'smart_object_uuid': smart_object_uuid
+        }
+        for mockup_id, smart_object_uuid in zip(mockup_ids, smart_object_uuids)
+        for color in colors
+    ]
+    rendered = render_mockups(jobs)
+    
+    # Group the results back by template, keeping the color order
+    for job, mockup_data in zip(jobs, rendered):
+        if not mockup_data:
+            continue
         
-        for color in colors:
-            # Generate mockup for this specific template and color
-            mockup_data = generate_mockup_api_call(
-                image_url=image_url,
-                color=color,
-                mockup_id=mockup_id,
-                smart_object_uuid=smart_object_uuid
-            )
-            
-            if mockup_data:
-                template_results.append(mockup_data)
-                
-            # Add a small delay to avoid rate limiting
-            time.sleep(0.5)
+        template = results.setdefault(job['mockup_id'], {
+            'mockup_id': job['mockup_id'],
+            'smart_object_uuid': job['smart_object_uuid'],
+            'results': []
+        })
+        template['results'].append(mockup_data)
+    
+    return results
+
+def render_mockups(jobs, max_workers=None, progress_callback=None):
+    """
+    Render a list of mockup jobs concurrently with bounded parallelism
+    
+    Each job is a dict with 'image_url', 'color', 'mockup_id' and
+    'smart_object_uuid' keys. Jobs run on a thread pool, or on one event
+    loop when RENDER_ASYNC is set, so total time is bounded by API
+    concurrency rather than the sum of request latencies.
+    Worker threads never call Streamlit; the progress callback is invoked
+    from the calling thread as each job finishes.
+    
+    Args:
+        jobs (list): List of render job dicts
+        max_workers (int, optional): Maximum concurrent requests, defaults to RENDER_MAX_WORKERS
+            (ASYNC_RENDER_CONCURRENCY when RENDER_ASYNC is set)
+        progress_callback (callable, optional): Called as progress_callback(completed, total, job, result)
         
-        # Store results for this template
-        if template_results:
-            results[mockup_id] = {
-                'mockup_id': mockup_id,
-                'smart_object_uuid': smart_object_uuid,
-                'results': template_results
-            }
+    Returns:
+        list: Mockup data for each job in the same order as jobs, None for failed jobs
+    """
+    if RENDER_ASYNC and jobs:
+        # Imported here because the async client builds on this module
+        from utils.dynamic_mockups_async import render_many_sync
+        return render_many_sync(jobs, max_concurrency=max_workers, progress_callback=progress_callback)
+    
+    results = [None] * len(jobs)
+    if not jobs:
+        return results
+    
+    workers = max(1, min(max_workers or RENDER_MAX_WORKERS, len(jobs)))
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mockup-render") as executor:
+        futures = {
+            executor.submit(
+                generate_mockup_api_call,
+                job.get('image_url'),
+                job.get('color'),
+                job.get('mockup_id'),
+                job.get('smart_object_uuid')
+            ): index
+            for index, job in enumerate(jobs)
+        }
+        
+        completed = 0
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                print(f"Error rendering mockup job {index}: {e}")
+                results[index] = None
+            
+            completed += 1
+            if progress_callback:
+                try:
+                    progress_callback(completed, len(jobs), jobs[index], results[index])
+                except Exception as e:
+                    print(f"Error in render progress callback: {e}")
     
     return results
 
+def build_render_request(image_url, color, mockup_uuid, smart_object_uuid):
+    """
+    Build the body of a render request
+    
+    Args:
+        image_url (str): URL of the image to use
+        color (str): Hex color code
+        mockup_uuid (str): Mockup ID to use
+        smart_object_uuid (str): Smart object UUID to use
+        
+    Returns:
+        dict: Request data in the API documentation format
+    """
+    return {
+        "mockup_uuid": mockup_uuid,
+        "smart_objects": [
+            {
+                "uuid": smart_object_uuid,
+                "color": color,  # For colored objects
+                "asset": {
+                    "url": image_url  # Image URL nested inside the asset object
+                }
+            }
+        ],
+        "format": "png",
+        "width": 1500,
+        "transparent_background": True
+    }
+
+def render_label(image_url, color, mockup_uuid):
+    """Readable name for a render, used in deduplication stats"""
+    return f"{os.path.basename(image_url or '')} · {color} · {mockup_uuid}"
+
 def generate_mockup_api_call(image_url, color, mockup_id, smart_object_uuid):
     """
     Make a single API call to generate a mockup
     
+    Identical renders requested at the same time, e.g. by two operators or
+    a double-clicked button, share one API call.
+    
     Args:
         image_url (str): URL of the image to use
         color (str): Hex color code
@@ -372,33 +521,41 @@ def generate_mockup_api_call(image_url, color, mockup_id, smart_object_uuid):
         dict: Mockup data with rendered URL or None if failed
     """
     # Use provided IDs or fall back to defaults
-    MOCKUP_UUID = mockup_id or "db90556b-96a3-483c-ba88-557393b992a1"
-    SMART_OBJECT_UUID = smart_object_uuid or "fb677f24-3dce-4d53-b024-26ea52ea43c9"
+    MOCKUP_UUID = mockup_id or DEFAULT_MOCKUP_UUID
+    SMART_OBJECT_UUID = smart_object_uuid or DEFAULT_SMART_OBJECT_UUID
     
-    try:
-        # Create request data according to API documentation format
-        request_data = {
-            "mockup_uuid": MOCKUP_UUID,
-            "smart_objects": [
-                {
-                    "uuid": SMART_OBJECT_UUID,
-                    "color": color,  # For colored objects
-                    "asset": {
-                        "url": image_url  # Image URL nested inside the asset object
-                    }
-                }
-            ],
-            "format": "png",
-            "width": 1500,
-            "transparent_background": True
+    # Reuse a previous render with identical parameters instead of calling the API again
+    cache_key = make_render_key(image_url, color, MOCKUP_UUID, SMART_OBJECT_UUID)
+    cached_url = get_cached_render(cache_key)
+    if cached_url:
+        return {
+            'rendered_image_url': cached_url,
+            'color': color
         }
+    
+    mockup_data = singleflight(
+        cache_key,
+        _render_mockup,
+        image_url, color, MOCKUP_UUID, SMART_OBJECT_UUID, cache_key,
+        label=render_label(image_url, color, MOCKUP_UUID)
+    )
+    # Callers that shared the render each get their own copy
+    return dict(mockup_data) if mockup_data else None
+
+def _render_mockup(image_url, color, mockup_uuid, smart_object_uuid, cache_key):
+    """Call the render API and cache the result (see generate_mockup_api_call)"""
+    try:
+        request_data = build_render_request(image_url, color, mockup_uuid, smart_object_uuid)
         
         # Log the request data for debugging
-        print(f"Request data for mockup {MOCKUP_UUID}, smart object {SMART_OBJECT_UUID}:")
+        print(f"Request data for mockup {mockup_uuid}, smart object {smart_object_uuid}:")
         print(json.dumps(request_data, indent=2))
         
-        response = requests.post(
+        response = http_post(
             'https://app.dynamicmockups.com/api/v1/renders',
+            before_attempt=wait_for_api_slot,
+            # Rendering the same request twice has no side effects
+            retry_unsafe=True,
             json=request_data,
             headers={
                 'Content-Type': 'application/json',
@@ -420,6 +577,7 @@ def generate_mockup_api_call(image_url, color, mockup_id, smart_object_uuid):
                 'rendered_image_url': result['data']['export_path'],
                 'color': color
             }
+            store_render(cache_key, mockup_data['rendered_image_url'])
             return mockup_data
         else:
             print("Expected 'data.export_path' in API response but it was not found")
@@ -428,3 +586,25 @@ def generate_mockup_api_call(image_url, color, mockup_id, smart_object_uuid):
     except Exception as e:
         print(f"Error generating mockup: {e}")
         return None
+
+def cache_rendered_mockup(image_url, color, mockup_id, smart_object_uuid, s3_url):
+    """
+    Point the render cache entry for a mockup at its permanent S3 copy
+    
+    Args:
+        image_url (str): URL of the design image that was rendered
+        color (str): Hex color code
+        mockup_id (str): Mockup ID that was rendered
+        smart_object_uuid (str): Smart object UUID that was rendered
+        s3_url (str): S3 URL of the saved mockup
+        
+    Returns:
+        bool: True if the cache entry was updated, False otherwise
+    """
+    cache_key = make_render_key(
+        image_url,
+        color,
+        mockup_id or DEFAULT_MOCKUP_UUID,
+        smart_object_uuid or DEFAULT_SMART_OBJECT_UUID
+    )
+    return store_render(cache_key, s3_url, is_s3=True)
@@ -0,0 +1,337 @@
+import os
+import json
+import asyncio
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from utils.rate_limiter import get_render_rate_limiter
+from utils.http_client import (
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES, HTTP_BACKOFF_MAX,
+    RETRY_STATUSES, IDEMPOTENT_METHODS, backoff_delay, retry_after_delay
+)
+from utils.render_cache import make_render_key, get_cached_render, store_render
+from utils.singleflight import singleflight_async
+from utils.dynamic_mockups import API_BASE_URL, DEFAULT_MOCKUP_UUID, DEFAULT_SMART_OBJECT_UUID, build_render_request, render_label
+
+# Load environment variables
+load_dotenv()
+
+# Renders in flight at once on a single event loop
+ASYNC_RENDER_CONCURRENCY = int(os.getenv('ASYNC_RENDER_CONCURRENCY', '50'))
+
+class AsyncDynamicMockupsClient:
+    """
+    asyncio client for the DynamicMockups API
+
+    One event loop drives every request, so hundreds of renders can be in
+    flight without a thread each. A semaphore bounds how many requests are
+    open at once and the shared rate limiter still paces them. Use it as an
+    async context manager so the HTTP session is closed afterwards:
+
+        async with AsyncDynamicMockupsClient() as client:
+            results = await client.render_many(jobs)
+
+    Cancelling the task that awaits a coroutine cancels its requests.
+    """
+
+    def __init__(self, max_concurrency=None, max_retries=None):
+        self.max_concurrency = max(1, max_concurrency or ASYNC_RENDER_CONCURRENCY)
+        self.max_retries = HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """Create the HTTP session; called by `async with`"""
+        if self._session is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT)
+            )
+
+    async def close(self):
+        """Close the HTTP session and its connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, method, url, retry_unsafe=False, **kwargs):
+        """
+        Send one API request with the same retry rules as utils.http_client
+
+        Returns:
+            tuple: (status code, response body text)
+
+        Raises:
+            aiohttp.ClientError: If the last attempt failed without a response
+            asyncio.TimeoutError: If the last attempt timed out
+        """
+        await self.open()
+        safe_to_repeat = retry_unsafe or method in IDEMPOTENT_METHODS
+
+        attempt = 0
+        while True:
+            # Reserve from the shared budget (a file lock when shared across processes)
+            # on a worker thread, then sleep off any deficit without blocking the loop
+            wait = await asyncio.to_thread(get_render_rate_limiter().reserve)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            try:
+                async with self._semaphore:
+                    async with self._session.request(method, url, **kwargs) as response:
+                        status = response.status
+                        retry_after = retry_after_delay(response)
+                        body = await response.text()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                # A connector error means the request was never sent
+                retryable = safe_to_repeat or isinstance(e, aiohttp.ClientConnectorError)
+                if attempt >= self.max_retries or not retryable:
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"HTTP {method} {url} failed ({e!r}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            else:
+                retryable = status in RETRY_STATUSES and (safe_to_repeat or status == 429)
+                if attempt >= self.max_retries or not retryable:
+                    return status, body
+                delay = min(retry_after, HTTP_BACKOFF_MAX) if retry_after is not None else backoff_delay(attempt)
+                print(f"HTTP {method} {url} returned {status}; retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def render(self, image_url, color, mockup_id=None, smart_object_uuid=None):
+        """
+        Render one mockup; async equivalent of generate_mockup_api_call()
+
+        Args:
+            image_url (str): URL of the image to use
+            color (str): Hex color code
+            mockup_id (str, optional): Mockup ID, defaults to DEFAULT_MOCKUP_UUID
+            smart_object_uuid (str, optional): Smart object UUID, defaults to DEFAULT_SMART_OBJECT_UUID
+
+        Returns:
+            dict: Mockup data with rendered URL or None if failed
+        """
+        mockup_uuid = mockup_id or DEFAULT_MOCKUP_UUID
+        smart_object_uuid = smart_object_uuid or DEFAULT_SMART_OBJECT_UUID
+
+        # Reuse a previous render with identical parameters instead of calling the API again
+        cache_key = make_render_key(image_url, color, mockup_uuid, smart_object_uuid)
+        # The cache is SQLite, so look it up on a worker thread to keep the loop free
+        cached_url = await asyncio.to_thread(get_cached_render, cache_key)
+        if cached_url:
+            return {
+                'rendered_image_url': cached_url,
+                'color': color
+            }
+
+        # Share the API call with identical renders in flight on any thread or loop
+        mockup_data = await singleflight_async(
+            cache_key,
+            self._render_uncached,
+            image_url, color, mockup_uuid, smart_object_uuid, cache_key,
+            label=render_label(image_url, color, mockup_uuid)
+        )
+        return dict(mockup_data) if mockup_data else None
+
+    async def _render_uncached(self, image_url, color, mockup_uuid, smart_object_uuid, cache_key):
+        """Call the render API and cache the result (see render)"""
+        try:
+            status, body = await self._request(
+                'POST',
+                f"{API_BASE_URL}/renders",
+                # Rendering the same request twice has no side effects
+                retry_unsafe=True,
+                json=build_render_request(image_url, color, mockup_uuid, smart_object_uuid),
+                headers={
+                    'Content-Type': 'application/json',
+                    'Accept': 'application/json',
+                    'x-api-key': os.getenv('DYNAMIC_MOCKUPS_API_KEY'),
+                },
+            )
+
+            if status != 200:
+                print(f"API returned error status: {status}")
+                print(f"Response content: {body}")
+                return None
+
+            result = json.loads(body)
+            if 'data' in result and 'export_path' in result['data']:
+                mockup_data = {
+                    'rendered_image_url': result['data']['export_path'],
+                    'color': color
+                }
+                await asyncio.to_thread(store_render, cache_key, mockup_data['rendered_image_url'])
+                return mockup_data
+
+            print("Expected 'data.export_path' in API response but it was not found")
+            return None
+
+        except Exception as e:
+            print(f"Error generating mockup: {e!r}")
+            return None
+
+    async def render_many(self, jobs, progress_callback=None):
+        """
+        Render a list of mockup jobs concurrently; async equivalent of render_mockups()
+
+        Each job is a dict with 'image_url', 'color', 'mockup_id' and
+        'smart_object_uuid' keys. If the awaiting task is cancelled, the
+        renders still in flight are cancelled with it.
+
+        Args:
+            jobs (list): List of render job dicts
+            progress_callback (callable, optional): Called as progress_callback(completed, total, job, result)
+
+        Returns:
+            list: Mockup data for each job in the same order as jobs, None for failed jobs
+        """
+        results = [None] * len(jobs)
+        if not jobs:
+            return results
+
+        async def render_job(index, job):
+            result = await self.render(
+                job.get('image_url'),
+                job.get('color'),
+                job.get('mockup_id'),
+                job.get('smart_object_uuid')
+            )
+            return index, result
+
+        tasks = [asyncio.ensure_future(render_job(index, job)) for index, job in enumerate(jobs)]
+        try:
+            completed = 0
+            for next_done in asyncio.as_completed(tasks):
+                index, result = await next_done
+                results[index] = result
+
+                completed += 1
+                if progress_callback:
+                    try:
+                        progress_callback(completed, len(jobs), jobs[index], results[index])
+                    except Exception as e:
+                        print(f"Error in render progress callback: {e}")
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return results
+
+    async def list_mockups(self):
+        """
+        Request the list of mockups; async equivalent of fetch_mockups()
+
+        Returns:
+            list: List of mockup data
+
+        Raises:
+            RuntimeError: If the API returns an error status or an invalid response
+        """
+        status, body = await self._request(
+            'GET',
+            f"{API_BASE_URL}/mockups",
+            headers={
+                'Accept': 'application/json',
+                'x-api-key': os.getenv('DYNAMIC_MOCKUPS_API_KEY'),
+            },
+        )
+
+        if status != 200:
+            raise RuntimeError(f"API returned error status: {status} - {body}")
+
+        result = json.loads(body)
+        if 'data' in result and isinstance(result['data'], list):
+            return result['data']
+
+        raise RuntimeError("Invalid API response format")
+
+    async def get_mockup_details(self, mockup_id):
+        """
+        Request details for one mockup; async equivalent of fetch_mockup_details()
+
+        Args:
+            mockup_id (str): ID of the mockup
+
+        Returns:
+            dict: Mockup details
+
+        Raises:
+            RuntimeError: If the API returns an error status
+        """
+        status, body = await self._request(
+            'GET',
+            f"{API_BASE_URL}/mockups/{mockup_id}",
+            headers={"Authorization": f"Bearer {os.getenv('DYNAMIC_MOCKUPS_API_KEY')}"}
+        )
+
+        if status != 200:
+            raise RuntimeError(f"Failed to fetch mockup details: {status}")
+
+        return json.loads(body).get('mockup')
+
+def run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code
+
+    Streamlit scripts and CLI tools have no running event loop, so the
+    coroutine runs on a fresh loop in the calling thread. If the caller is
+    already inside a loop, it runs on a helper thread instead.
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        The coroutine's result
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-bridge") as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+def render_many_sync(jobs, max_concurrency=None, progress_callback=None):
+    """
+    Render mockup jobs on one event loop and wait for the results
+
+    Args:
+        jobs (list): List of render job dicts, as for render_mockups()
+        max_concurrency (int, optional): Renders in flight at once, defaults to ASYNC_RENDER_CONCURRENCY
+        progress_callback (callable, optional): Called as progress_callback(completed, total, job, result)
+
+    Returns:
+        list: Mockup data for each job in the same order as jobs, None for failed jobs
+    """
+    async def render_all():
+        async with AsyncDynamicMockupsClient(max_concurrency) as client:
+            return await client.render_many(jobs, progress_callback)
+
+    return run_sync(render_all())
+
+def list_mockups_sync():
+    """Synchronous wrapper around AsyncDynamicMockupsClient.list_mockups()"""
+    async def list_all():
+        async with AsyncDynamicMockupsClient() as client:
+            return await client.list_mockups()
+
+    return run_sync(list_all())
+
+def get_mockup_details_sync(mockup_id):
+    """Synchronous wrapper around AsyncDynamicMockupsClient.get_mockup_details()"""
+    async def get_details():
+        async with AsyncDynamicMockupsClient() as client:
+            return await client.get_mockup_details(mockup_id)
+
+    return run_sync(get_details())
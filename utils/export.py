@@ -1,5 +1,40 @@
+import os
+import glob
+import json
+import time
+import tempfile
+import numpy as np
 import pandas as pd
+from dotenv import load_dotenv
 from utils.api import is_s3_url
+from utils.color_utils import hex_to_color_name
+
+# Load environment variables
+load_dotenv()
+
+# Streaming export configuration
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '500'))
+EXPORT_DIR = os.getenv('EXPORT_DIR')  # defaults to the system temp directory
+EXPORT_PREVIEW_ROWS = int(os.getenv('EXPORT_PREVIEW_ROWS', '200'))
+
+# Seconds an export file is kept on disk; older ones are removed when a new export is written
+EXPORT_FILE_MAX_AGE = int(os.getenv('EXPORT_FILE_MAX_AGE', str(6 * 3600)))
+
+# Columns every export CSV starts with, in order
+EXPORT_REQUIRED_FIELDS = [
+    'product_name', 'item_sku', 'parent_child', 'parent_sku',
+    'size', 'color', 'image_url', 'market_place_title', 'category'
+]
+
+# Extra columns carried through to the export when present
+EXPORT_ADDITIONAL_FIELDS = ['price', 'quantity', 'description', 'product_type']
+
+# Fallback source columns for required fields missing from the data
+EXPORT_FIELD_FALLBACKS = {
+    'item_sku': ['design_sku'],
+    'color': ['colour'],
+    'image_url': ['original_design_url']
+}
 
 def format_products_for_export(df):
     """
@@ -67,6 +102,451 @@ def format_products_for_export(df):
     
     return export_df
 
+def _is_blank(value):
+    """Check for None/NaN/empty values, treating lists and dicts as present"""
+    if isinstance(value, (list, dict)):
+        return False
+    return value is None or value == '' or (isinstance(value, float) and np.isnan(value))
+
+def _parse_json(value):
+    if isinstance(value, str) and value[:1] in ('[', '{'):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+    return None
+
+def parse_json_values(series):
+    """
+    Parse a column of JSON strings, decoding each distinct value only once
+    
+    Args:
+        series (Series): Column of JSON strings
+        
+    Returns:
+        Series: Parsed lists/dicts, None where the value is not JSON
+    """
+    lookup = {value: _parse_json(value) for value in series.dropna().unique() if isinstance(value, str)}
+    return series.map(lambda value: lookup.get(value) if isinstance(value, str) else None)
+
+def _size_values(raw):
+    """Split a size value (plain or JSON list of names/dicts) into export values"""
+    if _is_blank(raw):
+        return []
+    
+    parsed = _parse_json(raw)
+    if parsed is None:
+        return [str(raw)]
+    if isinstance(parsed, list):
+        if all(isinstance(item, dict) and 'name' in item for item in parsed):
+            return [item['name'] for item in parsed]
+        return [str(item).strip('"\'') for item in parsed]
+    return [str(parsed)]
+
+def _color_values(raw):
+    """Split a color value (plain or JSON list) into export values"""
+    if _is_blank(raw):
+        return []
+    
+    parsed = _parse_json(raw)
+    if parsed is None:
+        return [str(raw)]
+    if isinstance(parsed, list):
+        return [str(item).strip('"\'') for item in parsed]
+    return [str(parsed)]
+
+def _map_unique(series, func):
+    """Apply func once per distinct value of a column"""
+    lookup = {}
+    results = []
+    for value in series:
+        key = value if isinstance(value, str) else repr(value)
+        if key not in lookup:
+            lookup[key] = func(value)
+        results.append(lookup[key])
+    return pd.Series(results, index=series.index, dtype=object)
+
+def _explode_assign(df, values, columns):
+    """
+    Explode per-row lists of values and write them into columns
+    
+    Rows whose list is empty are kept once, unchanged. Each list element
+    is a tuple matching `columns`; None entries leave that column alone.
+    
+    Returns:
+        tuple: (exploded DataFrame with a fresh index, source row label of each row)
+    """
+    values = values.map(lambda items: items if items else [None])
+    df = df.assign(_variant=values.values).explode('_variant')
+    source_rows = df.index
+    df = df.reset_index(drop=True)
+    
+    variants = df['_variant']
+    expanded = variants.notna()
+    if expanded.any():
+        unpacked = pd.DataFrame(variants[expanded].tolist(), index=variants[expanded].index, columns=columns)
+        for column in columns:
+            if column not in df.columns:
+                df[column] = pd.Series(np.nan, index=df.index, dtype=object)
+            mask = unpacked[column].notna()
+            df.loc[unpacked.index[mask], column] = unpacked.loc[mask, column].values
+    
+    return df.drop(columns=['_variant']), source_rows
+
+def _follow(mask, source_rows):
+    """Carry a row mask over to the rows produced by _explode_assign"""
+    return pd.Series(mask.loc[source_rows].values, dtype=bool)
+
+def expand_products_for_export(df, split_variants=True):
+    """
+    Expand products into one export row per mockup color (and size/color variant)
+    
+    Replaces the per-row iterrows/json.loads loops: JSON columns are parsed
+    once per distinct value and rows are multiplied with explode.
+    
+    Generated products with a mockup_urls JSON object get one row per color,
+    with image_url set to that color's mockup and color set to its name. With
+    split_variants, parent rows have size/color cleared and child rows are also
+    split per size and (for products without mockups) per color.
+    
+    Args:
+        df (DataFrame): Combined products with a product_type column
+        split_variants (bool): Whether to split child rows by size and color
+        
+    Returns:
+        DataFrame: Expanded rows with a fresh index, in the original order
+    """
+    if df.empty:
+        return df.copy()
+    
+    df = df.reset_index(drop=True).astype(object)
+    
+    product_type = df['product_type'] if 'product_type' in df.columns else pd.Series('', index=df.index)
+    if 'mockup_urls' in df.columns:
+        has_mockups = (product_type == 'Generated') & ~df['mockup_urls'].map(_is_blank)
+    else:
+        has_mockups = pd.Series(False, index=df.index)
+    
+    if split_variants:
+        if 'parent_child' in df.columns:
+            is_child = df['parent_child'] != 'Parent'
+        else:
+            is_child = pd.Series(True, index=df.index)
+        
+        # Parent rows never carry size or color
+        for column in ['size', 'color', 'colour']:
+            if column in df.columns:
+                df.loc[~is_child, column] = ''
+        
+        # One row per size for child products
+        if 'size' in df.columns:
+            sizes = _map_unique(df['size'], _size_values).where(is_child, None)
+            df, source_rows = _explode_assign(df, sizes.map(lambda items: [(item,) for item in items or []]), ['size'])
+            has_mockups = _follow(has_mockups, source_rows)
+            is_child = _follow(is_child, source_rows)
+        
+        # One row per color for child products without mockups; mockups set colors below
+        if 'color' in df.columns or 'colour' in df.columns:
+            color_source = df['color'] if 'color' in df.columns else pd.Series(None, index=df.index, dtype=object)
+            if 'colour' in df.columns:
+                color_source = df['colour'].where(df['colour'].notna(), color_source)
+            colors = _map_unique(color_source, _color_values).where(is_child & ~has_mockups, None)
+            df, source_rows = _explode_assign(df, colors.map(lambda items: [(item,) for item in items or []]), ['color'])
+            has_mockups = _follow(has_mockups, source_rows)
+    
+    if not has_mockups.any():
+        return df
+    
+    # One row per mockup color for generated products
+    parsed_mockups = parse_json_values(df['mockup_urls'].where(has_mockups, None))
+    color_names = {}
+    
+    def mockup_variants(parsed):
+        if isinstance(parsed, dict):
+            variants = []
+            for color_code, url in parsed.items():
+                if color_code not in color_names:
+                    color_names[color_code] = hex_to_color_name(color_code)
+                variants.append((url, color_names[color_code], color_code.replace("#", "")))
+            return variants
+        if isinstance(parsed, list) and parsed:
+            # Array format has no color information, so only the first URL is used
+            return [(parsed[0], None, None)]
+        return []
+    
+    df, _ = _explode_assign(df, parsed_mockups.map(mockup_variants), ['image_url', 'color', 'original_hex'])
+    return df
+
+def match_mockup_urls(colors, mockup_urls):
+    """
+    Find the mockup URL matching each row's color
+    
+    Builds one lookup table from every row's mockup JSON object and merges
+    it against the colors, instead of scanning each row's keys. A color
+    matches a key by hex code (with or without '#', any case) or by color name.
+    
+    Args:
+        colors (Series): Color value per row (hex code or color name)
+        mockup_urls (Series): mockup_urls JSON per row, aligned with colors
+        
+    Returns:
+        Series: Matched URL per row, NaN where nothing matches
+    """
+    parsed = parse_json_values(mockup_urls)
+    items = parsed.map(lambda data: list(data.items()) if isinstance(data, dict) else [])
+    items = items[items.map(len) > 0].explode()
+    
+    if items.empty:
+        return pd.Series(np.nan, index=colors.index, dtype=object)
+    
+    lookup = pd.DataFrame(items.tolist(), index=items.index, columns=['key', 'url'])
+    lookup.index.name = '_row'
+    lookup = lookup.reset_index()
+    
+    # Precompute the color name of each distinct key
+    key_names = {key: hex_to_color_name(key).lower() for key in lookup['key'].unique()}
+    by_hex = lookup.assign(match=lookup['key'].str.lower().str.lstrip('#'), priority=0)
+    by_name = lookup.assign(match=lookup['key'].map(key_names), priority=1)
+    lookup = (
+        pd.concat([by_hex, by_name], ignore_index=True)
+        .sort_values(['_row', 'priority'], kind='mergesort')
+        .drop_duplicates(['_row', 'match'])
+    )
+    
+    wanted = pd.DataFrame({
+        '_row': colors.index,
+        'match': colors.map(lambda value: '' if _is_blank(value) else str(value).lower().lstrip('#')).values
+    })
+    matched = wanted.merge(lookup[['_row', 'match', 'url']], on=['_row', 'match'], how='left')
+    
+    # Several keys can share a name; keep the first like the key order of the JSON
+    matched = matched.drop_duplicates('_row')
+    return pd.Series(matched['url'].values, index=colors.index, dtype=object)
+
+def build_marketplace_titles(df):
+    """
+    Build "name - size - color" marketplace titles, skipping empty parts
+    
+    Args:
+        df (DataFrame): Rows with product_name, size and color columns
+        
+    Returns:
+        Series: Title per row
+    """
+    titles = pd.Series('', index=df.index, dtype=object)
+    
+    for column in ['product_name', 'size', 'color']:
+        if column not in df.columns:
+            continue
+        part = df[column].map(lambda value: '' if _is_blank(value) else str(value))
+        both = (titles != '') & (part != '')
+        titles = pd.Series(np.where(both, titles + ' - ' + part, titles + part), index=df.index, dtype=object)
+    
+    return titles
+
+def prepare_product_export(df, parent_products=None, default_parent_sku=None):
+    """
+    Build the export table for the Product List "Generate CSV" action
+    
+    Args:
+        df (DataFrame): Combined regular and generated products with a product_type column
+        parent_products (DataFrame): Regular products used to resolve generated parent_id values (optional)
+        default_parent_sku (str): Parent SKU for generated products without one; defaults to
+            the first regular product in df (optional)
+        
+    Returns:
+        DataFrame: Export rows with EXPORT_REQUIRED_FIELDS first, then any extra fields
+    """
+    if df.empty:
+        return pd.DataFrame(columns=EXPORT_REQUIRED_FIELDS)
+    
+    export_df = expand_products_for_export(df, split_variants=True)
+    product_type = export_df['product_type'] if 'product_type' in export_df.columns else pd.Series('', index=export_df.index)
+    mask_regular = product_type == 'Regular'
+    mask_generated = product_type == 'Generated'
+    
+    # Generated products show the mockup matching the row's color, or the first mockup
+    if 'mockup_urls' in export_df.columns:
+        has_mockups = mask_generated & export_df['mockup_urls'].map(lambda value: not _is_blank(value))
+        if has_mockups.any():
+            if 'image_url' not in export_df.columns:
+                export_df['image_url'] = ''
+            mockup_urls = export_df.loc[has_mockups, 'mockup_urls']
+            parsed = parse_json_values(mockup_urls)
+            first_mockup = pd.Series(
+                [
+                    (list(data.values())[0] if isinstance(data, dict) and data else
+                     data[0] if isinstance(data, list) and data else
+                     '' if isinstance(raw, str) and raw[:1] in ('[', '{') else raw)
+                    for raw, data in zip(mockup_urls, parsed)
+                ],
+                index=mockup_urls.index,
+                dtype=object
+            )
+            matched = match_mockup_urls(export_df.loc[has_mockups, 'color'], mockup_urls)
+            export_df.loc[has_mockups, 'image_url'] = matched.where(matched.notna(), first_mockup)
+    
+    # Required fields, falling back to equivalent source columns
+    standardized_df = pd.DataFrame(index=export_df.index)
+    for field in EXPORT_REQUIRED_FIELDS:
+        source = next(
+            (column for column in [field] + EXPORT_FIELD_FALLBACKS.get(field, []) if column in export_df.columns),
+            None
+        )
+        standardized_df[field] = export_df[source] if source else ''
+    
+    if 'product_type' in export_df.columns:
+        standardized_df.loc[mask_regular, 'parent_child'] = 'Parent'
+        standardized_df.loc[mask_generated, 'parent_child'] = 'Child'
+        standardized_df.loc[mask_regular, 'parent_sku'] = ''
+        
+        # Generated rows keep their stored parent SKU, falling back to the first regular product
+        if default_parent_sku is None and mask_regular.any():
+            default_parent_sku = export_df.loc[mask_regular, 'item_sku'].iloc[0]
+        if mask_generated.any() and default_parent_sku is not None:
+            missing_parent = mask_generated & standardized_df['parent_sku'].map(_is_blank)
+            standardized_df.loc[missing_parent, 'parent_sku'] = default_parent_sku
+        
+        # An explicit parent_id wins when the parent product can be found
+        if (mask_generated.any() and parent_products is not None and 'parent_id' in export_df.columns
+                and not parent_products.empty and 'item_sku' in parent_products.columns):
+            parent_skus = parent_products.drop_duplicates('id').set_index('id')['item_sku']
+            parent_ids = export_df.loc[mask_generated, 'parent_id']
+            has_parent = parent_ids.notna() & parent_ids.astype(bool) & parent_ids.isin(parent_skus.index)
+            standardized_df.loc[has_parent[has_parent].index, 'parent_sku'] = parent_ids[has_parent].map(parent_skus)
+    
+    for field in EXPORT_ADDITIONAL_FIELDS:
+        if field in export_df.columns:
+            standardized_df[field] = export_df[field]
+    
+    standardized_df['market_place_title'] = ''
+    if mask_generated.any():
+        # Generated products use their product name as category
+        standardized_df.loc[mask_generated, 'category'] = standardized_df.loc[mask_generated, 'product_name']
+        
+        # Stored marketplace titles win over the generated "name - size - color" title
+        titles = build_marketplace_titles(standardized_df.loc[mask_generated])
+        if 'marketplace_title' in export_df.columns:
+            stored = export_df.loc[mask_generated, 'marketplace_title']
+            titles = stored.where(~stored.map(_is_blank), titles)
+        standardized_df.loc[mask_generated, 'market_place_title'] = titles
+    
+    column_order = EXPORT_REQUIRED_FIELDS + [col for col in standardized_df.columns if col not in EXPORT_REQUIRED_FIELDS]
+    return standardized_df[column_order]
+
+def write_product_export(chunks, fileobj, parent_products=None, default_parent_sku=None):
+    """
+    Write the product export CSV one chunk of products at a time
+    
+    Every chunk is expanded and standardized on its own and appended to
+    fileobj, so only one chunk is held in memory. The columns are fixed to
+    EXPORT_REQUIRED_FIELDS + EXPORT_ADDITIONAL_FIELDS so chunks from the
+    regular and generated tables line up under a single header.
+    
+    Args:
+        chunks (iterable): DataFrames of products with a product_type column
+        fileobj: Text file object to write to
+        parent_products (DataFrame): id/item_sku of regular products (optional)
+        default_parent_sku (str): Parent SKU for generated products without one (optional)
+        
+    Returns:
+        int: Number of rows written
+    """
+    columns = EXPORT_REQUIRED_FIELDS + EXPORT_ADDITIONAL_FIELDS
+    rows_written = 0
+    header = True
+    
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        
+        chunk = prepare_product_export(chunk, parent_products, default_parent_sku).reindex(columns=columns)
+        chunk['price'] = pd.to_numeric(chunk['price'], errors='coerce').fillna(0.0)
+        chunk['quantity'] = pd.to_numeric(chunk['quantity'], errors='coerce').fillna(0).astype(int)
+        
+        chunk.to_csv(fileobj, index=False, header=header)
+        header = False
+        rows_written += len(chunk)
+    
+    if header:
+        # Nothing to export, still write the header row
+        pd.DataFrame(columns=columns).to_csv(fileobj, index=False)
+    
+    return rows_written
+
+def stream_product_export(chunks, parent_products=None, default_parent_sku=None):
+    """
+    Write the product export to a temporary CSV file on disk
+    
+    Args:
+        chunks (iterable): DataFrames of products, e.g. from Database.iter_product_chunks
+        parent_products (DataFrame): id/item_sku of regular products (optional)
+        default_parent_sku (str): Parent SKU for generated products without one (optional)
+        
+    Returns:
+        tuple: (path to the CSV file, number of rows written)
+    """
+    if EXPORT_DIR:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+    
+    # Sessions that were abandoned never remove their exports, so age them out here
+    cleanup_export_files()
+    
+    export_file = tempfile.NamedTemporaryFile(
+        mode='w', suffix='.csv', prefix='product_export_', dir=EXPORT_DIR or None,
+        delete=False, newline='', encoding='utf-8'
+    )
+    try:
+        with export_file:
+            rows_written = write_product_export(chunks, export_file, parent_products, default_parent_sku)
+    except Exception:
+        remove_export_file(export_file.name)
+        raise
+    
+    return export_file.name, rows_written
+
+def remove_export_file(path):
+    """
+    Delete an export file created by stream_product_export
+    
+    Args:
+        path (str): Path of the export file
+    """
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Error removing export file {path}: {e}")
+
+def cleanup_export_files(max_age=None):
+    """
+    Delete export files older than max_age seconds
+    
+    Args:
+        max_age (int): Age in seconds, defaults to EXPORT_FILE_MAX_AGE
+        
+    Returns:
+        int: Number of files removed
+    """
+    max_age = EXPORT_FILE_MAX_AGE if max_age is None else max_age
+    cutoff = time.time() - max_age
+    removed = 0
+    
+    for path in glob.glob(os.path.join(EXPORT_DIR or tempfile.gettempdir(), 'product_export_*.csv')):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing old export file {path}: {e}")
+    
+    return removed
+
 def export_to_csv(df):
     """
     Export DataFrame to CSV
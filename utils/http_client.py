@@ -0,0 +1,163 @@
+import os
+import time
+import random
+import datetime
+import threading
+import email.utils
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Seconds to wait for a connection and for each read from the server
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '60'))
+
+# Retries after a connection error, timeout, 429 or 5xx; delays grow from
+# HTTP_BACKOFF_BASE seconds and never exceed HTTP_BACKOFF_MAX
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', '0.5'))
+HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', '30'))
+
+# Hosts kept in the pool, and keep-alive connections kept per host
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '10'))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '16'))
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# Methods that are safe to send twice; others are only retried when the
+# server cannot have acted on them, or when the caller says so
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+# Process-wide session shared by every Streamlit session and worker thread
+http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    """
+    Get the shared requests session, creating it on first use
+
+    The session keeps connections alive per host, so repeated calls to the
+    same API or bucket skip the TCP and TLS handshakes.
+
+    Returns:
+        requests.Session: Shared session
+    """
+    global http_session
+
+    if http_session is None:
+        with _http_session_lock:
+            if http_session is None:
+                session = requests.Session()
+                # Retries are handled in http_request so they can honor Retry-After and method safety
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                http_session = session
+
+    return http_session
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+def retry_after_delay(response):
+    """
+    Read the Retry-After header of a response
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+def http_request(method, url, timeout=None, max_retries=None, retry_unsafe=False, before_attempt=None, **kwargs):
+    """
+    Send a request through the shared session, retrying transient failures
+
+    Connection errors, timeouts, 429 and 5xx responses are retried with
+    jittered exponential backoff, waiting as long as the server's
+    Retry-After header asks when it sends one. Non-idempotent requests
+    such as POST are only retried when they never reached the server
+    (connect timeout) or were rejected with 429, unless retry_unsafe is set.
+
+    Args:
+        method (str): HTTP method
+        url (str): Request URL
+        timeout (float or tuple, optional): Seconds, or (connect, read) seconds;
+            defaults to (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        max_retries (int, optional): Retries after the first attempt, defaults to HTTP_MAX_RETRIES
+        retry_unsafe (bool): Retry a non-idempotent request as if it were idempotent
+        before_attempt (callable, optional): Called before every attempt, e.g. a rate limiter
+        **kwargs: Passed to requests.Session.request
+
+    Returns:
+        requests.Response: The last response received
+
+    Raises:
+        requests.RequestException: If the last attempt failed without a response
+    """
+    method = method.upper()
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    if max_retries is None:
+        max_retries = HTTP_MAX_RETRIES
+    safe_to_repeat = retry_unsafe or method in IDEMPOTENT_METHODS
+
+    attempt = 0
+    while True:
+        if before_attempt is not None:
+            before_attempt()
+
+        try:
+            response = get_http_session().request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            # A connect timeout means the request was never sent
+            retryable = safe_to_repeat or isinstance(e, requests.ConnectTimeout)
+            if attempt >= max_retries or not retryable:
+                raise
+            delay = backoff_delay(attempt)
+            print(f"HTTP {method} {url} failed ({e}); retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+        else:
+            retryable = response.status_code in RETRY_STATUSES and (safe_to_repeat or response.status_code == 429)
+            if attempt >= max_retries or not retryable:
+                return response
+            retry_after = retry_after_delay(response)
+            delay = min(retry_after, HTTP_BACKOFF_MAX) if retry_after is not None else backoff_delay(attempt)
+            print(f"HTTP {method} {url} returned {response.status_code}; retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            # Hand the connection back to the pool before sleeping
+            response.close()
+
+        time.sleep(delay)
+        attempt += 1
+
+def http_get(url, **kwargs):
+    """Send a GET request through http_request"""
+    return http_request('GET', url, **kwargs)
+
+def http_head(url, **kwargs):
+    """Send a HEAD request through http_request (redirects are not followed, as with requests.head)"""
+    kwargs.setdefault('allow_redirects', False)
+    return http_request('HEAD', url, **kwargs)
+
+def http_post(url, **kwargs):
+    """Send a POST request through http_request"""
+    return http_request('POST', url, **kwargs)
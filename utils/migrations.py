@@ -0,0 +1,427 @@
+import os
+import re
+from mysql.connector import Error, errorcode
+from utils.product_variants import parse_generated_variants, list_row_count
+
+# db_init.sql is migration 0
+DB_INIT_SQL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db_init.sql')
+
+# Seconds to wait for another process that is already migrating
+MIGRATION_LOCK_NAME = 'demo_image_app_schema_migrations'
+MIGRATION_LOCK_TIMEOUT = 60
+
+# Rows per batch when backfilling new tables
+BACKFILL_BATCH_SIZE = 500
+
+def _table_exists(cursor, table):
+    cursor.execute("""
+        SELECT COUNT(*) AS table_exists FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name = %s
+    """, (table,))
+    return cursor.fetchone()['table_exists'] > 0
+
+def _columns(cursor, table):
+    """
+    Get column types for a table
+
+    Returns:
+        dict: column name -> (data type, max character length)
+    """
+    cursor.execute("""
+        SELECT column_name AS name, data_type AS data_type, character_maximum_length AS max_length
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s
+    """, (table,))
+    return {row['name'].lower(): (row['data_type'].lower(), row['max_length']) for row in cursor.fetchall()}
+
+def _indexes(cursor, table):
+    cursor.execute("""
+        SELECT DISTINCT index_name AS name FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+    """, (table,))
+    return {row['name'].lower() for row in cursor.fetchall()}
+
+def _read_sql_statements(path):
+    """
+    Split a SQL script into statements, dropping comments and database selection
+
+    Migrations run against the configured DB_NAME, so CREATE DATABASE and USE
+    statements are skipped.
+    """
+    with open(path) as sql_file:
+        lines = [line for line in sql_file.read().splitlines() if not line.strip().startswith('--')]
+
+    statements = []
+    for statement in '\n'.join(lines).split(';'):
+        statement = statement.strip()
+        if not statement or re.match(r'(CREATE\s+DATABASE|USE)\b', statement, re.IGNORECASE):
+            continue
+        statements.append(statement)
+    return statements
+
+def _migration_0_initial_schema(cursor):
+    """Create the tables from db_init.sql; the sample product is only added to a new database"""
+    new_database = not _table_exists(cursor, 'products')
+
+    for statement in _read_sql_statements(DB_INIT_SQL_PATH):
+        if statement.upper().startswith('INSERT') and not new_database:
+            continue
+        cursor.execute(statement)
+
+def _migration_1_product_columns(cursor):
+    """Bring tables created by older releases up to the columns the app uses"""
+    products = _columns(cursor, 'products')
+    changes = []
+
+    # Sizes and colors are stored as JSON arrays
+    for column in ('size', 'color'):
+        if products.get(column, ('text', None))[0] not in ('text', 'mediumtext', 'longtext'):
+            changes.append(f"MODIFY COLUMN {column} TEXT NULL")
+
+    # Category paths such as "Apparel > T-shirts > ..." can be long
+    category_type, category_length = products.get('category', ('varchar', 1000))
+    if category_type == 'varchar' and (category_length or 0) < 1000:
+        changes.append("MODIFY COLUMN category VARCHAR(1000) NULL")
+
+    for column, definition in [
+        ('mockup_id', 'VARCHAR(100) NULL'),
+        ('smart_object_uuid', 'VARCHAR(100) NULL'),
+        ('mockup_ids', 'TEXT NULL'),
+        ('smart_object_uuids', 'TEXT NULL')
+    ]:
+        if column not in products:
+            changes.append(f"ADD COLUMN {column} {definition}")
+
+    # One ALTER so the table is rebuilt at most once
+    if changes:
+        cursor.execute(f"ALTER TABLE products {', '.join(changes)}")
+
+    generated = _columns(cursor, 'generated_products')
+    generated_indexes = _indexes(cursor, 'generated_products')
+    changes = []
+
+    if 'item_sku' not in generated:
+        changes.append("ADD COLUMN item_sku VARCHAR(100) NULL")
+    if 'idx_item_sku' not in generated_indexes:
+        changes.append("ADD INDEX idx_item_sku (item_sku)")
+    if 'parent_sku' not in generated:
+        changes.append("ADD COLUMN parent_sku VARCHAR(100) NULL")
+
+    if changes:
+        cursor.execute(f"ALTER TABLE generated_products {', '.join(changes)}")
+
+def _migration_2_generated_product_children(cursor):
+    """Create mockup/size/color child tables for generated products and backfill them from the JSON columns"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS generated_product_mockups (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            product_id INT NOT NULL,
+            position INT NOT NULL DEFAULT 0,
+            mockup_id VARCHAR(100) NULL,
+            color_hex VARCHAR(32) NULL,
+            s3_url TEXT NOT NULL,
+            thumbnail_url TEXT NULL,
+
+            UNIQUE KEY uq_product_color (product_id, color_hex),
+            INDEX idx_color_product (color_hex, product_id),
+            INDEX idx_mockup_id (mockup_id),
+            CONSTRAINT fk_mockups_product FOREIGN KEY (product_id)
+                REFERENCES generated_products (id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS generated_product_sizes (
+            product_id INT NOT NULL,
+            position INT NOT NULL,
+            size VARCHAR(50) NOT NULL,
+
+            PRIMARY KEY (product_id, position),
+            INDEX idx_size_product (size, product_id),
+            CONSTRAINT fk_sizes_product FOREIGN KEY (product_id)
+                REFERENCES generated_products (id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS generated_product_colors (
+            product_id INT NOT NULL,
+            position INT NOT NULL,
+            color_hex VARCHAR(32) NOT NULL,
+
+            PRIMARY KEY (product_id, position),
+            INDEX idx_color_product (color_hex, product_id),
+            CONSTRAINT fk_colors_product FOREIGN KEY (product_id)
+                REFERENCES generated_products (id) ON DELETE CASCADE
+        )
+    """)
+
+    # Backfill in id order, one batch at a time
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT id, size, color, mockup_urls FROM generated_products
+            WHERE id > %s ORDER BY id LIMIT %s
+        """, (last_id, BACKFILL_BATCH_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+
+        sizes, colors, mockups = [], [], []
+        for row in rows:
+            variants = parse_generated_variants(row['size'], row['color'], row['mockup_urls'])
+            sizes.extend((row['id'],) + size for size in variants['sizes'])
+            colors.extend((row['id'],) + color for color in variants['colors'])
+            mockups.extend((row['id'],) + mockup for mockup in variants['mockups'])
+
+        if sizes:
+            cursor.executemany(
+                "INSERT IGNORE INTO generated_product_sizes (product_id, position, size) VALUES (%s, %s, %s)",
+                sizes
+            )
+        if colors:
+            cursor.executemany(
+                "INSERT IGNORE INTO generated_product_colors (product_id, position, color_hex) VALUES (%s, %s, %s)",
+                colors
+            )
+        if mockups:
+            cursor.executemany("""
+                INSERT IGNORE INTO generated_product_mockups
+                    (product_id, position, mockup_id, color_hex, s3_url, thumbnail_url)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, mockups)
+
+def _migration_3_design_hash(cursor):
+    """Add an indexed, server-maintained hash of original_design_url for design-family lookups"""
+    if 'design_hash' not in _columns(cursor, 'generated_products'):
+        cursor.execute("""
+            ALTER TABLE generated_products
+            ADD COLUMN design_hash CHAR(64) AS (SHA2(original_design_url, 256)) STORED,
+            ADD INDEX idx_design_hash (design_hash)
+        """)
+
+def _migration_4_daily_stats_rollup(cursor):
+    """Create the per-day catalog rollup used for dashboard time series and index product creation time"""
+    if 'idx_created_at' not in _indexes(cursor, 'products'):
+        cursor.execute("ALTER TABLE products ADD INDEX idx_created_at (created_at)")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_daily_stats (
+            stat_date DATE NOT NULL,
+            product_type VARCHAR(16) NOT NULL,
+            created_count INT NOT NULL DEFAULT 0,
+            published_count INT NOT NULL DEFAULT 0,
+            refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+            PRIMARY KEY (stat_date, product_type)
+        )
+    """)
+
+def _migration_5_fulltext_search(cursor):
+    """Add n-gram FULLTEXT indexes over product name, SKU and marketplace title"""
+    # The default stopword list drops every n-gram containing "a", "i", ... so
+    # build the indexes without stopwords; the setting is read at index creation.
+    cursor.execute("SET SESSION innodb_ft_enable_stopword = OFF")
+    try:
+        for table in ('products', 'generated_products'):
+            if 'ft_search' not in _indexes(cursor, table):
+                cursor.execute(f"""
+                    ALTER TABLE {table}
+                    ADD FULLTEXT INDEX ft_search (product_name, item_sku, marketplace_title) WITH PARSER ngram
+                """)
+    finally:
+        cursor.execute("SET SESSION innodb_ft_enable_stopword = ON")
+
+def _migration_6_change_feed(cursor):
+    """Track product updates with updated_at and log deletions for the change feed"""
+    if 'updated_at' not in _columns(cursor, 'products'):
+        cursor.execute("""
+            ALTER TABLE products
+            ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        """)
+        # Existing rows were last changed no later than they were created, as far as we know
+        cursor.execute("UPDATE products SET updated_at = created_at WHERE created_at IS NOT NULL")
+
+    for table in ('products', 'generated_products'):
+        if 'idx_updated_at' not in _indexes(cursor, table):
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX idx_updated_at (updated_at)")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS product_deletions (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            table_name VARCHAR(32) NOT NULL,
+            product_id INT NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            INDEX idx_deleted_at (deleted_at)
+        )
+    """)
+
+def _migration_7_render_jobs(cursor):
+    """Create the durable render job queue worked by scripts/render_worker.py"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS render_batches (
+            batch_id CHAR(36) PRIMARY KEY,
+            owner VARCHAR(100) NULL,
+            context JSON NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            INDEX idx_owner_created (owner, created_at)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS render_jobs (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            batch_id CHAR(36) NOT NULL,
+            position INT NOT NULL,
+            status ENUM('queued', 'running', 'done', 'failed', 'cancelled') NOT NULL DEFAULT 'queued',
+            image_url TEXT NOT NULL,
+            color VARCHAR(32) NOT NULL,
+            mockup_id VARCHAR(100) NULL,
+            smart_object_uuid VARCHAR(100) NULL,
+            result_url TEXT NULL,
+            error TEXT NULL,
+            attempts INT NOT NULL DEFAULT 0,
+            max_attempts INT NOT NULL DEFAULT 3,
+            run_after TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            worker_id VARCHAR(100) NULL,
+            lease_expires_at TIMESTAMP NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+            INDEX idx_claim (status, run_after, id),
+            INDEX idx_lease (status, lease_expires_at),
+            INDEX idx_batch (batch_id, position)
+        )
+    """)
+
+def _migration_8_list_rows(cursor):
+    """Store how many Product List rows each generated product expands to, so pages can be found without counting child rows"""
+    if 'list_rows' not in _columns(cursor, 'generated_products'):
+        cursor.execute("ALTER TABLE generated_products ADD COLUMN list_rows INT NOT NULL DEFAULT 1")
+    # Covers the Product List key walk and row total, so neither reads the wide rows
+    if 'idx_list_rows' not in _indexes(cursor, 'generated_products'):
+        cursor.execute("ALTER TABLE generated_products ADD INDEX idx_list_rows (created_at, id, list_rows)")
+
+    # Backfill in id order, one batch at a time; updated_at is kept so the change feed is not flooded
+    last_id = 0
+    while True:
+        cursor.execute("SELECT id FROM generated_products WHERE id > %s ORDER BY id LIMIT %s", (last_id, BACKFILL_BATCH_SIZE))
+        ids = [row['id'] for row in cursor.fetchall()]
+        if not ids:
+            break
+        first_id, last_id = ids[0], ids[-1]
+
+        cursor.execute("""
+            SELECT product_id, SUM(color_hex IS NULL) AS plain, SUM(color_hex IS NOT NULL) AS colored
+            FROM generated_product_mockups WHERE product_id BETWEEN %s AND %s GROUP BY product_id
+        """, (first_id, last_id))
+        mockups = {row['product_id']: (int(row['plain']), int(row['colored'])) for row in cursor.fetchall()}
+        cursor.execute("""
+            SELECT product_id, COUNT(*) AS sizes
+            FROM generated_product_sizes WHERE product_id BETWEEN %s AND %s GROUP BY product_id
+        """, (first_id, last_id))
+        sizes = {row['product_id']: row['sizes'] for row in cursor.fetchall()}
+
+        updates = []
+        for product_id in ids:
+            plain, colored = mockups.get(product_id, (0, 0))
+            rows = list_row_count(plain, colored, sizes.get(product_id, 0))
+            if rows != 1:
+                updates.append((rows, product_id))
+        if updates:
+            cursor.executemany(
+                "UPDATE generated_products SET list_rows = %s, updated_at = updated_at WHERE id = %s",
+                updates
+            )
+
+# Ordered schema migrations: (version, description, function taking a dictionary cursor).
+# Never edit an applied migration; append a new one instead.
+MIGRATIONS = [
+    (0, "Initial schema from db_init.sql", _migration_0_initial_schema),
+    (1, "Product columns used by mockup generation", _migration_1_product_columns),
+    (2, "Generated product mockup, size and color tables", _migration_2_generated_product_children),
+    (3, "Indexed design hash on generated products", _migration_3_design_hash),
+    (4, "Daily catalog stats rollup and product created_at index", _migration_4_daily_stats_rollup),
+    (5, "N-gram FULLTEXT search indexes on products and generated products", _migration_5_fulltext_search),
+    (6, "Product updated_at tracking and deletions log", _migration_6_change_feed),
+    (7, "Render job queue", _migration_7_render_jobs),
+    (8, "Product List row count on generated products", _migration_8_list_rows),
+]
+
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(cursor):
+    """
+    Get the highest applied migration version
+
+    Args:
+        cursor: Dictionary cursor
+
+    Returns:
+        int: Applied schema version, or None if migrations never ran
+    """
+    try:
+        cursor.execute("SELECT MAX(version) AS version FROM schema_migrations")
+        row = cursor.fetchone()
+        return row['version'] if row else None
+    except Error as e:
+        if e.errno == errorcode.ER_NO_SUCH_TABLE:
+            return None
+        raise
+
+def apply_migrations(connection, log=print):
+    """
+    Apply every pending migration in order
+
+    A MySQL named lock makes concurrent runners (several app containers
+    starting at once) wait for each other instead of migrating twice.
+
+    Args:
+        connection: MySQL connection
+        log (callable): Receives a progress message per migration
+
+    Returns:
+        list: Versions applied by this call
+
+    Raises:
+        RuntimeError: If the migration lock could not be taken
+        mysql.connector.Error: If a migration fails; later migrations are not run
+    """
+    cursor = connection.cursor(dictionary=True)
+    applied_now = []
+
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s) AS locked", (MIGRATION_LOCK_NAME, MIGRATION_LOCK_TIMEOUT))
+        if not cursor.fetchone()['locked']:
+            raise RuntimeError("Another process is applying database migrations")
+
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row['version'] for row in cursor.fetchall()}
+
+            for version, description, migrate in MIGRATIONS:
+                if version in applied:
+                    continue
+
+                log(f"Applying migration {version}: {description}")
+                migrate(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                connection.commit()
+                applied_now.append(version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s) AS released", (MIGRATION_LOCK_NAME,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
+
+    return applied_now
@@ -0,0 +1,199 @@
+import os
+import time
+import threading
+import streamlit as st
+from dotenv import load_dotenv
+from utils.dynamic_mockups import fetch_mockups, fetch_mockup_collections, fetch_mockup_details
+
+# Load environment variables
+load_dotenv()
+
+# Catalog cache configuration (seconds)
+MOCKUP_CATALOG_TTL = int(os.getenv('MOCKUP_CATALOG_TTL', '600'))
+MOCKUP_CATALOG_MAX_STALE = int(os.getenv('MOCKUP_CATALOG_MAX_STALE', '86400'))
+
+# Process-wide catalog entries shared by every Streamlit session
+catalog_entries = {}
+_catalog_lock = threading.Lock()
+
+def _refresh_entry(key, loader):
+    """
+    Load a fresh value for a catalog entry and store it
+
+    Args:
+        key (tuple): Catalog entry key
+        loader (callable): Function returning the fresh value
+
+    Returns:
+        The fresh value
+
+    Raises:
+        Exception: Whatever the loader raised; the previous value is kept
+    """
+    try:
+        value = loader()
+        with _catalog_lock:
+            catalog_entries[key] = {
+                'value': value,
+                'fetched_at': time.time(),
+                'refreshing': False
+            }
+        return value
+    except Exception:
+        with _catalog_lock:
+            if key in catalog_entries:
+                catalog_entries[key]['refreshing'] = False
+        raise
+
+def _background_refresh(key, loader):
+    try:
+        _refresh_entry(key, loader)
+    except Exception as e:
+        print(f"Background refresh of mockup catalog entry {key} failed, keeping stale data: {e}")
+
+def _get_entry(key, loader):
+    """
+    Return a catalog entry using stale-while-revalidate
+
+    Fresh entries are returned as-is. Entries older than MOCKUP_CATALOG_TTL are
+    returned immediately while a background thread refreshes them. Missing
+    entries, or entries older than MOCKUP_CATALOG_MAX_STALE, are loaded
+    synchronously.
+
+    Args:
+        key (tuple): Catalog entry key
+        loader (callable): Function returning the fresh value
+
+    Returns:
+        The cached or freshly loaded value
+    """
+    now = time.time()
+    stale_value = None
+    use_stale = False
+    start_refresh = False
+
+    with _catalog_lock:
+        entry = catalog_entries.get(key)
+        if entry:
+            age = now - entry['fetched_at']
+            if age < MOCKUP_CATALOG_TTL:
+                return entry['value']
+            if age < MOCKUP_CATALOG_MAX_STALE:
+                stale_value = entry['value']
+                use_stale = True
+                if not entry['refreshing']:
+                    entry['refreshing'] = True
+                    start_refresh = True
+
+    if use_stale:
+        if start_refresh:
+            threading.Thread(
+                target=_background_refresh,
+                args=(key, loader),
+                name="mockup-catalog-refresh",
+                daemon=True
+            ).start()
+        return stale_value
+
+    return _refresh_entry(key, loader)
+
+def _build_mockup_index(mockups):
+    """
+    Build the dropdown options and option -> (mockup id, smart object uuid) index
+
+    Args:
+        mockups (list): Mockup data from the API
+
+    Returns:
+        dict: 'mockups', 'options' and 'index' keys
+    """
+    mockup_options = [""]  # Start with an empty option
+    mockup_index = {}
+
+    for mockup in mockups:
+        mockup_name = mockup.get('name', 'Unnamed Mockup')
+        mockup_id = mockup.get('id', mockup.get('uuid', ''))  # Try 'id' first, then 'uuid'
+        smart_objects_info = []
+
+        for so in mockup.get('smart_objects', []):
+            if 'Background' not in so.get('name', ''):  # Skip background objects
+                # Create option with both smart object name and mockup name
+                so_name = so.get('name', 'Unnamed')
+                option_text = f"{so_name} - {mockup_name}"
+                smart_objects_info.append(option_text)
+                mockup_options.append(option_text)
+
+                # Keep the first smart object when a mockup repeats a name
+                existing = mockup_index.get(option_text)
+                if not existing or existing[0] != mockup_id:
+                    mockup_index[option_text] = (mockup_id, so.get('uuid', None))
+
+        # If no smart objects were found, add a default option
+        if not smart_objects_info and 'Background' not in mockup_name:
+            option_text = f"No printable objects - {mockup_name}"
+            mockup_options.append(option_text)
+            mockup_index[option_text] = (mockup_id, None)
+
+    return {
+        'mockups': mockups,
+        'options': mockup_options,
+        'index': mockup_index
+    }
+
+def get_mockup_catalog():
+    """
+    Get the cached mockup catalog with its prebuilt selection index
+
+    Returns:
+        dict: 'mockups' (raw list), 'options' (dropdown labels, starting with "")
+            and 'index' (option -> (mockup_id, smart_object_uuid))
+    """
+    try:
+        return _get_entry(('mockups',), lambda: _build_mockup_index(fetch_mockups()))
+    except Exception as e:
+        st.error(f"Error fetching mockups: {e}")
+        return _build_mockup_index([])
+
+def get_cached_mockups():
+    """
+    Cached equivalent of get_mockups()
+
+    Returns:
+        list: List of mockup data if successful, empty list otherwise
+    """
+    return get_mockup_catalog()['mockups']
+
+def get_cached_mockup_collections():
+    """
+    Cached equivalent of get_mockup_collections()
+
+    Returns:
+        list: List of collections or empty list if error occurs
+    """
+    try:
+        return _get_entry(('collections',), fetch_mockup_collections)
+    except Exception as e:
+        print(f"Error fetching mockup collections: {e}")
+        st.error(f"Error fetching mockup collections: {e}")
+        return []
+
+def get_cached_mockup_details(mockup_id):
+    """
+    Cached equivalent of get_mockup_details()
+
+    Args:
+        mockup_id: ID of the mockup template
+
+    Returns:
+        dict: Mockup details or None if error occurs
+    """
+    try:
+        return _get_entry(('details', mockup_id), lambda: fetch_mockup_details(mockup_id))
+    except Exception as e:
+        st.error(f"Error fetching mockup details: {e}")
+        return None
+
+def invalidate_mockup_catalog():
+    """Drop every cached catalog entry so the next call fetches fresh data"""
+    with _catalog_lock:
+        catalog_entries.clear()
@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+import pandas as pd
+from dotenv import load_dotenv
+from utils.database import get_catalog_version
+
+# Load environment variables
+load_dotenv()
+
+# Minimum seconds between change-feed polls; writes made by this process sync immediately
+PRODUCT_CACHE_SYNC_INTERVAL = float(os.getenv('PRODUCT_CACHE_SYNC_INTERVAL', '2'))
+
+# Process-wide copy of both product tables shared by every Streamlit session,
+# kept current by applying Database.get_changes_since() deltas
+product_cache = {
+    'products': None,
+    'generated_products': None,
+    'watermark': None,
+    'version': None,
+    'synced_at': 0.0
+}
+_cache_lock = threading.Lock()
+
+# Serializes syncs so concurrent reruns share one change-feed query
+_sync_lock = threading.Lock()
+
+def _apply_changes(df, changed, deleted_ids):
+    """
+    Merge changed rows into a cached table and drop deleted ones
+
+    Args:
+        df (DataFrame): Cached rows, or None
+        changed (DataFrame): Inserted or updated rows
+        deleted_ids (list): Ids of deleted rows
+
+    Returns:
+        DataFrame: Updated table, newest first
+    """
+    if df is None or df.empty:
+        df = changed
+    else:
+        stale_ids = set(deleted_ids)
+        if not changed.empty:
+            stale_ids.update(changed['id'])
+        if stale_ids:
+            df = df[~df['id'].isin(stale_ids)]
+        if not changed.empty:
+            df = pd.concat([df, changed], ignore_index=True)
+
+    if deleted_ids and not df.empty:
+        df = df[~df['id'].isin(deleted_ids)]
+
+    if not df.empty and 'created_at' in df.columns:
+        df = df.sort_values(['created_at', 'id'], ascending=False)
+    return df.reset_index(drop=True)
+
+def sync_product_cache(db, force=False):
+    """
+    Bring the cached tables up to date with the change feed
+
+    The first call loads both tables; later calls fetch only rows changed
+    since the previous sync.
+
+    Args:
+        db (Database): Database connection
+        force (bool): Poll even if the last sync was recent
+    """
+    version = get_catalog_version()
+    with _cache_lock:
+        fresh = (
+            product_cache['watermark'] is not None
+            and product_cache['version'] == version
+            and time.time() - product_cache['synced_at'] < PRODUCT_CACHE_SYNC_INTERVAL
+        )
+    if fresh and not force:
+        return
+
+    with _sync_lock:
+        with _cache_lock:
+            watermark = product_cache['watermark']
+            if (not force and watermark is not None and product_cache['version'] == version
+                    and time.time() - product_cache['synced_at'] < PRODUCT_CACHE_SYNC_INTERVAL):
+                return
+
+        changes = db.get_changes_since(watermark)
+        if changes is None:
+            # Keep serving the last good copy
+            return
+
+        with _cache_lock:
+            for table in ('products', 'generated_products'):
+                current = None if changes['full'] else product_cache[table]
+                product_cache[table] = _apply_changes(current, changes[table], changes['deleted'].get(table, []))
+            product_cache['watermark'] = changes['watermark']
+            product_cache['version'] = version
+            product_cache['synced_at'] = time.time()
+
+def _get_table(db, table):
+    sync_product_cache(db)
+    with _cache_lock:
+        df = product_cache[table]
+    # Callers add columns to the frame they get back
+    return df.copy() if df is not None else pd.DataFrame()
+
+def get_cached_products(db):
+    """
+    Cached equivalent of Database.get_all_products()
+
+    Returns:
+        DataFrame: Products, newest first
+    """
+    return _get_table(db, 'products')
+
+def get_cached_generated_products(db):
+    """
+    Cached equivalent of Database.get_all_generated_products()
+
+    Returns:
+        DataFrame: Generated products, newest first
+    """
+    return _get_table(db, 'generated_products')
+
+def invalidate_product_cache():
+    """Drop the cached tables so the next call reloads them in full"""
+    with _cache_lock:
+        product_cache.update({
+            'products': None,
+            'generated_products': None,
+            'watermark': None,
+            'version': None,
+            'synced_at': 0.0
+        })
@@ -0,0 +1,113 @@
+import re
+import json
+
+HEX_COLOR_PATTERN = re.compile(r'^#?([0-9A-Fa-f]{6}|[0-9A-Fa-f]{3})$')
+
+def normalize_color_hex(color):
+    """
+    Normalize a color key to the form stored in the child tables
+
+    Hex codes become upper case with a leading '#' ('#FFFFFF'); anything
+    else (e.g. a color name) is stripped and kept as-is.
+
+    Args:
+        color (str): Hex code or color name
+
+    Returns:
+        str: Normalized color, or None if empty
+    """
+    if color is None:
+        return None
+    color = str(color).strip()
+    if not color:
+        return None
+
+    match = HEX_COLOR_PATTERN.match(color)
+    if match:
+        digits = match.group(1).upper()
+        if len(digits) == 3:
+            digits = ''.join(d * 2 for d in digits)
+        return f"#{digits}"
+    return color
+
+def list_row_count(plain_mockups, color_mockups, sizes):
+    """
+    Count the rows the Product List shows for a generated product
+
+    A mockup with a color is shown once per size (once if there are no sizes),
+    a legacy mockup without a color once, and a product without mockups once.
+
+    Args:
+        plain_mockups (int): Mockups without color information
+        color_mockups (int): Mockups with a color
+        sizes (int): Sizes of the product
+
+    Returns:
+        int: Number of rows, at least 1
+    """
+    return max(1, plain_mockups + color_mockups * max(1, sizes))
+
+def _load_json(value):
+    if isinstance(value, (list, dict)):
+        return value
+    if isinstance(value, str) and value.strip()[:1] in ('[', '{'):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return None
+    return None
+
+def parse_generated_variants(size=None, color=None, mockup_urls=None, mockup_id=None, mockup_thumbnails=None):
+    """
+    Split a generated product's JSON columns into child table rows
+
+    Args:
+        size: JSON list of sizes (names or {"name": ...} dicts)
+        color: JSON list of hex colors
+        mockup_urls: JSON object of color -> mockup URL, or a legacy list of URLs
+        mockup_id (str): Mockup template id the mockups were rendered with (optional)
+        mockup_thumbnails (dict): color -> thumbnail URL (optional)
+
+    Returns:
+        dict: 'sizes' [(position, size)], 'colors' [(position, color_hex)] and
+            'mockups' [(position, mockup_id, color_hex, s3_url, thumbnail_url)]
+    """
+    sizes = []
+    parsed_sizes = _load_json(size)
+    if isinstance(parsed_sizes, list):
+        seen = set()
+        for item in parsed_sizes:
+            name = item.get('name') if isinstance(item, dict) else item
+            name = str(name).strip() if name is not None else ''
+            if name and name not in seen:
+                seen.add(name)
+                sizes.append((len(sizes), name[:50]))
+
+    colors = []
+    parsed_colors = _load_json(color)
+    if isinstance(parsed_colors, list):
+        seen = set()
+        for item in parsed_colors:
+            color_hex = normalize_color_hex(item)
+            if color_hex and color_hex not in seen:
+                seen.add(color_hex)
+                colors.append((len(colors), color_hex[:32]))
+
+    thumbnails = {normalize_color_hex(key): url for key, url in (mockup_thumbnails or {}).items()}
+    mockups = []
+    parsed_mockups = _load_json(mockup_urls)
+    if isinstance(parsed_mockups, dict):
+        seen = set()
+        for key, url in parsed_mockups.items():
+            color_hex = normalize_color_hex(key)
+            if not url or color_hex in seen:
+                continue
+            seen.add(color_hex)
+            mockups.append((len(mockups), mockup_id, color_hex and color_hex[:32], url, thumbnails.get(color_hex)))
+    elif isinstance(parsed_mockups, list):
+        # Legacy list format carries no color information
+        for url in parsed_mockups:
+            if url:
+                mockups.append((len(mockups), mockup_id, None, url, None))
+
+    return {'sizes': sizes, 'colors': colors, 'mockups': mockups}
@@ -0,0 +1,389 @@
+import os
+import re
+import json
+import time
+import bisect
+import datetime
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Query instrumentation configuration
+QUERY_METRICS_ENABLED = os.getenv('QUERY_METRICS_ENABLED', 'true').lower() == 'true'
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '500'))
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'false').lower() == 'true'
+SLOW_QUERY_LOG_PATH = os.getenv('SLOW_QUERY_LOG_PATH', '')
+SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', '200'))
+
+# Upper bounds (ms) of the duration histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Longest statement text kept in the slow-query log
+MAX_LOGGED_SQL_LENGTH = 2000
+
+# Process-wide metrics shared by every Streamlit session
+query_metrics = {}       # (operation, fingerprint) -> counters and histogram
+operation_metrics = {}   # operation -> counters
+slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_metrics_lock = threading.Lock()
+_slow_log_lock = threading.Lock()
+
+# Name of the Database method running in this thread
+_local = threading.local()
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """
+    Normalize a statement so executions that differ only in values group together
+
+    Args:
+        sql (str): SQL statement, with %s placeholders or literals
+
+    Returns:
+        str: Statement with whitespace collapsed and values and IN lists replaced by ?
+    """
+    sql = re.sub(r'\s+', ' ', sql).strip()
+    sql = re.sub(r"'(?:[^'\\]|\\.)*'", '?', sql)
+    sql = re.sub(r'\b\d+(\.\d+)?\b', '?', sql)
+    sql = sql.replace('%s', '?')
+    sql = re.sub(r'\(\s*\?(\s*,\s*\?)+\s*\)', '(?+)', sql)
+    return sql
+
+def current_operation():
+    """Get the Database operation running in this thread, or 'other'"""
+    return getattr(_local, 'operation', None) or 'other'
+
+@contextmanager
+def track_operation(name):
+    """
+    Attribute queries made inside the block to an operation
+
+    Nested operations keep the outermost name, so helper methods count
+    towards the call that used them.
+
+    Args:
+        name (str): Operation name, e.g. "Database.get_stats"
+    """
+    if getattr(_local, 'operation', None):
+        yield
+        return
+
+    _local.operation = name
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _local.operation = None
+        if QUERY_METRICS_ENABLED:
+            elapsed = time.perf_counter() - started
+            with _metrics_lock:
+                entry = _operation_entry(name)
+                entry['calls'] += 1
+                entry['total_time'] += elapsed
+                entry['max_time'] = max(entry['max_time'], elapsed)
+
+def _operation_entry(name):
+    """Get or create an operation entry (call with _metrics_lock held)"""
+    entry = operation_metrics.get(name)
+    if entry is None:
+        entry = {
+            'calls': 0, 'total_time': 0.0, 'max_time': 0.0,
+            'queries': 0, 'query_time': 0.0,
+            'connection_waits': 0, 'wait_time': 0.0, 'wait_time_max': 0.0
+        }
+        operation_metrics[name] = entry
+    return entry
+
+def record_connection_wait(seconds):
+    """
+    Record time spent waiting for a database connection
+
+    Args:
+        seconds (float): Wait time
+    """
+    if not QUERY_METRICS_ENABLED:
+        return
+    with _metrics_lock:
+        entry = _operation_entry(current_operation())
+        entry['connection_waits'] += 1
+        entry['wait_time'] += seconds
+        entry['wait_time_max'] = max(entry['wait_time_max'], seconds)
+
+def _explain(connection, sql, params):
+    """Run EXPLAIN for a slow SELECT on the connection it ran on"""
+    if connection is None or not re.match(r'\s*(SELECT|WITH)\b', sql, re.IGNORECASE):
+        return None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+
+def _log_slow_query(entry):
+    slow_queries.append(entry)
+    print(f"Slow query ({entry['duration_ms']:.0f} ms, {entry['operation']}): {entry['fingerprint'][:200]}")
+
+    if SLOW_QUERY_LOG_PATH:
+        try:
+            with _slow_log_lock, open(SLOW_QUERY_LOG_PATH, 'a') as log_file:
+                log_file.write(json.dumps(entry, default=str) + '\n')
+        except OSError as e:
+            print(f"Error writing slow query log: {e}")
+
+def record_query(sql, duration, rows, connection=None, params=None, error=None, operation=None):
+    """
+    Record one statement execution
+
+    Args:
+        sql (str): Statement as executed
+        duration (float): Seconds spent executing and fetching
+        rows (int): Rows returned or affected, None if unknown
+        connection: Connection the statement ran on (used for EXPLAIN)
+        params: Statement parameters (used for EXPLAIN, never stored)
+        error (Exception): Error raised by the statement, if any
+        operation (str, optional): Operation that ran the statement, defaults to the current one
+    """
+    if not QUERY_METRICS_ENABLED:
+        return
+
+    operation = operation or current_operation()
+    key = (operation, fingerprint(sql))
+    duration_ms = duration * 1000
+
+    with _metrics_lock:
+        entry = query_metrics.get(key)
+        if entry is None:
+            entry = {
+                'calls': 0, 'errors': 0, 'rows': 0,
+                'total_time': 0.0, 'max_time': 0.0,
+                'histogram': [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+            }
+            query_metrics[key] = entry
+        entry['calls'] += 1
+        entry['errors'] += 1 if error is not None else 0
+        entry['rows'] += rows if rows and rows > 0 else 0
+        entry['total_time'] += duration
+        entry['max_time'] = max(entry['max_time'], duration)
+        entry['histogram'][bisect.bisect_left(HISTOGRAM_BUCKETS_MS, duration_ms)] += 1
+
+        operation_entry = _operation_entry(operation)
+        operation_entry['queries'] += 1
+        operation_entry['query_time'] += duration
+
+    if duration_ms >= SLOW_QUERY_MS:
+        _log_slow_query({
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'operation': operation,
+            'fingerprint': key[1],
+            'sql': sql[:MAX_LOGGED_SQL_LENGTH],
+            'duration_ms': round(duration_ms, 1),
+            'rows': rows,
+            'error': str(error) if error is not None else None,
+            'explain': _explain(connection, sql, params) if SLOW_QUERY_EXPLAIN and error is None else None
+        })
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that times every statement, including the time to fetch its rows
+
+    A statement is recorded once its result set is exhausted, or when the
+    cursor runs another statement or is closed. Everything else is passed
+    through to the wrapped cursor.
+    """
+
+    def __init__(self, cursor, connection=None):
+        self._cursor = cursor
+        self._connection = connection
+        self._pending = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            record_query(
+                pending['sql'], pending['duration'], pending['rows'], self._connection, pending['params'],
+                operation=pending['operation']
+            )
+
+    def _run(self, method, operation, params, *args, **kwargs):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            result = method(operation, params, *args, **kwargs)
+        except Exception as e:
+            record_query(operation, time.perf_counter() - started, None, error=e)
+            raise
+
+        # Rows may be fetched after the operation that ran the statement has returned
+        self._pending = {
+            'sql': operation, 'params': params, 'duration': time.perf_counter() - started,
+            'rows': 0, 'operation': current_operation()
+        }
+        if not getattr(self._cursor, 'with_rows', False):
+            # No result set: rows affected are known now
+            self._pending['rows'] = self._cursor.rowcount
+            self._finish()
+        return result
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._run(self._cursor.execute, operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        return self._run(self._cursor.executemany, operation, seq_params, *args, **kwargs)
+
+    def _fetch(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        result = method(*args, **kwargs)
+        if self._pending is not None:
+            self._pending['duration'] += time.perf_counter() - started
+        return result
+
+    def fetchone(self):
+        row = self._fetch(self._cursor.fetchone)
+        if self._pending is not None:
+            if row is None:
+                self._finish()
+            else:
+                self._pending['rows'] += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._fetch(self._cursor.fetchmany, *args, **kwargs)
+        if self._pending is not None:
+            if rows:
+                self._pending['rows'] += len(rows)
+            else:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(self._cursor.fetchall)
+        if self._pending is not None:
+            self._pending['rows'] += len(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+def instrument_cursor(cursor, connection=None):
+    """
+    Wrap a cursor so its statements are recorded
+
+    Args:
+        cursor: MySQL cursor
+        connection: Connection the cursor belongs to (used for EXPLAIN)
+
+    Returns:
+        The wrapped cursor, or the cursor itself when metrics are disabled
+    """
+    if not QUERY_METRICS_ENABLED or cursor is None:
+        return cursor
+    return InstrumentedCursor(cursor, connection)
+
+def _percentile_ms(histogram, fraction):
+    """Upper bound (ms) of the bucket containing the given fraction of calls"""
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    running = 0
+    for index, count in enumerate(histogram):
+        running += count
+        if running >= total * fraction:
+            return float(HISTOGRAM_BUCKETS_MS[index]) if index < len(HISTOGRAM_BUCKETS_MS) else float('inf')
+    return float('inf')
+
+def get_query_metrics():
+    """
+    Get a snapshot of the query metrics for this process
+
+    Returns:
+        dict: 'operations' and 'queries' (lists sorted by total time, slowest
+            first), 'slow_queries' (newest first) and 'histogram_buckets_ms'
+    """
+    with _metrics_lock:
+        queries = [(key, dict(entry, histogram=list(entry['histogram']))) for key, entry in query_metrics.items()]
+        operations = [(name, dict(entry)) for name, entry in operation_metrics.items()]
+        slow = list(slow_queries)
+
+    query_rows = []
+    for (operation, query_fingerprint), entry in queries:
+        query_rows.append({
+            'operation': operation,
+            'fingerprint': query_fingerprint,
+            'calls': entry['calls'],
+            'errors': entry['errors'],
+            'rows': entry['rows'],
+            'total_ms': round(entry['total_time'] * 1000, 1),
+            'avg_ms': round(entry['total_time'] * 1000 / entry['calls'], 2),
+            'p95_ms': _percentile_ms(entry['histogram'], 0.95),
+            'max_ms': round(entry['max_time'] * 1000, 1),
+            'histogram': entry['histogram']
+        })
+
+    operation_rows = []
+    for name, entry in operations:
+        operation_rows.append({
+            'operation': name,
+            'calls': entry['calls'],
+            'queries': entry['queries'],
+            'total_ms': round(entry['total_time'] * 1000, 1),
+            'query_ms': round(entry['query_time'] * 1000, 1),
+            'max_ms': round(entry['max_time'] * 1000, 1),
+            'connection_waits': entry['connection_waits'],
+            'wait_ms': round(entry['wait_time'] * 1000, 1),
+            'wait_max_ms': round(entry['wait_time_max'] * 1000, 1)
+        })
+
+    return {
+        'operations': sorted(operation_rows, key=lambda row: max(row['total_ms'], row['query_ms']), reverse=True),
+        'queries': sorted(query_rows, key=lambda row: row['total_ms'], reverse=True),
+        'slow_queries': list(reversed(slow)),
+        'histogram_buckets_ms': list(HISTOGRAM_BUCKETS_MS)
+    }
+
+def dump_query_metrics(path=None):
+    """
+    Serialize the current metrics to JSON
+
+    Args:
+        path (str, optional): File to write the JSON to
+
+    Returns:
+        str: The JSON document
+    """
+    document = json.dumps(
+        dict(get_query_metrics(), generated_at=datetime.datetime.now().isoformat(timespec='seconds')),
+        default=str,
+        indent=2
+    )
+    if path:
+        with open(path, 'w') as dump_file:
+            dump_file.write(document)
+    return document
+
+def reset_query_metrics():
+    """Clear every counter and the in-memory slow-query log"""
+    with _metrics_lock:
+        query_metrics.clear()
+        operation_metrics.clear()
+        slow_queries.clear()
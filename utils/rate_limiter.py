@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import threading
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # fcntl is not available on Windows
+    fcntl = None
+
+# Load environment variables
+load_dotenv()
+
+# DynamicMockups rate limit configuration
+DYNAMIC_MOCKUPS_RPS = float(os.getenv('DYNAMIC_MOCKUPS_RPS', '5'))
+DYNAMIC_MOCKUPS_BURST = float(os.getenv('DYNAMIC_MOCKUPS_BURST', str(DYNAMIC_MOCKUPS_RPS)))
+DYNAMIC_MOCKUPS_RATE_LIMIT_FILE = os.getenv('DYNAMIC_MOCKUPS_RATE_LIMIT_FILE')
+
+# Process-wide limiter shared by every Streamlit session
+render_rate_limiter = None
+_render_rate_limiter_lock = threading.Lock()
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by all threads in the current process
+
+    Tokens refill continuously at `rate` per second up to `capacity`. Callers
+    reserve a token up front and sleep only for as long as the bucket is in
+    deficit, so there is no waiting at all while traffic stays under the limit.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = max(float(rate), 0.001)
+        self.capacity = max(float(capacity or rate), 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        Take tokens from the bucket, going into deficit if necessary
+
+        Args:
+            tokens (int): Number of tokens to take
+
+        Returns:
+            float: Seconds the caller must wait before making its request
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens=1):
+        """
+        Block until the requested tokens are available
+
+        Args:
+            tokens (int): Number of tokens to take
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in a small JSON file guarded by flock
+
+    Lets several Streamlit or worker processes on the same host share a
+    single request budget. Falls back to in-process state if the file cannot
+    be used.
+    """
+
+    def __init__(self, rate, capacity=None, path=None):
+        super().__init__(rate, capacity)
+        self.path = path
+
+    def reserve(self, tokens=1):
+        try:
+            with self._lock, open(self.path, 'a+') as state_file:
+                fcntl.flock(state_file, fcntl.LOCK_EX)
+                try:
+                    state_file.seek(0)
+                    content = state_file.read()
+                    state = json.loads(content) if content else {}
+
+                    # Wall-clock time is used because monotonic clocks are per-process
+                    now = time.time()
+                    available = float(state.get('tokens', self.capacity))
+                    updated = float(state.get('updated', now))
+                    available = min(self.capacity, available + max(0.0, now - updated) * self.rate)
+                    available -= tokens
+
+                    state_file.seek(0)
+                    state_file.truncate()
+                    json.dump({'tokens': available, 'updated': now}, state_file)
+                    state_file.flush()
+                finally:
+                    fcntl.flock(state_file, fcntl.LOCK_UN)
+
+            if available >= 0:
+                return 0.0
+            return -available / self.rate
+        except Exception as e:
+            print(f"Error using rate limit file {self.path}, falling back to in-process limiter: {e}")
+            return super().reserve(tokens)
+
+def get_render_rate_limiter():
+    """
+    Get the shared rate limiter for DynamicMockups API calls
+
+    Uses a file-backed bucket when DYNAMIC_MOCKUPS_RATE_LIMIT_FILE is set so the
+    budget is shared across processes, otherwise a process-wide bucket.
+
+    Returns:
+        TokenBucket: The shared limiter instance
+    """
+    global render_rate_limiter
+
+    if render_rate_limiter is None:
+        with _render_rate_limiter_lock:
+            if render_rate_limiter is None:
+                if DYNAMIC_MOCKUPS_RATE_LIMIT_FILE and fcntl is not None:
+                    render_rate_limiter = FileTokenBucket(
+                        DYNAMIC_MOCKUPS_RPS,
+                        DYNAMIC_MOCKUPS_BURST,
+                        DYNAMIC_MOCKUPS_RATE_LIMIT_FILE
+                    )
+                else:
+                    render_rate_limiter = TokenBucket(DYNAMIC_MOCKUPS_RPS, DYNAMIC_MOCKUPS_BURST)
+
+    return render_rate_limiter
+
+def wait_for_api_slot():
+    """
+    Block until the shared DynamicMockups request budget allows another call
+
+    Returns:
+        float: Seconds spent waiting
+    """
+    return get_render_rate_limiter().acquire()
@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Render cache configuration
+RENDER_CACHE_PATH = os.getenv(
+    'RENDER_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'render_cache.db')
+)
+RENDER_CACHE_TTL = int(os.getenv('RENDER_CACHE_TTL', str(30 * 24 * 3600)))
+RENDER_CACHE_API_URL_TTL = int(os.getenv('RENDER_CACHE_API_URL_TTL', str(24 * 3600)))
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv('RENDER_CACHE_MAX_ENTRIES', '5000'))
+RENDER_CACHE_ENABLED = os.getenv('RENDER_CACHE_ENABLED', 'true').lower() == 'true'
+
+# Writes between eviction passes; the cache may exceed RENDER_CACHE_MAX_ENTRIES by this much meanwhile
+RENDER_CACHE_EVICT_INTERVAL = int(os.getenv('RENDER_CACHE_EVICT_INTERVAL', '100'))
+
+# Hit/miss counters for the current process
+cache_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+_stats_lock = threading.Lock()
+_writes_since_eviction = 0
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def _count(name, amount=1):
+    with _stats_lock:
+        cache_stats[name] += amount
+
+def _connect():
+    """
+    Open a connection to the on-disk cache, creating the schema on first use
+
+    SQLite connections are cheap and not shareable across threads, so each
+    call opens its own; render worker threads can use the cache concurrently.
+    """
+    global _schema_ready
+
+    cache_dir = os.path.dirname(RENDER_CACHE_PATH)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    conn = sqlite3.connect(RENDER_CACHE_PATH, timeout=10)
+
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS render_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        rendered_image_url TEXT NOT NULL,
+                        is_s3 INTEGER NOT NULL DEFAULT 0,
+                        created_at REAL NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_used REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_render_cache_last_used ON render_cache (last_used)")
+                conn.commit()
+                _schema_ready = True
+
+    return conn
+
+def _should_evict():
+    """True once every RENDER_CACHE_EVICT_INTERVAL writes in this process"""
+    global _writes_since_eviction
+
+    with _stats_lock:
+        _writes_since_eviction += 1
+        if _writes_since_eviction < RENDER_CACHE_EVICT_INTERVAL:
+            return False
+        _writes_since_eviction = 0
+        return True
+
+def _evict(conn, now):
+    """
+    Drop expired entries, then the least recently used ones beyond RENDER_CACHE_MAX_ENTRIES
+
+    Returns:
+        int: Number of entries removed
+    """
+    evicted = conn.execute("DELETE FROM render_cache WHERE expires_at <= ?", (now,)).rowcount
+
+    entries = conn.execute("SELECT COUNT(*) FROM render_cache").fetchone()[0]
+    if entries > RENDER_CACHE_MAX_ENTRIES:
+        # Everything older than the newest RENDER_CACHE_MAX_ENTRIES entries, found via the last_used index
+        evicted += conn.execute("""
+            DELETE FROM render_cache WHERE last_used < (
+                SELECT last_used FROM render_cache ORDER BY last_used DESC LIMIT 1 OFFSET ?
+            )
+        """, (RENDER_CACHE_MAX_ENTRIES - 1,)).rowcount
+    return evicted
+
+def make_render_key(image_url, color, mockup_uuid, smart_object_uuid, width=1500, image_format="png", transparent_background=True):
+    """
+    Build the cache key for a render request
+
+    Args:
+        image_url (str): URL of the design image (S3 keys are unique per upload)
+        color (str): Hex color code
+        mockup_uuid (str): Mockup template UUID
+        smart_object_uuid (str): Smart object UUID
+        width (int): Render width in pixels
+        image_format (str): Output format
+        transparent_background (bool): Whether the background is transparent
+
+    Returns:
+        str: Hex digest identifying the render
+    """
+    params = {
+        'mockup_uuid': mockup_uuid,
+        'smart_object_uuid': smart_object_uuid,
+        'color': (color or '').upper(),
+        'asset_url': image_url,
+        'width': width,
+        'format': image_format,
+        'transparent_background': bool(transparent_background)
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+def get_cached_render(cache_key):
+    """
+    Look up a render result in the cache
+
+    Args:
+        cache_key (str): Key from make_render_key
+
+    Returns:
+        str: Cached rendered image URL or None on a miss
+    """
+    if not RENDER_CACHE_ENABLED:
+        return None
+
+    try:
+        conn = _connect()
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT rendered_image_url FROM render_cache WHERE cache_key = ? AND expires_at > ?",
+                (cache_key, now)
+            ).fetchone()
+
+            if row:
+                conn.execute("UPDATE render_cache SET last_used = ? WHERE cache_key = ?", (now, cache_key))
+                conn.commit()
+                _count('hits')
+                return row[0]
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Error reading render cache: {e}")
+
+    _count('misses')
+    return None
+
+def store_render(cache_key, rendered_image_url, is_s3=False):
+    """
+    Store or replace a render result in the cache
+
+    Raw API export URLs expire after RENDER_CACHE_API_URL_TTL; once a mockup
+    has been copied to S3 the entry is upgraded and kept for RENDER_CACHE_TTL.
+
+    Args:
+        cache_key (str): Key from make_render_key
+        rendered_image_url (str): URL of the rendered mockup
+        is_s3 (bool): Whether the URL points at our S3 bucket
+
+    Returns:
+        bool: True if stored, False otherwise
+    """
+    if not RENDER_CACHE_ENABLED or not rendered_image_url:
+        return False
+
+    try:
+        conn = _connect()
+        try:
+            now = time.time()
+            ttl = RENDER_CACHE_TTL if is_s3 else RENDER_CACHE_API_URL_TTL
+
+            # Never downgrade an S3 entry back to a temporary API URL
+            conn.execute("""
+                INSERT INTO render_cache (cache_key, rendered_image_url, is_s3, created_at, expires_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    rendered_image_url = excluded.rendered_image_url,
+                    is_s3 = excluded.is_s3,
+                    created_at = excluded.created_at,
+                    expires_at = excluded.expires_at,
+                    last_used = excluded.last_used
+                WHERE excluded.is_s3 >= render_cache.is_s3 OR render_cache.expires_at <= excluded.created_at
+            """, (cache_key, rendered_image_url, int(bool(is_s3)), now, now + ttl, now))
+
+            # Evicting scans the table, so only do it every few writes
+            evicted = _evict(conn, now) if _should_evict() else 0
+            conn.commit()
+        finally:
+            conn.close()
+
+        _count('stores')
+        if evicted > 0:
+            _count('evictions', evicted)
+        return True
+    except Exception as e:
+        print(f"Error writing render cache: {e}")
+        return False
+
+def get_render_cache_stats():
+    """
+    Get hit/miss counters for this process and the current cache size
+
+    Returns:
+        dict: Counters plus 'entries' and 'hit_rate'
+    """
+    with _stats_lock:
+        stats = dict(cache_stats)
+
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+
+    try:
+        conn = _connect()
+        try:
+            stats['entries'] = conn.execute("SELECT COUNT(*) FROM render_cache").fetchone()[0]
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Error reading render cache size: {e}")
+        stats['entries'] = 0
+
+    return stats
+
+def clear_render_cache():
+    """
+    Remove every entry from the render cache
+
+    Returns:
+        bool: True if cleared, False otherwise
+    """
+    try:
+        conn = _connect()
+        try:
+            conn.execute("DELETE FROM render_cache")
+            conn.commit()
+        finally:
+            conn.close()
+        return True
+    except Exception as e:
+        print(f"Error clearing render cache: {e}")
+        return False
@@ -0,0 +1,127 @@
+import os
+import uuid
+import socket
+from dotenv import load_dotenv
+from utils.dynamic_mockups import render_mockups
+
+# Load environment variables
+load_dotenv()
+
+# Queue mockup generation for scripts/render_worker.py instead of rendering in the page
+RENDER_QUEUE_ENABLED = os.getenv('RENDER_QUEUE_ENABLED', 'false').lower() == 'true'
+
+# Seconds between status polls while the Generate Product page waits for a batch
+RENDER_QUEUE_POLL_INTERVAL = float(os.getenv('RENDER_QUEUE_POLL_INTERVAL', '2'))
+
+# Attempts per job, seconds before a failed job is retried, and seconds a
+# worker may hold a job before another worker reclaims it
+RENDER_JOB_MAX_ATTEMPTS = int(os.getenv('RENDER_JOB_MAX_ATTEMPTS', '3'))
+RENDER_JOB_RETRY_DELAY = int(os.getenv('RENDER_JOB_RETRY_DELAY', '30'))
+RENDER_JOB_LEASE_SECONDS = int(os.getenv('RENDER_JOB_LEASE_SECONDS', '300'))
+
+# Jobs a worker claims per poll, and seconds it sleeps when the queue is empty
+RENDER_WORKER_BATCH_SIZE = int(os.getenv('RENDER_WORKER_BATCH_SIZE', '20'))
+RENDER_WORKER_POLL_INTERVAL = float(os.getenv('RENDER_WORKER_POLL_INTERVAL', '2'))
+
+def make_worker_id():
+    """Build an id that is unique per worker process"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+def enqueue_mockup_renders(db, image_url, colors, templates, owner=None, context=None):
+    """
+    Queue one render job per template and color
+
+    Args:
+        db (Database): Database connection
+        image_url (str): URL of the design image
+        colors (list): Hex colors to render
+        templates (list): (mockup_id, smart_object_uuid) pairs
+        owner (str, optional): Who queued the batch, e.g. the logged-in username
+        context (dict, optional): JSON-serializable data needed to resume the batch
+
+    Returns:
+        str: Batch id, or None if nothing could be queued
+    """
+    jobs = [
+        {
+            'image_url': image_url,
+            'color': color,
+            'mockup_id': mockup_id,
+            'smart_object_uuid': smart_object_uuid
+        }
+        for mockup_id, smart_object_uuid in templates
+        for color in colors
+    ]
+    return db.enqueue_render_batch(jobs, owner=owner, context=context, max_attempts=RENDER_JOB_MAX_ATTEMPTS)
+
+def process_render_jobs(db, worker_id, limit=None):
+    """
+    Claim a set of queued jobs, render them and record the outcomes
+
+    Each job's result is written as soon as it finishes, so a worker that
+    dies mid-batch only loses the jobs still in flight; those are reclaimed
+    once their lease expires.
+
+    Args:
+        db (Database): Database connection
+        worker_id (str): Identifies this worker
+        limit (int, optional): Jobs to claim, defaults to RENDER_WORKER_BATCH_SIZE
+
+    Returns:
+        int: Number of jobs claimed
+    """
+    jobs = db.claim_render_jobs(worker_id, limit or RENDER_WORKER_BATCH_SIZE, RENDER_JOB_LEASE_SECONDS)
+    if not jobs:
+        return 0
+
+    def on_progress(completed, total, job, result):
+        if result and result.get('rendered_image_url'):
+            db.complete_render_job(job['id'], worker_id, result['rendered_image_url'])
+        else:
+            status = db.fail_render_job(job['id'], worker_id, "Render API call failed", RENDER_JOB_RETRY_DELAY)
+            print(f"Render job {job['id']} failed (attempt {job['attempts']}/{job['max_attempts']}); now {status}")
+
+    render_mockups(jobs, progress_callback=on_progress)
+    return len(jobs)
+
+def get_batch_progress(batch):
+    """
+    Count the jobs of a batch by status
+
+    Args:
+        batch (dict): Batch from Database.get_render_batch()
+
+    Returns:
+        dict: 'total', one count per status, and 'finished' (no job queued or running)
+    """
+    progress = {'total': len(batch['jobs']), 'queued': 0, 'running': 0, 'done': 0, 'failed': 0, 'cancelled': 0}
+    for job in batch['jobs']:
+        progress[job['status']] = progress.get(job['status'], 0) + 1
+    progress['finished'] = progress['queued'] == 0 and progress['running'] == 0
+    return progress
+
+def batch_to_mockup_results(batch):
+    """
+    Group the finished jobs of a batch the way the Generate Product page does
+
+    Args:
+        batch (dict): Batch from Database.get_render_batch()
+
+    Returns:
+        list: One dict per template with 'mockup_id', 'smart_object_uuid' and
+            'results' (mockup data for each rendered color, in queue order)
+    """
+    templates = {}
+    for job in batch['jobs']:
+        template = templates.setdefault((job['mockup_id'], job['smart_object_uuid']), {
+            'mockup_id': job['mockup_id'],
+            'smart_object_uuid': job['smart_object_uuid'],
+            'results': []
+        })
+        if job['status'] == 'done' and job['result_url']:
+            template['results'].append({
+                'rendered_image_url': job['result_url'],
+                'color': job['color']
+            })
+
+    return [template for template in templates.values() if template['results']]
@@ -1,11 +1,16 @@
 import boto3
 import os
+import re
+import time
 import uuid
 import io
+import threading
 import streamlit as st
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-import requests
+from utils.http_client import HTTP_CONNECT_TIMEOUT, http_get, http_head
 from PIL import Image
 
 # Load environment variables
@@ -21,6 +26,32 @@ S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
 ORIGINAL_FOLDER = 'original'
 MOCKUP_FOLDER = 'mockups'
 
+# Thumbnail derivatives stored under thumbnails/{width}/{original key}.webp
+THUMBNAIL_FOLDER = 'thumbnails'
+THUMBNAIL_WIDTHS = sorted(int(w) for w in os.getenv('THUMBNAIL_WIDTHS', '70,150,300').split(',') if w.strip())
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '80'))
+THUMBNAIL_MAX_SOURCE_BYTES = int(os.getenv('THUMBNAIL_MAX_SOURCE_BYTES', str(25 * 1024 * 1024)))
+THUMBNAIL_MISSING_TTL = int(os.getenv('THUMBNAIL_MISSING_TTL', '300'))
+
+# URL format: https://bucket-name.s3.region.amazonaws.com/key
+S3_URL_PATTERN = re.compile(r'^https://(?P<bucket>.+?)\.s3\.(?P<region>[a-z0-9-]+)\.amazonaws\.com/(?P<key>.+)$')
+
+# Cache of thumbnail URL -> (exists, checked_at) shared by every session
+thumbnail_exists_cache = {}
+_thumbnail_cache_lock = threading.Lock()
+
+# Streaming transfer configuration
+S3_TRANSFER_MAX_WORKERS = int(os.getenv('S3_TRANSFER_MAX_WORKERS', '8'))
+S3_TRANSFER_TIMEOUT = int(os.getenv('S3_TRANSFER_TIMEOUT', '30'))
+
+# Multipart settings bound the memory used per transfer to a few chunks
+STREAMING_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,  # 8MB
+    multipart_chunksize=8 * 1024 * 1024,  # 8MB
+    max_concurrency=4,
+    use_threads=True
+)
+
 @st.cache_resource
 def get_s3_client():
     """Get a cached S3 client connection"""
@@ -70,6 +101,10 @@ def upload_file_to_s3(file_content, folder, file_extension='.jpg', content_type=
             ContentType=content_type
         )
         
+        # Store the small derivatives used by list and preview views
+        if content_type.startswith('image/'):
+            create_thumbnails(file_content, s3_key, s3_client)
+        
         # Generate the URL
         url = f"https://{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{s3_key}"
         return url
@@ -123,6 +158,9 @@ def upload_image_file_to_s3(file, folder=ORIGINAL_FOLDER):
                 ContentType=content_type
             )
             
+            # Store the small derivatives used by list and preview views
+            create_thumbnails(content, s3_key, s3_client)
+            
             # Generate the URL
             url = f"https://{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{s3_key}"
             return url
@@ -141,6 +179,167 @@ def upload_image_file_to_s3(file, folder=ORIGINAL_FOLDER):
         st.error(f"Error processing uploaded file: {e}")
         return None
 
+class _TeeReader:
+    """File-like wrapper that keeps a copy of what is read, up to a size limit"""
+    
+    def __init__(self, fileobj, limit):
+        self.fileobj = fileobj
+        self.limit = limit
+        self.buffer = io.BytesIO()
+    
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        if self.buffer is not None:
+            if self.buffer.tell() + len(data) > self.limit:
+                # Too large to thumbnail; stop copying so memory stays bounded
+                self.buffer = None
+            else:
+                self.buffer.write(data)
+        return data
+    
+    def getvalue(self):
+        return self.buffer.getvalue() if self.buffer is not None else None
+
+def upload_stream_to_s3(fileobj, s3_key, content_type, s3_client=None, bucket_name=None, region=None, callback=None, thumbnails=True):
+    """
+    Upload a file-like object to S3 without buffering it in full
+    
+    The object is read in multipart chunks, so memory use stays bounded no
+    matter how large the body is. Errors are raised rather than reported
+    through Streamlit so this can run on worker threads.
+    
+    Args:
+        fileobj: Readable binary file-like object (e.g. an HTTP response body)
+        s3_key: Destination key within the bucket
+        content_type: MIME type of the object
+        s3_client: Optional boto3 S3 client, defaults to the cached client
+        bucket_name: Optional bucket name, defaults to S3_BUCKET_NAME
+        region: Optional region used to build the URL, defaults to AWS_REGION
+        callback: Optional callable receiving the number of bytes transferred
+        thumbnails: Whether to store thumbnail derivatives for images
+        
+    Returns:
+        str: S3 URL of the uploaded object
+    """
+    s3_client = s3_client or get_s3_client()
+    bucket_name = bucket_name or S3_BUCKET_NAME
+    region = region or AWS_REGION
+    
+    if not s3_client:
+        raise RuntimeError("Failed to connect to S3. Check your AWS credentials.")
+    
+    # Keep a copy of image bodies as they stream past so thumbnails need no second download
+    tee = None
+    if thumbnails and content_type and content_type.startswith('image/'):
+        tee = fileobj = _TeeReader(fileobj, THUMBNAIL_MAX_SOURCE_BYTES)
+    
+    s3_client.upload_fileobj(
+        fileobj,
+        bucket_name,
+        s3_key,
+        ExtraArgs={'ContentType': content_type},
+        Config=STREAMING_TRANSFER_CONFIG,
+        Callback=callback
+    )
+    
+    if tee is not None and tee.getvalue():
+        create_thumbnails(tee.getvalue(), s3_key, s3_client, bucket_name, region)
+    
+    return f"https://{bucket_name}.s3.{region}.amazonaws.com/{s3_key}"
+
+def stream_url_to_s3(source_url, s3_key, content_type=None, s3_client=None, bucket_name=None, region=None, callback=None):
+    """
+    Pipe an HTTP response body straight into an S3 object
+    
+    Args:
+        source_url: URL to download from
+        s3_key: Destination key within the bucket
+        content_type: Optional MIME type, defaults to the response Content-Type
+        s3_client: Optional boto3 S3 client, defaults to the cached client
+        bucket_name: Optional bucket name, defaults to S3_BUCKET_NAME
+        region: Optional region used to build the URL, defaults to AWS_REGION
+        callback: Optional callable receiving the number of bytes transferred
+        
+    Returns:
+        str: S3 URL of the uploaded object
+    """
+    with http_get(source_url, stream=True, timeout=(HTTP_CONNECT_TIMEOUT, S3_TRANSFER_TIMEOUT)) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to download {source_url} (Status: {response.status_code})")
+        
+        # Let urllib3 undo any transfer encoding while the body is read
+        response.raw.decode_content = True
+        
+        return upload_stream_to_s3(
+            response.raw,
+            s3_key,
+            content_type or response.headers.get('Content-Type', 'image/png'),
+            s3_client=s3_client,
+            bucket_name=bucket_name,
+            region=region,
+            callback=callback
+        )
+
+def transfer_mockups_to_s3(transfers, s3_client=None, bucket_name=None, region=None, max_workers=None, progress_callback=None):
+    """
+    Stream several mockups from their render URLs to S3 concurrently
+    
+    Each transfer is a dict with 'source_url', 's3_key' and optionally
+    'content_type'. Worker threads never call Streamlit; the progress callback
+    is invoked from the calling thread as each transfer finishes.
+    
+    Args:
+        transfers: List of transfer dicts
+        s3_client: Optional boto3 S3 client, defaults to the cached client
+        bucket_name: Optional bucket name, defaults to S3_BUCKET_NAME
+        region: Optional region used to build the URLs, defaults to AWS_REGION
+        max_workers: Maximum concurrent transfers, defaults to S3_TRANSFER_MAX_WORKERS
+        progress_callback: Called as progress_callback(completed, total, transfer, s3_url, error)
+        
+    Returns:
+        list: S3 URL for each transfer in the same order, None for failed transfers
+    """
+    results = [None] * len(transfers)
+    if not transfers:
+        return results
+    
+    # Resolve the client on the calling thread; boto3 clients are thread-safe
+    s3_client = s3_client or get_s3_client()
+    workers = max(1, min(max_workers or S3_TRANSFER_MAX_WORKERS, len(transfers)))
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-transfer") as executor:
+        futures = {
+            executor.submit(
+                stream_url_to_s3,
+                transfer['source_url'],
+                transfer['s3_key'],
+                content_type=transfer.get('content_type'),
+                s3_client=s3_client,
+                bucket_name=bucket_name,
+                region=region
+            ): index
+            for index, transfer in enumerate(transfers)
+        }
+        
+        completed = 0
+        for future in as_completed(futures):
+            index = futures[future]
+            error = None
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                print(f"Error transferring {transfers[index]['source_url']} to S3: {e}")
+                error = e
+            
+            completed += 1
+            if progress_callback:
+                try:
+                    progress_callback(completed, len(transfers), transfers[index], results[index], error)
+                except Exception as e:
+                    print(f"Error in S3 transfer progress callback: {e}")
+    
+    return results
+
 def upload_mockup_to_s3(image_path_or_url, is_url=False):
     """
     Upload a mockup image to S3
@@ -154,16 +353,19 @@ def upload_mockup_to_s3(image_path_or_url, is_url=False):
     """
     try:
         if is_url:
-            # Download from URL
-            response = requests.get(image_path_or_url)
-            if response.status_code != 200:
-                st.error(f"Error downloading image: Status code {response.status_code}")
-                return None
+            # Stream from the URL straight into S3 instead of buffering the download
+            with http_get(image_path_or_url, stream=True, timeout=(HTTP_CONNECT_TIMEOUT, S3_TRANSFER_TIMEOUT)) as response:
+                if response.status_code != 200:
+                    st.error(f"Error downloading image: Status code {response.status_code}")
+                    return None
+                    
+                # Determine file extension based on content type
+                content_type = response.headers.get('Content-Type', 'image/jpeg')
+                ext = '.jpg' if 'jpeg' in content_type else '.png'
+                s3_key = f"{MOCKUP_FOLDER}/{uuid.uuid4()}{ext}"
                 
-            content = response.content
-            # Determine file extension based on content type
-            content_type = response.headers.get('Content-Type', 'image/jpeg')
-            ext = '.jpg' if 'jpeg' in content_type else '.png'
+                response.raw.decode_content = True
+                return upload_stream_to_s3(response.raw, s3_key, content_type)
         else:
             # Read local file
             if not os.path.exists(image_path_or_url):
@@ -182,6 +384,149 @@ def upload_mockup_to_s3(image_path_or_url, is_url=False):
         st.error(f"Error uploading mockup to S3: {e}")
         return None
 
+def thumbnail_key(s3_key, width):
+    """
+    Get the S3 key of a thumbnail derivative
+    
+    Args:
+        s3_key: Key of the original image
+        width: Thumbnail width in pixels
+        
+    Returns:
+        str: Key of the WebP thumbnail
+    """
+    return f"{THUMBNAIL_FOLDER}/{width}/{os.path.splitext(s3_key)[0]}.webp"
+
+def create_thumbnails(image_content, s3_key, s3_client=None, bucket_name=None, region=None):
+    """
+    Generate and store WebP thumbnails for an uploaded image
+    
+    Errors are printed rather than reported through Streamlit so this can
+    run on worker threads; a failed thumbnail never fails the upload.
+    
+    Args:
+        image_content: Binary content of the original image
+        s3_key: Key the original image was stored under
+        s3_client: Optional boto3 S3 client, defaults to the cached client
+        bucket_name: Optional bucket name, defaults to S3_BUCKET_NAME
+        region: Optional region used to build the thumbnail URLs, defaults to AWS_REGION
+        
+    Returns:
+        dict: Thumbnail key for each width that was stored
+    """
+    s3_client = s3_client or get_s3_client()
+    bucket_name = bucket_name or S3_BUCKET_NAME
+    region = region or AWS_REGION
+    stored = {}
+    
+    if not s3_client or not image_content:
+        return stored
+    
+    try:
+        image = Image.open(io.BytesIO(image_content))
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+    except Exception as e:
+        print(f"Error opening image {s3_key} for thumbnails: {e}")
+        return stored
+    
+    for width in THUMBNAIL_WIDTHS:
+        try:
+            # Never upscale; small sources are re-encoded at their own size
+            target_width = min(width, image.width)
+            target_height = max(1, round(image.height * target_width / image.width))
+            thumbnail = image.resize((target_width, target_height), Image.LANCZOS)
+            
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, format='WEBP', quality=THUMBNAIL_QUALITY, method=4)
+            
+            key = thumbnail_key(s3_key, width)
+            s3_client.put_object(
+                Body=buffer.getvalue(),
+                Bucket=bucket_name,
+                Key=key,
+                ContentType='image/webp',
+                CacheControl='public, max-age=31536000, immutable'
+            )
+            stored[width] = key
+            
+            thumbnail_url = f"https://{bucket_name}.s3.{region}.amazonaws.com/{key}"
+            with _thumbnail_cache_lock:
+                thumbnail_exists_cache[thumbnail_url] = (True, time.time())
+        except Exception as e:
+            print(f"Error creating {width}px thumbnail for {s3_key}: {e}")
+    
+    return stored
+
+def _thumbnail_exists(thumbnail_url):
+    """Check whether a thumbnail has been stored, caching the answer"""
+    now = time.time()
+    
+    with _thumbnail_cache_lock:
+        cached = thumbnail_exists_cache.get(thumbnail_url)
+    if cached and (cached[0] or now - cached[1] < THUMBNAIL_MISSING_TTL):
+        return cached[0]
+    
+    try:
+        exists = http_head(thumbnail_url, timeout=3, max_retries=0).status_code == 200
+    except Exception as e:
+        print(f"Error checking thumbnail {thumbnail_url}: {e}")
+        exists = False
+    
+    with _thumbnail_cache_lock:
+        thumbnail_exists_cache[thumbnail_url] = (exists, now)
+    return exists
+
+def get_thumbnail_url(image_url, width):
+    """
+    Map a stored image URL to its best-fit thumbnail
+    
+    Picks the smallest derivative at least `width` pixels wide. URLs outside
+    S3, and images uploaded before thumbnails existed, fall back to the
+    original URL.
+    
+    Args:
+        image_url: URL of the original image
+        width: Display width in pixels
+        
+    Returns:
+        str: Thumbnail URL if one is available, otherwise image_url
+    """
+    if not image_url or not isinstance(image_url, str) or not THUMBNAIL_WIDTHS:
+        return image_url
+    
+    match = S3_URL_PATTERN.match(image_url)
+    if not match or match.group('key').startswith(f"{THUMBNAIL_FOLDER}/"):
+        return image_url
+    
+    best_width = next((w for w in THUMBNAIL_WIDTHS if w >= width), THUMBNAIL_WIDTHS[-1])
+    thumbnail_url = (
+        f"https://{match.group('bucket')}.s3.{match.group('region')}.amazonaws.com/"
+        f"{thumbnail_key(match.group('key'), best_width)}"
+    )
+    
+    return thumbnail_url if _thumbnail_exists(thumbnail_url) else image_url
+
+def prefetch_thumbnails(image_urls, width, max_workers=8):
+    """
+    Resolve thumbnails for many images at once so a page render doesn't wait on each check
+    
+    Args:
+        image_urls: Iterable of original image URLs
+        width: Display width in pixels
+        max_workers: Maximum concurrent existence checks
+        
+    Returns:
+        dict: Original URL -> URL to display
+    """
+    urls = list({url for url in image_urls if url and isinstance(url, str)})
+    if not urls:
+        return {}
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as executor:
+        return dict(zip(urls, executor.map(lambda url: get_thumbnail_url(url, width), urls)))
+
 def get_image_from_s3_url(s3_url):
     """
     Display an image from S3 URL in Streamlit
@@ -196,7 +541,7 @@ def get_image_from_s3_url(s3_url):
         return None
         
     try:
-        response = requests.get(s3_url)
+        response = http_get(s3_url)
         if response.status_code == 200:
             return Image.open(io.BytesIO(response.content))
         else:
@@ -301,7 +646,7 @@ def verify_s3_upload_functionality():
         test_url = f"https://{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{test_key}"
         
         # Verify we can access the image
-        response = requests.head(test_url)
+        response = http_head(test_url)
         if response.status_code == 200:
             # Clean up the test image
             s3_client.delete_object(Bucket=S3_BUCKET_NAME, Key=test_key)
@@ -0,0 +1,167 @@
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, CancelledError
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Keys whose counters are kept for the Admin page; the least recently used are dropped
+SINGLEFLIGHT_STATS_MAX_KEYS = int(os.getenv('SINGLEFLIGHT_STATS_MAX_KEYS', '200'))
+
+# key -> Future of the call currently running for it, shared by every thread in the process
+inflight_calls = {}
+
+# key -> counters, least recently used first
+singleflight_stats = OrderedDict()
+singleflight_totals = {'calls': 0, 'executions': 0, 'shared': 0, 'errors': 0}
+_singleflight_lock = threading.Lock()
+
+def _join(key, label):
+    """
+    Register a call for key
+
+    Returns:
+        tuple: (Future for the key's result, True if this caller must run the call)
+    """
+    with _singleflight_lock:
+        entry = singleflight_stats.pop(key, None)
+        if entry is None:
+            entry = {'key': label or str(key), 'calls': 0, 'executions': 0, 'shared': 0, 'errors': 0, 'last_call': None}
+        singleflight_stats[key] = entry
+        while len(singleflight_stats) > SINGLEFLIGHT_STATS_MAX_KEYS:
+            singleflight_stats.popitem(last=False)
+
+        entry['calls'] += 1
+        entry['last_call'] = time.time()
+        singleflight_totals['calls'] += 1
+
+        future = inflight_calls.get(key)
+        if future is None:
+            future = Future()
+            inflight_calls[key] = future
+            entry['executions'] += 1
+            singleflight_totals['executions'] += 1
+            return future, True
+
+        entry['shared'] += 1
+        singleflight_totals['shared'] += 1
+        return future, False
+
+def _finish(key, future, result=None, error=None):
+    """Publish the leader's outcome to every waiter and forget the key"""
+    with _singleflight_lock:
+        if inflight_calls.get(key) is future:
+            del inflight_calls[key]
+        if error is not None:
+            entry = singleflight_stats.get(key)
+            if entry is not None:
+                entry['errors'] += 1
+            singleflight_totals['errors'] += 1
+
+    if error is None:
+        future.set_result(result)
+    elif isinstance(error, Exception):
+        future.set_exception(error)
+    else:
+        # The leader was cancelled or interrupted; waiters retry and one of them takes over
+        future.cancel()
+
+def singleflight(key, fn, *args, label=None, **kwargs):
+    """
+    Run fn once for all callers that ask for the same key at the same time
+
+    The first caller runs fn; callers that arrive while it is running block
+    until it finishes and get the same result, or the same exception. Once
+    the call returns the key is forgotten, so later callers run fn again.
+    Every caller receives the same object, so treat it as read-only.
+
+    Args:
+        key (hashable): Identifies identical calls, e.g. a render cache key
+        fn (callable): Function to run
+        *args: Positional arguments for fn
+        label (str, optional): Readable name for the key in get_singleflight_stats()
+        **kwargs: Keyword arguments for fn
+
+    Returns:
+        The result of fn
+    """
+    while True:
+        future, leader = _join(key, label)
+        if leader:
+            break
+        try:
+            return future.result()
+        except CancelledError:
+            continue
+
+    try:
+        result = fn(*args, **kwargs)
+    except BaseException as e:
+        _finish(key, future, error=e)
+        raise
+    _finish(key, future, result)
+    return result
+
+async def singleflight_async(key, coro_fn, *args, label=None, **kwargs):
+    """
+    Coroutine version of singleflight()
+
+    Shares in-flight calls with singleflight(), so threads and event loops
+    wait on each other. Cancelling a waiter does not affect the running call.
+
+    Args:
+        key (hashable): Identifies identical calls, e.g. a render cache key
+        coro_fn (callable): Coroutine function to await
+        *args: Positional arguments for coro_fn
+        label (str, optional): Readable name for the key in get_singleflight_stats()
+        **kwargs: Keyword arguments for coro_fn
+
+    Returns:
+        The result of coro_fn
+    """
+    while True:
+        future, leader = _join(key, label)
+        if leader:
+            break
+        try:
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+
+    try:
+        result = await coro_fn(*args, **kwargs)
+    except BaseException as e:
+        _finish(key, future, error=e)
+        raise
+    _finish(key, future, result)
+    return result
+
+def get_singleflight_stats():
+    """
+    Get deduplication counters for this process
+
+    Returns:
+        dict: Totals ('calls', 'executions', 'shared', 'errors'), 'in_flight'
+            and 'keys', a list of per-key counters with the most shared first
+    """
+    with _singleflight_lock:
+        totals = dict(singleflight_totals)
+        totals['in_flight'] = len(inflight_calls)
+        totals['keys'] = sorted(
+            (dict(entry) for entry in singleflight_stats.values()),
+            key=lambda entry: (entry['shared'], entry['calls']),
+            reverse=True
+        )
+    return totals
+
+def reset_singleflight_stats():
+    """Clear the counters; calls in flight are not affected"""
+    with _singleflight_lock:
+        singleflight_stats.clear()
+        for name in singleflight_totals:
+            singleflight_totals[name] = 0
@@ -0,0 +1,208 @@
+import os
+import time
+import random
+import string
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Seconds an allocated SKU stays reserved for the session that asked for it
+SKU_RESERVATION_TTL = int(os.getenv('SKU_RESERVATION_TTL', '1800'))
+
+# Minimum seconds between incremental refreshes of the known-SKU index
+SKU_INDEX_REFRESH_INTERVAL = int(os.getenv('SKU_INDEX_REFRESH_INTERVAL', '5'))
+
+SKU_SUFFIX_CHARS = string.ascii_uppercase + string.digits
+
+# Stands in for the random suffix in SKU previews shown before one is allocated
+SKU_SUFFIX_PLACEHOLDER = '????'
+
+# Process-wide SKU index shared by every Streamlit session. known_skus only grows
+# between full reloads, so it can reject candidates without a query; the final
+# word on availability is always the batched database check.
+sku_index = {
+    'known_skus': set(),
+    'high_water': None,   # table -> highest id already loaded
+    'refreshed_at': 0.0
+}
+# sku -> (owner, expires_at)
+reserved_skus = {}
+_sku_lock = threading.Lock()
+
+def _refresh_index(db, force=False):
+    """
+    Load SKUs added since the last refresh (everything on the first call)
+
+    Args:
+        db (Database): Database connection
+        force (bool): Refresh even if the last refresh was recent
+    """
+    with _sku_lock:
+        if not force and time.time() - sku_index['refreshed_at'] < SKU_INDEX_REFRESH_INTERVAL:
+            return
+        high_water = dict(sku_index['high_water'] or {})
+
+    new_skus, new_high_water = db.get_skus_after(high_water)
+    if new_high_water is None:
+        return
+
+    with _sku_lock:
+        sku_index['known_skus'].update(new_skus)
+        sku_index['high_water'] = new_high_water
+        sku_index['refreshed_at'] = time.time()
+
+def _purge_expired(now):
+    for sku in [sku for sku, (_, expires_at) in reserved_skus.items() if expires_at <= now]:
+        del reserved_skus[sku]
+
+def _is_blocked(sku, owner, now):
+    """True if the SKU is known to exist or is reserved by someone else (call with _sku_lock held)"""
+    if sku in sku_index['known_skus']:
+        return True
+    reservation = reserved_skus.get(sku)
+    return bool(reservation and reservation[1] > now and (owner is None or reservation[0] != owner))
+
+def _claim(db, candidates, owner):
+    """
+    Reserve whichever candidates are free, checking them all with one query
+
+    Args:
+        db (Database): Database connection
+        candidates (list): SKUs to try
+        owner (str): Reservation owner
+
+    Returns:
+        set: The candidates that were reserved for owner, or None if the
+            database could not be checked (nothing is reserved then)
+    """
+    now = time.time()
+    with _sku_lock:
+        _purge_expired(now)
+        unchecked = [sku for sku in dict.fromkeys(candidates) if not _is_blocked(sku, owner, now)]
+    if not unchecked:
+        return set()
+
+    existing = db.find_existing_skus(unchecked)
+    if existing is None:
+        # Fail closed: a SKU we could not check is never handed out
+        return None
+
+    claimed = set()
+    with _sku_lock:
+        sku_index['known_skus'].update(existing)
+        now = time.time()
+        for sku in unchecked:
+            # Another session may have reserved it while we were querying
+            if sku in existing or _is_blocked(sku, owner, now):
+                continue
+            reserved_skus[sku] = (owner, now + SKU_RESERVATION_TTL)
+            claimed.add(sku)
+    return claimed
+
+def allocate_skus(db, prefixes, owner=None, suffix_length=4, max_rounds=5):
+    """
+    Allocate and reserve a unique SKU for every prefix
+
+    Each SKU is the prefix plus a random alphanumeric suffix. All candidates
+    in a round are checked with a single query; only the collisions are
+    retried, so a bulk allocation costs a few round trips rather than one
+    per SKU.
+
+    Args:
+        db (Database): Database connection
+        prefixes (list): SKU prefixes, e.g. ["TSH-BW-3-"]; repeats get distinct SKUs
+        owner (str, optional): Reservation owner, e.g. a session id
+        suffix_length (int): Length of the random suffix
+        max_rounds (int): Collision retries before giving up
+
+    Returns:
+        list: One reserved SKU per prefix, in order (None where none could be found
+            or the database could not be checked)
+    """
+    _refresh_index(db)
+
+    allocated = [None] * len(prefixes)
+    pending = list(range(len(prefixes)))
+
+    for _ in range(max_rounds):
+        if not pending:
+            break
+        candidates = {
+            index: prefixes[index] + ''.join(random.choice(SKU_SUFFIX_CHARS) for _ in range(suffix_length))
+            for index in pending
+        }
+        claimed = _claim(db, list(candidates.values()), owner)
+        if claimed is None:
+            break
+
+        still_pending = []
+        for index in pending:
+            sku = candidates[index]
+            if sku in claimed:
+                allocated[index] = sku
+                # The same random SKU can only go to one prefix
+                claimed.discard(sku)
+            else:
+                still_pending.append(index)
+        pending = still_pending
+
+    return allocated
+
+def reserve_skus(db, skus, owner=None):
+    """
+    Reserve exact SKUs, checking them all with one query
+
+    SKUs already reserved by the same owner count as reserved.
+
+    Args:
+        db (Database): Database connection
+        skus (list): SKUs to reserve
+        owner (str, optional): Reservation owner, e.g. a session id
+
+    Returns:
+        set: SKUs that are taken and were not reserved, or None if the database
+            could not be checked (nothing is reserved then)
+    """
+    _refresh_index(db)
+    claimed = _claim(db, skus, owner)
+    if claimed is None:
+        return None
+    return {sku for sku in skus if sku not in claimed}
+
+def is_reserved_by(sku, owner):
+    """
+    Check whether a SKU is still reserved for owner, e.g. before reusing it on a rerun
+
+    Args:
+        sku (str): SKU to check
+        owner (str): Reservation owner
+
+    Returns:
+        bool: True if the reservation exists, belongs to owner and has not expired
+    """
+    with _sku_lock:
+        reservation = reserved_skus.get(sku)
+        return bool(reservation and reservation[0] == owner and reservation[1] > time.time())
+
+def release_skus(skus, used=False):
+    """
+    Drop reservations, e.g. once the products were saved or abandoned
+
+    Args:
+        skus (list): SKUs to release
+        used (bool): True if the SKUs were saved, so they are known to exist
+    """
+    with _sku_lock:
+        for sku in skus:
+            reserved_skus.pop(sku, None)
+        if used:
+            sku_index['known_skus'].update(skus)
+
+def invalidate_sku_index():
+    """Forget the known SKUs so the next allocation reloads them; reservations are kept"""
+    with _sku_lock:
+        sku_index['known_skus'] = set()
+        sku_index['high_water'] = None
+        sku_index['refreshed_at'] = 0.0
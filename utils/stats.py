@@ -0,0 +1,97 @@
+import os
+import time
+import datetime
+import threading
+from dotenv import load_dotenv
+from utils.database import get_catalog_version
+
+# Load environment variables
+load_dotenv()
+
+# Seconds dashboard stats are reused; writes made by this process invalidate them sooner
+STATS_CACHE_TTL = int(os.getenv('STATS_CACHE_TTL', '60'))
+
+# Days shown in the "created per day" series
+STATS_SERIES_DAYS = int(os.getenv('STATS_SERIES_DAYS', '30'))
+
+# Read the series from the catalog_daily_stats rollup, recomputing only the most recent days
+STATS_ROLLUP_ENABLED = os.getenv('STATS_ROLLUP_ENABLED', 'false').lower() == 'true'
+STATS_ROLLUP_REFRESH_DAYS = int(os.getenv('STATS_ROLLUP_REFRESH_DAYS', '2'))
+
+# Process-wide cached stats shared by every Streamlit session
+stats_cache = {}
+_stats_lock = threading.Lock()
+
+# Serializes recomputation so concurrent reruns share one query
+_refresh_lock = threading.Lock()
+
+# Set once the rollup has been rebuilt for the whole series window in this process
+_rollup_backfilled = False
+
+def _load_series(db, since):
+    """
+    Load the per-day created series from the rollup table
+
+    The whole window is rebuilt once per process; after that only the last
+    STATS_ROLLUP_REFRESH_DAYS days are recomputed.
+    """
+    global _rollup_backfilled
+    today = datetime.date.today()
+    refresh_since = since if not _rollup_backfilled else today - datetime.timedelta(days=STATS_ROLLUP_REFRESH_DAYS - 1)
+
+    if db.refresh_stats_rollup(max(refresh_since, since)):
+        _rollup_backfilled = True
+    return db.get_stats_rollup(since)
+
+def _compute_stats(db):
+    since = datetime.date.today() - datetime.timedelta(days=STATS_SERIES_DAYS - 1)
+
+    if STATS_ROLLUP_ENABLED:
+        stats = db.get_stats()
+        stats['created_per_day'] = _load_series(db, since)
+    else:
+        stats = db.get_stats(series_since=since)
+
+    stats['series_since'] = since
+    return stats
+
+def _cached_stats(version):
+    with _stats_lock:
+        if (stats_cache
+                and stats_cache['version'] == version
+                and time.time() - stats_cache['fetched_at'] < STATS_CACHE_TTL):
+            return stats_cache['value']
+    return None
+
+def get_dashboard_stats(db):
+    """
+    Get dashboard statistics, reusing a recent result when the catalog has not changed
+
+    Args:
+        db (Database): Database connection
+
+    Returns:
+        dict: Stats from Database.get_stats() plus 'series_since' (first day of
+            'created_per_day') and 'computed_at' (epoch seconds)
+    """
+    version = get_catalog_version()
+    stats = _cached_stats(version)
+    if stats is not None:
+        return stats
+
+    with _refresh_lock:
+        # Another session may have refreshed the stats while we waited
+        stats = _cached_stats(version)
+        if stats is not None:
+            return stats
+
+        stats = _compute_stats(db)
+        stats['computed_at'] = time.time()
+        with _stats_lock:
+            stats_cache.update({'value': stats, 'version': version, 'fetched_at': stats['computed_at']})
+        return stats
+
+def invalidate_dashboard_stats():
+    """Drop the cached stats so the next call queries the database"""
+    with _stats_lock:
+        stats_cache.clear()